@@ -1,24 +1,58 @@
-import uuid
-from email.utils import parsedate_to_datetime
+import json
+import queue
+import threading
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
 import traceback
-from datetime import datetime, timezone
 
 # Import all services
-from config import OUTPUT_DIR
-from llm_service import openai_client, convert_to_saudi_dialect, news_classifier_agent
-from tts_service import initialize_tts, generate_audio, is_tts_ready
-from scraper_service import scrape_alriyadh_news
-from storage_service import gcs_client, upload_to_gcs, get_audio_duration, cleanup_local_files
+from config import OUTPUT_DIR, BATCH_MAX_ITEMS
+from llm_service import openai_client, convert_to_saudi_dialect
+from tts_service import (
+    initialize_tts, generate_audio, is_tts_ready, inference_queue_depth, synthesize_stream, wav_stream_header,
+    pcm16_bytes, SAMPLE_RATE
+)
+from scraper_service import scrape_feeds
+from storage_service import gcs_client
+from pipeline_service import process_articles
+from llm_usage import RunUsage
+from job_service import job_registry, sse_event_stream, parse_last_event_id
+from metrics_service import render_metrics
+from batch_service import iter_dialect_batch, iter_audio_batch
 
 # ============ Flask Setup ============
 app = Flask(__name__)
 CORS(app)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# ============ Request Helpers ============
+
+def _get_flag(name: str) -> bool:
+    """Read a boolean option from the query string or the JSON body"""
+    value = request.args.get(name)
+    if value is None:
+        body = request.get_json(silent=True) or {}
+        value = body.get(name, False)
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def _wants_stream() -> bool:
+    """Streaming is requested with ?stream=1 or an `Accept: application/x-ndjson` header"""
+    return _get_flag('stream') or 'application/x-ndjson' in request.headers.get('Accept', '')
+
+
+def _ndjson_line(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+def _ndjson_response(lines):
+    return Response(lines, mimetype='application/x-ndjson', headers={"X-Accel-Buffering": "no"})
+
+
 # ============ API Endpoints ============
 
 @app.route('/health', methods=['GET'])
@@ -29,17 +63,23 @@ def health_check():
             "service": "agent_service",
             "llm_ready": openai_client is not None,
             "tts_ready": is_tts_ready(),
-            "gcs_ready": gcs_client is not None
+            "gcs_ready": gcs_client is not None,
+            "tts_queue_depth": inference_queue_depth()
         })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for scraping, LLM, TTS and upload stages"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/scrape-news', methods=['GET'])
 def scrape_news():
-    """Scrape latest news from AlRiyadh"""
+    """Scrape latest news from the configured feeds"""
     try:
         print("\n" + "="*50)
         print("Scrape endpoint called")
         print("="*50)
-        news_data = scrape_alriyadh_news()
+        news_data = scrape_feeds()
         return jsonify({
             "success": True,
             "count": len(news_data),
@@ -100,12 +140,143 @@ def generate_audio_endpoint():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/generate-audio/stream', methods=['POST'])
+def generate_audio_stream_endpoint():
+    """Stream 16-bit mono audio while it is synthesized (WAV, or raw PCM with format=pcm)"""
+    data = request.get_json(silent=True) or {}
+    text = data.get('text', '')
+    voice_type = data.get('voice_type', 'normal')
+    audio_format = (request.args.get('format') or data.get('format') or 'wav').lower()
+
+    if not text:
+        return jsonify({"success": False, "error": "No text provided"}), 400
+    if audio_format not in ('wav', 'pcm'):
+        return jsonify({"success": False, "error": "format must be 'wav' or 'pcm'"}), 400
+    if not is_tts_ready():
+        return jsonify({"success": False, "error": "TTS model is not loaded"}), 503
+
+    def generate():
+        audio = synthesize_stream(text, voice_type)
+        try:
+            if audio_format == 'wav':
+                yield wav_stream_header()
+            for piece in audio:
+                yield pcm16_bytes(piece)
+        except Exception as e:
+            # Headers are already sent; the client sees the audio end early
+            print(f"Error streaming audio: {e}")
+        finally:
+            audio.close()
+
+    mimetype = 'audio/wav' if audio_format == 'wav' else f'audio/L16; rate={SAMPLE_RATE}; channels=1'
+    return Response(generate(), mimetype=mimetype, headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+
+def _get_batch_items():
+    """Validate the `items` list of a batch request. Returns (items, error_response)."""
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({"success": False, "error": "Provide a non-empty 'items' list"}), 400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return None, (jsonify({"success": False, "error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400)
+
+    # Plain strings are accepted as shorthand for {"text": ...}
+    items = [{"text": item} if isinstance(item, str) else item for item in items]
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('text'), str) or not item['text'].strip():
+            error = f"Item {idx} must be an object with a non-empty 'text' string"
+        elif item.get('voice_type') is not None and not isinstance(item['voice_type'], str):
+            error = f"Item {idx}: 'voice_type' must be a string"
+        else:
+            continue
+        return None, (jsonify({"success": False, "error": error}), 400)
+    return items, None
+
+
+def _batch_response(items, results_iter):
+    """Send batch results as one JSON document, or as NDJSON lines when streaming is requested"""
+    if _wants_stream():
+        def generate():
+            succeeded = 0
+            for result in results_iter:
+                succeeded += result["success"]
+                yield _ndjson_line(result)
+            yield _ndjson_line({"type": "summary", "success": True, "total": len(items), "succeeded": succeeded})
+
+        return _ndjson_response(generate())
+
+    results = sorted(results_iter, key=lambda result: result["index"])
+    return jsonify({
+        "success": True,
+        "total": len(items),
+        "succeeded": sum(result["success"] for result in results),
+        "results": results
+    })
+
+
+@app.route('/api/convert-to-dialect/batch', methods=['POST'])
+def convert_to_dialect_batch_endpoint():
+    """Convert a list of Fusha texts to Saudi dialect with bounded parallelism"""
+    items, error = _get_batch_items()
+    if error:
+        return error
+
+    return _batch_response(items, iter_dialect_batch(items))
+
+
+@app.route('/api/generate-audio/batch', methods=['POST'])
+def generate_audio_batch_endpoint():
+    """Generate audio for a list of {text, voice_type, name} items, grouped by voice"""
+    items, error = _get_batch_items()
+    if error:
+        return error
+
+    return _batch_response(items, iter_audio_batch(items))
+
+
+def _convert_article(article):
+    """Convert one scraped article to Saudi dialect for /api/scrape-and-convert"""
+    # *** CRITICAL CHANGE: Using the correct key from the scraper's output ***
+    fusha_text_to_convert = article.get('description_fusha', '')
+
+    title = article.get('title', 'Untitled')
+    link = article.get('link')
+
+    # Retrieve the conversion function, which includes LLM calls and validation
+    if fusha_text_to_convert:
+        print(f"-> Converting text for article: {title[:30]}...")
+
+        # Call the LLM-based dialect conversion function
+        dialect_text = convert_to_saudi_dialect(fusha_text_to_convert)
+
+        # 3. Create a new, enriched article dictionary
+        return {
+            "title": title,
+            "link": link,
+            "original_fusha_full_text": fusha_text_to_convert,
+            "saudi_dialect_full_text": dialect_text
+        }
+
+    # If, for some reason, the text is still missing
+    return {
+        "title": title,
+        "link": link,
+        "original_fusha_full_text": "",
+        "saudi_dialect_full_text": "No text found for conversion."
+    }
+
+
 @app.route('/api/scrape-and-convert', methods=['GET'])
 def scrape_and_convert():
     """
-    1. Scrapes news from AlRiyadh.
+    1. Scrapes news from the configured feeds.
     2. Converts the full article text from Fusha to Saudi Dialect.
     3. Returns the enriched data.
+
+    With ?stream=1 (or Accept: application/x-ndjson) every converted article is
+    sent as its own NDJSON line as soon as it is ready, followed by a summary line.
     """
     print("\n" + "=" * 50)
     print("Scrape-and-Convert endpoint called (Now processing full text!)")
@@ -113,7 +284,7 @@ def scrape_and_convert():
 
     try:
         # 1. SCRAPING PHASE
-        scraped_articles = scrape_alriyadh_news()  # Assuming this now returns the detailed JSON above
+        scraped_articles = scrape_feeds()  # Assuming this now returns the detailed JSON above
 
         if not scraped_articles:
             return jsonify({
@@ -121,38 +292,27 @@ def scrape_and_convert():
                 "message": "Scraping completed, but no articles were found."
             }), 200
 
-        processed_articles = []
+        if _wants_stream():
+            def generate():
+                count = 0
+                for article in scraped_articles:
+                    try:
+                        yield _ndjson_line(_convert_article(article))
+                        count += 1
+                    except Exception as e:
+                        print(f"Error converting article: {e}")
+                        yield _ndjson_line({"type": "error", "title": article.get('title'), "error": str(e)})
+                yield _ndjson_line({
+                    "type": "summary",
+                    "success": True,
+                    "total_scraped": len(scraped_articles),
+                    "total_processed": count
+                })
+
+            return _ndjson_response(generate())
 
         # 2. ITERATION & CONVERSION PHASE
-        for article in scraped_articles:
-            # *** CRITICAL CHANGE: Using the correct key from the scraper's output ***
-            fusha_text_to_convert = article.get('description_fusha', '')
-
-            title = article.get('title', 'Untitled')
-            link = article.get('link')
-
-            # Retrieve the conversion function, which includes LLM calls and validation
-            if fusha_text_to_convert:
-                print(f"-> Converting text for article: {title[:30]}...")
-
-                # Call the LLM-based dialect conversion function
-                dialect_text = convert_to_saudi_dialect(fusha_text_to_convert)
-
-                # 3. Create a new, enriched article dictionary
-                processed_articles.append({
-                    "title": title,
-                    "link": link,
-                    "original_fusha_full_text": fusha_text_to_convert,
-                    "saudi_dialect_full_text": dialect_text
-                })
-            else:
-                # If, for some reason, the text is still missing
-                processed_articles.append({
-                    "title": title,
-                    "link": link,
-                    "original_fusha_full_text": "",
-                    "saudi_dialect_full_text": "No text found for conversion."
-                })
+        processed_articles = [_convert_article(article) for article in scraped_articles]
 
         # 4. FINAL RESPONSE
         return jsonify({
@@ -167,22 +327,87 @@ def scrape_and_convert():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _stream_episodes(news_articles, force):
+    """
+    Run the pipeline in a background thread and yield each episode as an NDJSON
+    line the moment its upload finishes. Disconnecting clients cancel the run.
+    """
+    results = queue.Queue()
+    cancel_event = threading.Event()
+    done = object()
+
+    usage = RunUsage()
+
+    def run():
+        try:
+            process_articles(
+                news_articles,
+                on_result=lambda idx, episode: results.put(episode),
+                cancel_event=cancel_event,
+                force=force,
+                collect=False,
+                usage=usage
+            )
+        except Exception as e:
+            print(f"Error in streamed pipeline: {e}")
+            traceback.print_exc()
+            results.put({"type": "error", "error": str(e)})
+        finally:
+            results.put(done)
+
+    threading.Thread(target=run, name="stream-pipeline", daemon=True).start()
+
+    total_processed = 0
+    try:
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            if item.get("type") != "error":
+                total_processed += 1
+            yield _ndjson_line(item)
+
+        print(f"Pipeline Complete: {total_processed}/{len(news_articles)} episodes streamed")
+        yield _ndjson_line({
+            "type": "summary",
+            "success": True,
+            "total_scraped": len(news_articles),
+            "total_processed": total_processed,
+            "llm_usage": usage.to_dict()
+        })
+    finally:
+        cancel_event.set()
+
+
 @app.route('/api/scrape-and-process-all', methods=['POST'])
 def scrape_and_process_all():
     """
     Complete automated pipeline:
-    1. Scrape news from AlRiyadh
+    1. Scrape news from the configured feeds
     2. For each article: Convert to dialect + Generate audio + Upload to GCS
+       (stages overlap across articles, see pipeline_service)
     3. Return array of episode JSON ready for EpisodeAutomationService
+
+    Articles already processed in an earlier run are returned from the article
+    index; pass `force=1` to reprocess them. With ?stream=1 (or Accept:
+    application/x-ndjson) episodes are streamed as NDJSON lines as they finish.
+    With `if_changed=1` an unmodified feed (304 / same content) returns
+    `unchanged: true` right away, which makes frequent polling cheap.
     """
     try:
+        force = _get_flag('force')
+        if_changed = _get_flag('if_changed')
+
         print("\n" + "=" * 60)
         print("Full Automated Pipeline Started")
         print("=" * 60)
 
         # Step 1: Scrape news
-        print("Step 1: Scraping news from AlRiyadh...")
-        news_articles = scrape_alriyadh_news()
+        print("Step 1: Scraping news feeds...")
+        news_articles = scrape_feeds(only_if_changed=if_changed)
+
+        if news_articles is None:
+            return jsonify(_feed_unchanged_result())
 
         if not news_articles:
             return jsonify({
@@ -192,109 +417,12 @@ def scrape_and_process_all():
 
         print(f"Scraped {len(news_articles)} articles")
 
-        # Step 2: Process each article
-        processed_episodes = []
-
-        for idx, article in enumerate(news_articles, 1):
-            try:
-                print(f"\n--- Processing Article {idx}/{len(news_articles)} ---")
-                print(f"Title: {article['title'][:50]}...")
-
-                title = article['title']
-                fusha_text = article['description_fusha']
-                publication_date = article['date']
-                if publication_date:
-                    dt = parsedate_to_datetime(publication_date)
-                    publication_date = dt.isoformat()
-
-                print("Classifying article...")
-                classification_result = news_classifier_agent(title, fusha_text)
-
-                # Determine voice type: '1' (Serious) maps to 'serious', '0' (Normal/Default) maps to 'normal'
-                voice_type = 'serious' if classification_result == 1 else 'normal'
-                print(f"Classification: {classification_result} -> Voice: {voice_type}")
-
-                # Convert to dialect
-                print("Converting to Saudi dialect...")
-                dialect_script = convert_to_saudi_dialect(fusha_text)
-
-                if not dialect_script or "ERROR" in dialect_script:
-                    print(f"Skipping article (LLM failed)")
-                    continue
-
-                # Generate audio
-                print(f"Generating audio with **{voice_type.upper()}** voice...")
-                audio_filename = f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{voice_type}"
-                audio_path, audio_duration = generate_audio(dialect_script, audio_filename, voice_type=voice_type)
-
-                if not audio_path:
-                    print(f"Skipping article (TTS failed)")
-                    continue
-
-                print(f"Duration: {audio_duration} seconds")
-
-                # Save script to file
-                print("Saving script...")
-                script_filename = f"{audio_filename}_script.txt"
-                script_path = os.path.join(OUTPUT_DIR, script_filename)
-                with open(script_path, 'w', encoding='utf-8') as f:
-                    f.write(dialect_script)
-
-                # Save original content to file
-                content_filename = f"{audio_filename}_original.txt"
-                content_path = os.path.join(OUTPUT_DIR, content_filename)
-                with open(content_path, 'w', encoding='utf-8') as f:
-                    f.write(fusha_text)
-
-                # Upload to GCS
-                print("Uploading to Google Cloud Storage...")
-                audio_gcs_url = upload_to_gcs(
-                    audio_path,
-                    f"audio/{audio_filename}.wav"
-                )
-                script_gcs_url = upload_to_gcs(
-                    script_path,
-                    f"scripts/{script_filename}"
-                )
-                content_gcs_url = upload_to_gcs(
-                    content_path,
-                    f"content/{content_filename}"
-                )
-
-                # Cleanup local files
-                cleanup_local_files(audio_path, script_path, content_path)
-
-                # Build episode JSON
-                episode_json = {
-                    "article": {
-                        "title": title,
-                        "category": "news",
-                        "author": None,
-                        "publisher": "AlRiyadh",
-                        "publicationDate": publication_date,
-                        "contentRawUrl": content_gcs_url,
-                        "scriptUrl": script_gcs_url
-                    },
-                    "audio": {
-                        "duration": audio_duration,
-                        "format": "wav",
-                        "urlPath": audio_gcs_url
-                    },
-                    "episode": {
-                        "title": title,
-                        "description": f"بودكاست: {title}",
-                        "scriptUrlPath": script_gcs_url,
-                        "imageUrl": "https://i.imgur.com/WRPZCQa.png"
-                    }
-                }
-
-                processed_episodes.append(episode_json)
-                print(f"Article {idx} processed successfully")
-
-            except Exception as e:
-                print(f"Error processing article {idx}: {e}")
-                traceback.print_exc()
-                continue
+        if _wants_stream():
+            return _ndjson_response(_stream_episodes(news_articles, force))
+
+        # Step 2: Run LLM, TTS and upload stages concurrently across articles
+        usage = RunUsage()
+        processed_episodes = process_articles(news_articles, force=force, usage=usage)
 
         print("\n" + "=" * 60)
         print(f"Pipeline Complete: {len(processed_episodes)}/{len(news_articles)} episodes created")
@@ -304,7 +432,8 @@ def scrape_and_process_all():
             "success": True,
             "total_scraped": len(news_articles),
             "total_processed": len(processed_episodes),
-            "episodes": processed_episodes
+            "episodes": processed_episodes,
+            "llm_usage": usage.to_dict()
         })
 
     except Exception as e:
@@ -313,22 +442,140 @@ def scrape_and_process_all():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-if __name__ == '__main__':
-    print("\n" + "=" * 60)
-    print("Starting Agent Service on http://localhost:8001")
-    print("=" * 60)
+# ============ Background Jobs ============
+
+def _feed_unchanged_result():
+    """Result of a pipeline run with if_changed=true when the feed answered 304 / same content"""
+    print("Feed unchanged, nothing to process")
+    return {
+        "success": True,
+        "unchanged": True,
+        "total_scraped": 0,
+        "total_processed": 0,
+        "episodes": []
+    }
+
+
+def _run_pipeline_job(job, force=False, if_changed=False):
+    """Job body for /api/jobs/scrape-and-process-all, reports progress through job events"""
+    job.publish("progress", {"step": "scrape"})
+    news_articles = scrape_feeds(only_if_changed=if_changed)
+    if news_articles is None:
+        result = _feed_unchanged_result()
+        result.pop("success")
+        job.update_result(**result)
+        return
+    job.update_result(total_scraped=len(news_articles), total_processed=0, episodes=[])
+
+    if not news_articles:
+        raise RuntimeError("No articles scraped")
+
+    job.publish("progress", {"step": "process", "total": len(news_articles)})
+
+    def on_progress(item_idx, stage, status):
+        job.publish("article", {
+            "index": item_idx + 1,
+            "title": news_articles[item_idx].get('title'),
+            "stage": stage,
+            "status": status
+        })
+
+    def on_result(item_idx, episode):
+        job.publish("episode", {"index": item_idx + 1, "episode": episode})
+
+    usage = RunUsage()
+    episodes = process_articles(
+        news_articles,
+        on_result=on_result,
+        on_progress=on_progress,
+        cancel_event=job.cancel_event,
+        force=force,
+        usage=usage
+    )
+    job.update_result(total_processed=len(episodes), episodes=episodes, llm_usage=usage.to_dict())
+
+
+@app.route('/api/jobs/scrape-and-process-all', methods=['POST'])
+def submit_scrape_and_process_all_job():
+    """Start the full pipeline in the background and return a job id right away"""
+    force = _get_flag('force')
+    if_changed = _get_flag('if_changed')
+    job = job_registry.submit(
+        "scrape-and-process-all", lambda job: _run_pipeline_job(job, force=force, if_changed=if_changed)
+    )
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }), 202
+
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a job's status and (once finished) its episodes"""
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found or expired"}), 404
+
+    include_events = request.args.get('events', '0') == '1'
+    return jsonify({"success": True, **job.to_dict(include_events=include_events)})
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-Sent Events stream of per-article status and finished episodes"""
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found or expired"}), 404
+
+    # Validated here: once the generator runs, the 200 headers are already sent
+    try:
+        last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return Response(
+        sse_event_stream(job, last_event_id),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = job_registry.cancel(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found or expired"}), 404
+
+    return jsonify({"success": True, "job_id": job.id, "status": job.status})
+
+
+# ============ Startup ============
+
+def startup():
+    """Load the TTS models once; shared by the dev server and serve.py"""
     if openai_client:
         print("LLM client ready")
     else:
         print("WARNING: LLM client NOT initialized!")
 
-    tts_ready = initialize_tts()
+    initialize_tts()
     if is_tts_ready():  # Check using the new function
         print("TTS models ready")
     else:
         print("WARNING: TTS models NOT fully initialized!")
 
+
+if __name__ == '__main__':
+    # Development server only; production uses serve.py
+    print("\n" + "=" * 60)
+    print("Starting Agent Service on http://localhost:8001")
+    print("=" * 60)
+
+    startup()
+
     print("=" * 60 + "\n")
 
-    app.run(host='0.0.0.0', port=8001, debug=True, use_reloader=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=8001, debug=os.getenv("FLASK_DEBUG") == "1", use_reloader=False, threaded=True)
@@ -0,0 +1,161 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+
+import requests
+
+from config import (
+    ARTICLE_FETCH_WORKERS, ARTICLE_FETCH_TIMEOUT_SECONDS, ARTICLE_FETCH_DEADLINE_SECONDS,
+    ARTICLE_FETCH_PER_HOST_LIMIT, ARTICLE_MIN_BODY_CHARS
+)
+from http_cache import conditional_get, host_slot
+from metrics_service import ARTICLE_FETCHES
+
+_whitespace_re = re.compile(r'\s+')
+# Shared by all scrapes so fetch threads (and their pooled connections) are reused
+_fetch_pool = ThreadPoolExecutor(max_workers=ARTICLE_FETCH_WORKERS, thread_name_prefix="article-fetch")
+
+
+# ============ Main Body Extraction ============
+
+class _ParagraphCollector(HTMLParser):
+    """Collects the text of every <p>, grouped by the element that contains it"""
+    SKIP_TAGS = {"script", "style", "noscript", "template", "nav", "header", "footer", "aside", "form", "figcaption"}
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []  # open container ids
+        self.next_id = 0
+        self.skip_depth = 0
+        self.paragraph = None
+        self.containers = {}  # container id -> [paragraph texts]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            if tag == "br" and self.paragraph is not None:
+                self.paragraph.append(" ")
+            return
+        if self.skip_depth or tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if tag == "p":
+            self._close_paragraph()  # <p> may be left unclosed in HTML
+            self.paragraph = []
+            return
+        self.next_id += 1
+        self.stack.append((tag, self.next_id))
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        if self.skip_depth:
+            self.skip_depth -= 1
+            return
+        if tag == "p":
+            self._close_paragraph()
+            return
+        # Tolerate unclosed children: pop up to the matching open tag
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                del self.stack[depth:]
+                break
+
+    def handle_data(self, data):
+        if self.paragraph is not None and not self.skip_depth:
+            self.paragraph.append(data)
+
+    def _close_paragraph(self):
+        if self.paragraph is None:
+            return
+        text = _whitespace_re.sub(" ", "".join(self.paragraph)).strip()
+        self.paragraph = None
+        if text:
+            parent = self.stack[-1][1] if self.stack else 0
+            self.containers.setdefault(parent, []).append(text)
+
+    def close(self):
+        super().close()
+        self._close_paragraph()
+
+
+def extract_main_text(page_html: str) -> str:
+    """
+    Main article text of a page: the paragraphs of the container that holds
+    the most paragraph text, joined by blank lines. Navigation, headers,
+    footers, asides, forms and scripts are ignored. Empty string if none.
+    """
+    collector = _ParagraphCollector()
+    try:
+        collector.feed(page_html)
+        collector.close()
+    except Exception as e:
+        print(f"Could not parse article page: {e}")
+    if not collector.containers:
+        return ""
+    paragraphs = max(collector.containers.values(), key=lambda texts: sum(len(t) for t in texts))
+    return "\n\n".join(paragraphs)
+
+
+# ============ Concurrent Fetching ============
+
+def _decode(body: bytes) -> str:
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("cp1256", errors="replace")  # older Arabic sites
+
+
+def _fetch_body(url: str) -> str:
+    with host_slot("article", url, ARTICLE_FETCH_PER_HOST_LIMIT):
+        content, _ = conditional_get(url, kind="article", timeout=ARTICLE_FETCH_TIMEOUT_SECONDS)
+    return extract_main_text(_decode(content))
+
+
+def fetch_article_bodies(articles: list) -> list:
+    """
+    Replace each article's RSS description with the full text of its page
+
+    Pages are fetched concurrently (ARTICLE_FETCH_WORKERS threads, at most
+    ARTICLE_FETCH_PER_HOST_LIMIT per host) through the HTTP cache, so an
+    unchanged page is only revalidated. The RSS description is kept as
+    'summary'. Articles without a link, whose page fails, is too short or is
+    not ready within ARTICLE_FETCH_DEADLINE_SECONDS keep their description.
+    Articles are updated in place and returned.
+    """
+    futures = {}
+    for position, article in enumerate(articles):
+        article['summary'] = article['description_fusha']
+        if article.get('link'):
+            futures[_fetch_pool.submit(_fetch_body, article['link'])] = position
+    if not futures:
+        return articles
+
+    done, not_done = wait(futures, timeout=ARTICLE_FETCH_DEADLINE_SECONDS)
+    for future in not_done:
+        future.cancel()
+        ARTICLE_FETCHES.inc(result="timeout")
+
+    fetched = 0
+    for future in done:
+        article = articles[futures[future]]
+        try:
+            body = future.result()
+        except requests.Timeout:
+            print(f"Article fetch timed out, using the description: {article['link']}")
+            ARTICLE_FETCHES.inc(result="timeout")
+            continue
+        except Exception as e:
+            print(f"Article fetch failed, using the description: {article['link']} ({e})")
+            ARTICLE_FETCHES.inc(result="error")
+            continue
+        if len(body) < max(ARTICLE_MIN_BODY_CHARS, len(article['summary'])):
+            ARTICLE_FETCHES.inc(result="too_short")
+            continue
+        article['description_fusha'] = body
+        ARTICLE_FETCHES.inc(result="body")
+        fetched += 1
+
+    print(f"Fetched full text for {fetched}/{len(futures)} articles "
+          f"({len(not_done)} timed out, the rest use their description)")
+    return articles
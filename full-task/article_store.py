@@ -0,0 +1,123 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from config import ARTICLE_STORE_PATH, ARTICLE_STORE_RETENTION_DAYS
+from sqlite_util import thread_connection
+
+_whitespace_re = re.compile(r"\s+")
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+PRUNE_INTERVAL_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_articles (
+    fingerprint TEXT PRIMARY KEY,
+    title TEXT,
+    episode_json TEXT NOT NULL,
+    audio_url TEXT,
+    script_url TEXT,
+    content_url TEXT,
+    processed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_processed_at ON processed_articles (processed_at);
+"""
+
+
+# ============ Connection Handling ============
+
+def _get_connection():
+    """This thread's connection to the processed-article index; a new one prunes expired entries"""
+    return thread_connection(ARTICLE_STORE_PATH, _SCHEMA, on_open=lambda conn: prune_expired())
+
+
+# ============ Fingerprints ============
+
+def _normalize(text):
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    return _whitespace_re.sub(" ", text).strip().lower()
+
+
+def article_fingerprint(article: dict) -> str:
+    """
+    Stable hash of title + feed description + pubDate, insensitive to whitespace/Unicode form.
+    Uses the RSS 'summary' when the full page was fetched, so the fingerprint does not
+    depend on whether that fetch succeeded.
+    """
+    parts = [
+        _normalize(article.get('title')),
+        _normalize(article.get('summary') or article.get('description_fusha')),
+        _normalize(article.get('date'))
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+# ============ Lookup and Recording ============
+
+def get_processed_episode(fingerprint: str):
+    """Return the stored episode JSON for a fingerprint, or None if the article is new"""
+    try:
+        row = _get_connection().execute(
+            "SELECT episode_json FROM processed_articles WHERE fingerprint = ?",
+            (fingerprint,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Article index lookup failed: {e}")
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def record_processed_episode(fingerprint: str, episode_json: dict):
+    """Store a finished episode so later runs can reuse it instead of reprocessing"""
+    audio = episode_json.get("audio", {})
+    article = episode_json.get("article", {})
+    try:
+        conn = _get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed_articles "
+                "(fingerprint, title, episode_json, audio_url, script_url, content_url, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    article.get("title"),
+                    json.dumps(episode_json, ensure_ascii=False),
+                    audio.get("urlPath"),
+                    article.get("scriptUrl"),
+                    article.get("contentRawUrl"),
+                    time.time()
+                )
+            )
+    except sqlite3.Error as e:
+        print(f"Could not record article in index: {e}")
+        return
+    prune_expired()
+
+
+def prune_expired(force: bool = False):
+    """Evict entries older than ARTICLE_STORE_RETENTION_DAYS (at most once per PRUNE_INTERVAL_SECONDS)"""
+    global _last_prune
+
+    now = time.time()
+    with _prune_lock:
+        if not force and now - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = now
+
+    cutoff = now - ARTICLE_STORE_RETENTION_DAYS * 86400
+    try:
+        conn = _get_connection()
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM processed_articles WHERE processed_at < ?", (cutoff,)
+            ).rowcount
+        if deleted:
+            print(f"Article index: evicted {deleted} entries older than {ARTICLE_STORE_RETENTION_DAYS} days")
+    except sqlite3.Error as e:
+        print(f"Article index pruning failed: {e}")
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+
+from config import AUDIO_CACHE_ENABLED, AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, AUDIO_CACHE_DTYPE
+from metrics_service import TTS_AUDIO_CACHE_REQUESTS, TTS_AUDIO_CACHE_BYTES
+from sqlite_util import thread_connection
+
+_whitespace_re = re.compile(r"\s+")
+_INDEX_PATH = os.path.join(AUDIO_CACHE_DIR, "index.sqlite3")
+_SAMPLE_BYTES = 1 << 20  # head and tail read when fingerprinting a checkpoint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio_cache (
+    key TEXT PRIMARY KEY,
+    voice TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audio_cache_last_access ON audio_cache (last_access);
+"""
+
+
+# ============ Model Identity ============
+
+def file_fingerprint(path: str, sample_only: bool = False) -> str:
+    """
+    SHA-256 of a file, or of its size, head and tail when `sample_only` is set
+    (checkpoints are gigabytes; a retrained one differs in size or in both ends).
+    """
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if sample_only and size > 2 * _SAMPLE_BYTES:
+            digest.update(str(size).encode())
+            digest.update(f.read(_SAMPLE_BYTES))
+            f.seek(-_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(_SAMPLE_BYTES))
+        else:
+            for block in iter(lambda: f.read(_SAMPLE_BYTES), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(text: str, voice_type: str, model_identity, temperature: float, speed: float) -> str:
+    """
+    Content address of a synthesized chunk: whitespace-normalized text + everything
+    that changes the audio. `model_identity` is (checkpoint fingerprint, speaker
+    reference fingerprint). Diacritics are kept; they change the pronunciation.
+    """
+    normalized = _whitespace_re.sub(" ", text).strip()
+    payload = json.dumps(
+        [normalized, voice_type, *model_identity, round(temperature, 4), round(speed, 4), AUDIO_CACHE_DTYPE],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ============ Index ============
+
+def _get_connection():
+    """This thread's connection to the audio cache index"""
+    return thread_connection(_INDEX_PATH, _SCHEMA)
+
+
+def _path(key: str) -> str:
+    return os.path.join(AUDIO_CACHE_DIR, key[:2], f"{key}.npy")
+
+
+def _remove_files(keys):
+    for key in keys:
+        try:
+            os.remove(_path(key))
+        except FileNotFoundError:
+            pass
+
+
+# ============ Get / Put ============
+
+def cache_get(key: str, voice_type: str):
+    """
+    Return the cached waveform as a 1-D float32 numpy array, or None.
+
+    The .npy file is memory-mapped, so only the conversion to float32 reads it.
+    """
+    if not AUDIO_CACHE_ENABLED:
+        return None
+
+    wav = None
+    try:
+        conn = _get_connection()
+        row = conn.execute("SELECT 1 FROM audio_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            try:
+                stored = np.load(_path(key), mmap_mode="r")
+                wav = stored.astype(np.float32)
+                if stored.dtype == np.int16:
+                    wav /= 32767
+            except (OSError, ValueError) as e:
+                print(f"Audio cache entry unreadable, dropping it: {e}")
+                with conn:
+                    conn.execute("DELETE FROM audio_cache WHERE key = ?", (key,))
+            else:
+                with conn:
+                    conn.execute("UPDATE audio_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+    except sqlite3.Error as e:
+        print(f"Audio cache lookup failed: {e}")
+
+    TTS_AUDIO_CACHE_REQUESTS.inc(voice=voice_type, result="hit" if wav is not None else "miss")
+    return wav
+
+
+def cache_put(key: str, voice_type: str, wav):
+    """Store a chunk waveform (float in [-1, 1]) and evict least recently used chunks above the size limit"""
+    if not AUDIO_CACHE_ENABLED:
+        return
+
+    wav = np.asarray(wav, dtype=np.float32).reshape(-1)
+    if AUDIO_CACHE_DTYPE == "int16":
+        stored = (np.clip(wav, -1.0, 1.0) * 32767).astype(np.int16)
+    else:
+        stored = wav.astype(np.float16)
+
+    path = _path(key)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    now = time.time()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            np.save(f, stored)
+        os.replace(tmp_path, path)  # readers never see a half-written file
+        size = os.path.getsize(path)
+
+        conn = _get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO audio_cache (key, voice, bytes, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, voice_type, size, now, now)
+            )
+            evicted = _evict(conn)
+        _remove_files(evicted)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Audio cache write failed: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _evict(conn):
+    """Drop least recently used rows until the cache fits AUDIO_CACHE_MAX_BYTES; returns their keys"""
+    total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM audio_cache").fetchone()[0]
+    evicted = []
+    if total > AUDIO_CACHE_MAX_BYTES:
+        for key, size in conn.execute("SELECT key, bytes FROM audio_cache ORDER BY last_access"):
+            evicted.append(key)
+            total -= size
+            if total <= AUDIO_CACHE_MAX_BYTES:
+                break
+        conn.executemany("DELETE FROM audio_cache WHERE key = ?", [(key,) for key in evicted])
+    TTS_AUDIO_CACHE_BYTES.set(total)
+    return evicted
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import BATCH_LLM_WORKERS
+from llm_service import convert_to_saudi_dialect
+from tts_service import generate_audio
+
+
+# ============ Item Helpers ============
+
+def _convert_item(item):
+    text = item.get('text', '')
+    if not text:
+        return {"success": False, "error": "No text provided"}
+
+    dialect_text = convert_to_saudi_dialect(text)
+    if not dialect_text or "ERROR" in dialect_text:
+        return {"success": False, "error": dialect_text or "Dialect conversion failed"}
+
+    return {"success": True, "dialect": dialect_text}
+
+
+def _generate_audio_item(item):
+    text = item.get('text', '')
+    if not text:
+        return {"success": False, "error": "No text provided"}
+
+    audio_path, duration = generate_audio(text, item.get('name'), voice_type=item.get('voice_type') or 'normal')
+    if not audio_path:
+        return {"success": False, "error": "Audio generation failed"}
+
+    return {"success": True, "audio_path": audio_path, "duration": duration}
+
+
+def _with_index(idx, item, result):
+    result = {"index": idx, **result}
+    if item.get('name') is not None:
+        result["name"] = item['name']
+    return result
+
+
+# ============ Batch Runners ============
+
+def iter_dialect_batch(items, max_workers=BATCH_LLM_WORKERS):
+    """Convert many texts in parallel; yields per-item results as they complete"""
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = {executor.submit(_convert_item, item): idx for idx, item in enumerate(items)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            yield _with_index(idx, items[idx], result)
+
+
+def iter_audio_batch(items):
+    """
+    Synthesize many texts, grouped by voice so the same model stays hot.
+    Synthesis is serialized on the TTS inference thread anyway, so items run one
+    after another; yields per-item results as each one finishes.
+    """
+    order = sorted(range(len(items)), key=lambda idx: str(items[idx].get('voice_type') or 'normal'))
+    for idx in order:
+        try:
+            result = _generate_audio_item(items[idx])
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        yield _with_index(idx, items[idx], result)
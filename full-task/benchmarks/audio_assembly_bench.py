@@ -0,0 +1,104 @@
+"""
+Microbenchmark of chunk assembly in tts_arabic: assemble_audio (one buffer,
+overlap-add) against the previous loop, which copied each chunk into a new
+tensor on the model device and folded crossfade_audio over the growing result.
+
+Chunks are random float32 numpy arrays like Xtts.inference returns, with
+lengths drawn around a typical ~166-character chunk (6-14 s at 24 kHz).
+Reports seconds per assembly (best of --repeat) for each chunk count and the
+largest sample difference between the two.
+
+    cd full-task
+    python benchmarks/audio_assembly_bench.py --chunks 100,200,400
+    python benchmarks/audio_assembly_bench.py --device cuda
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+
+from tts_service import CROSSFADE_MS, SAMPLE_RATE, assemble_audio, crossfade_audio  # noqa: E402
+
+
+def legacy_assemble(wavs, device):
+    """The tts_arabic chunk handling before assemble_audio, kept here for comparison"""
+    audio_chunks = []
+    for wav in wavs:
+        wav_data = torch.tensor(wav, dtype=torch.float32)
+        if wav_data.ndim == 1:
+            wav_data = wav_data.unsqueeze(0)
+        audio_chunks.append(wav_data.to(device))
+
+    combined_audio = audio_chunks[0]
+    for next_chunk in audio_chunks[1:]:
+        combined_audio = crossfade_audio(combined_audio, next_chunk, CROSSFADE_MS, SAMPLE_RATE)
+    return combined_audio.cpu()
+
+
+def single_buffer_assemble(wavs, device):
+    return assemble_audio([torch.as_tensor(wav) for wav in wavs], CROSSFADE_MS, SAMPLE_RATE)
+
+
+def measure(assemble, wavs, device, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        combined = assemble(wavs, device)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, combined
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", default="100,200,400", help="comma-separated chunk counts")
+    parser.add_argument("--device", default="cpu", help="device the legacy path moved chunks to (cpu / cuda)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per assembler (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    device = torch.device(args.device)
+    rng = np.random.default_rng(args.seed)
+
+    results = []
+    for count in (int(c) for c in args.chunks.split(",")):
+        wavs = [
+            rng.uniform(-0.5, 0.5, int(rng.uniform(6, 14) * SAMPLE_RATE)).astype(np.float32)
+            for _ in range(count)
+        ]
+        legacy_seconds, legacy = measure(legacy_assemble, wavs, device, args.repeat)
+        new_seconds, combined = measure(single_buffer_assemble, wavs, device, args.repeat)
+        results.append({
+            "chunks": count,
+            "audio_minutes": round(combined.shape[1] / SAMPLE_RATE / 60, 1),
+            "legacy_seconds": round(legacy_seconds, 4),
+            "single_buffer_seconds": round(new_seconds, 4),
+            "speedup": round(legacy_seconds / new_seconds, 1) if new_seconds else None,
+            "max_abs_diff": float((legacy - combined).abs().max()) if legacy.shape == combined.shape else None,
+        })
+
+    print(f"{'chunks':>6} {'audio min':>9} {'legacy s':>9} {'buffer s':>9} {'speedup':>8} {'max diff':>9}")
+    for row in results:
+        diff = "length!" if row["max_abs_diff"] is None else f"{row['max_abs_diff']:.2g}"
+        print(f"{row['chunks']:>6} {row['audio_minutes']:>9} {row['legacy_seconds']:>9} "
+              f"{row['single_buffer_seconds']:>9} {row['speedup']:>8} {diff:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"device": args.device, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Microbenchmark of feed parsing: the streaming parser in feed_sources.py
+against the previous implementation (ET.fromstring over the whole document
+plus one BeautifulSoup object per HTML description).
+
+Feeds are recorded RSS files. The recorded fixture is small, so by default its
+items are repeated into a synthetic feed of --items items. Both parsers read
+the same bytes; the run reports items/second (best of --repeat) and the
+peak Python heap used while parsing (tracemalloc), and checks that both
+produce the same articles.
+
+    cd full-task
+    python benchmarks/feed_parse_bench.py --items 20000
+    python benchmarks/feed_parse_bench.py recorded_feed1.xml recorded_feed2.xml
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+from feed_sources import RssSource  # noqa: E402
+
+DEFAULT_FEED_FIXTURE = os.path.join(BENCH_DIR, "fixtures", "alriyadh_columns.xml")
+_item_re = re.compile(rb"<item>.*?</item>", re.S)
+
+
+def legacy_parse(content: bytes) -> list:
+    """The scraper's item loop before the streaming parser, kept here for comparison"""
+    from bs4 import BeautifulSoup
+
+    root = ET.fromstring(content)
+    news_data = []
+    for item in root.findall('.//item'):
+        title_elem = item.find('title')
+        title_text = title_elem.text if title_elem is not None else "No title"
+        if title_text and title_text.startswith('<![CDATA['):
+            title_text = title_text[9:-3]
+        description_elem = item.find('description')
+        description_text = description_elem.text if description_elem is not None else ""
+        if description_text and description_text.startswith('<![CDATA['):
+            description_text = description_text[9:-3]
+        pub_date_elem = item.find('pubDate')
+        pub_date_text = pub_date_elem.text if pub_date_elem is not None else ""
+        if description_text and "<" in description_text:
+            description_text = BeautifulSoup(description_text, 'html.parser').get_text()
+        description_text = re.sub(r'\s+', ' ', description_text if description_text else "").strip()
+        if description_text and len(description_text) > 50:
+            news_data.append({
+                'title': title_text.strip() if title_text else "",
+                'description_fusha': description_text,
+                'date': pub_date_text
+            })
+    return news_data
+
+
+def synthetic_feed(fixture_path: str, items: int) -> bytes:
+    """The fixture's channel with its items repeated (numbered titles) up to `items`"""
+    with open(fixture_path, "rb") as f:
+        content = f.read()
+    recorded = _item_re.findall(content)
+    head = content[:content.index(recorded[0])]
+    tail = content[content.rindex(recorded[-1]) + len(recorded[-1]):]
+    body = []
+    for i in range(items):
+        body.append(recorded[i % len(recorded)].replace(b"<title><![CDATA[", f"<title><![CDATA[{i} ".encode(), 1))
+    return head + b"\n".join(body) + tail
+
+
+def measure(parse, content: bytes, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        articles = parse(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "articles": len(articles),
+        "seconds": round(best, 4),
+        "items_per_second": round(len(articles) / best) if best else None,
+        "peak_mib": round(peak / 2 ** 20, 2),
+    }, articles
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("feeds", nargs="*", help="recorded RSS files (default: synthetic feed from the fixture)")
+    parser.add_argument("--items", type=int, default=20000, help="items in the synthetic feed")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per parser (best is reported)")
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.feeds:
+        feeds = []
+        for path in args.feeds:
+            with open(path, "rb") as f:
+                feeds.append((os.path.basename(path), f.read()))
+    else:
+        feeds = [(f"synthetic-{args.items}", synthetic_feed(DEFAULT_FEED_FIXTURE, args.items))]
+
+    source = RssSource(name="bench", url="http://bench/feed.xml", publisher="bench")
+    results = []
+    for name, content in feeds:
+        streaming, new_articles = measure(source.parse, content, args.repeat)
+        row = {"feed": name, "bytes": len(content), "streaming": streaming}
+        try:
+            legacy, old_articles = measure(legacy_parse, content, args.repeat)
+        except ImportError:
+            print("beautifulsoup4 is not installed, skipping the legacy parser")
+        else:
+            row["legacy"] = legacy
+            row["same_output"] = [
+                (a['title'], a['description_fusha'], a['date']) for a in new_articles
+            ] == [(a['title'], a['description_fusha'], a['date']) for a in old_articles]
+            row["speedup"] = round(legacy["seconds"] / streaming["seconds"], 2) if streaming["seconds"] else None
+        results.append(row)
+
+    print(f"{'feed':<24} {'parser':<10} {'articles':>9} {'items/s':>10} {'peak MiB':>9}")
+    for row in results:
+        for parser_name in ("legacy", "streaming"):
+            if parser_name in row:
+                r = row[parser_name]
+                print(f"{row['feed']:<24} {parser_name:<10} {r['articles']:>9} {r['items_per_second']:>10} "
+                      f"{r['peak_mib']:>9}")
+        if "speedup" in row:
+            print(f"{'':<24} speedup x{row['speedup']}, same output: {row['same_output']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Offline evaluation of the local Najdi validator (najdi_validator.py).
+
+Reads a labelled JSONL file, one {"text": ..., "label": "najdi"|"fusha"} per
+line (a boolean "is_najdi" field also works), and reports accuracy,
+precision and recall on the texts the local scorer decided, how many it left
+to the LLM validator, and the per-text scoring time. A threshold sweep shows
+how moving NAJDI_ACCEPT_THRESHOLD / NAJDI_REJECT_THRESHOLD trades LLM calls
+for accuracy.
+
+    cd full-task
+    python benchmarks/najdi_validator_eval.py benchmarks/fixtures/najdi_samples.jsonl
+
+With --train-profile the same file is used to build a character trigram
+profile that can be loaded through NAJDI_NGRAM_PROFILE_PATH.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+import najdi_validator  # noqa: E402
+from config import NAJDI_ACCEPT_THRESHOLD, NAJDI_REJECT_THRESHOLD  # noqa: E402
+
+DEFAULT_SAMPLES = os.path.join(BENCH_DIR, "fixtures", "najdi_samples.jsonl")
+SWEEP = ((0.9, 0.1), (0.8, 0.2), (0.7, 0.3), (0.6, 0.4), (0.5, 0.5))
+
+
+def load_samples(path):
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "is_najdi" in record:
+                label = bool(record["is_najdi"])
+            else:
+                label = str(record.get("label", "")).lower() == "najdi"
+            samples.append((record["text"], label))
+    return samples
+
+
+def evaluate(scored, accept, reject):
+    """Metrics over (score, label) pairs for one pair of thresholds"""
+    tp = fp = tn = fn = abstained = 0
+    for score, label in scored:
+        if score >= accept:
+            tp, fp = (tp + 1, fp) if label else (tp, fp + 1)
+        elif score <= reject:
+            fn, tn = (fn + 1, tn) if label else (fn, tn + 1)
+        else:
+            abstained += 1
+    decided = tp + fp + tn + fn
+    return {
+        "accept_threshold": accept,
+        "reject_threshold": reject,
+        "decided": decided,
+        "abstain_rate": round(abstained / len(scored), 3) if scored else None,
+        "accuracy": round((tp + tn) / decided, 3) if decided else None,
+        "precision": round(tp / (tp + fp), 3) if tp + fp else None,
+        "recall": round(tp / (tp + fn), 3) if tp + fn else None,
+        "false_accepts": fp,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", nargs="?", default=DEFAULT_SAMPLES, help="labelled JSONL file")
+    parser.add_argument("--train-profile", metavar="PATH", help="write a trigram profile built from the samples")
+    parser.add_argument("--repeat", type=int, default=20, help="scoring passes used for the timing figure")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    samples = load_samples(args.samples)
+    if not samples:
+        sys.exit(f"No samples in {args.samples}")
+
+    if args.train_profile:
+        profile = najdi_validator.build_ngram_profile(
+            [text for text, label in samples if label],
+            [text for text, label in samples if not label]
+        )
+        with open(args.train_profile, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False)
+        print(f"Wrote {len(profile)} trigrams to {args.train_profile} "
+              f"(set NAJDI_NGRAM_PROFILE_PATH to use it)")
+        return
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        scored = [(najdi_validator.najdi_score(text), label) for text, label in samples]
+    per_text_us = (time.perf_counter() - start) / (args.repeat * len(samples)) * 1e6
+
+    current = evaluate(scored, NAJDI_ACCEPT_THRESHOLD, NAJDI_REJECT_THRESHOLD)
+    print(f"{len(samples)} samples, {per_text_us:.1f} µs per text")
+    print(f"Current thresholds: {json.dumps(current)}")
+    print("\naccept  reject  abstain  accuracy  precision  recall  false_accepts")
+    for accept, reject in SWEEP:
+        row = evaluate(scored, accept, reject)
+        print(f"{accept:<7} {reject:<7} {row['abstain_rate']!s:<8} {row['accuracy']!s:<9} "
+              f"{row['precision']!s:<10} {row['recall']!s:<7} {row['false_accepts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Offline end-to-end benchmark for POST /api/scrape-and-process-all.
+
+Runs the real Flask app, scraper and pipeline against local stand-ins
+(fake OpenAI server, fake Xtts, local-directory GCS, recorded RSS fixture),
+so throughput changes can be measured without OpenAI credits or a GPU.
+
+    cd full-task
+    python benchmarks/pipeline_bench.py --tts-rtf 0.3 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stand_ins import (  # noqa: E402
+    DEFAULT_FEED_FIXTURE, FakeLLMConfig, FakeXtts, LocalStorageClient, start_fake_server
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def first_audio_mean(histogram):
+    """Mean of a histogram over all label sets, from its running sums"""
+    with histogram._lock:
+        series = list(histogram._series.values())
+    count = sum(sum(counts) for counts, _ in series)
+    return round(sum(total for _, total in series) / count, 3) if count else None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feed", default=DEFAULT_FEED_FIXTURE, help="RSS fixture served in place of AlRiyadh")
+    parser.add_argument("--generator-latency", type=float, default=2.0, help="seconds per dialect generation call")
+    parser.add_argument("--short-latency", type=float, default=0.4, help="seconds per classifier/validator call")
+    parser.add_argument("--validator-reject-rate", type=float, default=0.1)
+    parser.add_argument("--tts-rtf", type=float, default=0.3, help="fake XTTS real-time factor")
+    parser.add_argument("--llm-workers", type=int, default=None)
+    parser.add_argument("--tts-workers", type=int, default=None)
+    parser.add_argument("--upload-workers", type=int, default=None)
+    parser.add_argument("--stream-tts", action="store_true", help="stream dialect output into TTS (PIPELINE_STREAM_TTS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output_path = os.path.abspath(args.output) if args.output else None
+    feed_path = os.path.abspath(args.feed)
+
+    llm_config = FakeLLMConfig(
+        generator_latency=args.generator_latency,
+        short_latency=args.short_latency,
+        validator_reject_rate=args.validator_reject_rate,
+        seed=args.seed
+    )
+    server, base_url = start_fake_server(llm_config, feed_path)
+
+    # Everything the app writes (audio, index, model cache) goes to a scratch dir
+    workdir = tempfile.mkdtemp(prefix="pipeline-bench-")
+    os.chdir(workdir)
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "ALRIYADH_FEED_URL": f"{base_url}/feed.xml",
+        "ARTICLE_STORE_PATH": os.path.join(workdir, "article_index.sqlite3"),
+        "TTS_S3_CACHE": os.path.join(workdir, ".cache"),
+    })
+    if args.stream_tts:
+        os.environ["PIPELINE_STREAM_TTS"] = "true"
+    for name, value in (("PIPELINE_LLM_WORKERS", args.llm_workers),
+                        ("PIPELINE_TTS_WORKERS", args.tts_workers),
+                        ("PIPELINE_UPLOAD_WORKERS", args.upload_workers)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    import app
+    import config
+    import metrics_service
+    import pipeline_service
+    import storage_service
+    import tts_service
+
+    fake_model = FakeXtts(rtf=args.tts_rtf)
+    tts_service.device = "cpu"
+    tts_service.tts_models.update({"normal": fake_model, "serious": fake_model})
+    tts_service.model_latents.update({"normal": (None, None), "serious": (None, None)})
+    storage_service.gcs_client = LocalStorageClient(os.path.join(workdir, "gcs"))
+
+    # Per-article latency: from entering the LLM stage to leaving the upload stage
+    started, finished = {}, {}
+    lock = threading.Lock()
+    llm_stage, upload_stage = pipeline_service._llm_stage, pipeline_service._upload_stage
+    stream_stage = pipeline_service._stream_stage
+
+    def timed_llm_stage(work):
+        with lock:
+            started[work['index']] = time.perf_counter()
+        return llm_stage(work)
+
+    def timed_stream_stage(work):
+        with lock:
+            started[work['index']] = time.perf_counter()
+        return stream_stage(work)
+
+    def timed_upload_stage(work):
+        result = upload_stage(work)
+        if result is not None:
+            with lock:
+                finished[work['index']] = time.perf_counter()
+        return result
+
+    pipeline_service._llm_stage = timed_llm_stage
+    pipeline_service._stream_stage = timed_stream_stage
+    pipeline_service._upload_stage = timed_upload_stage
+
+    client = app.app.test_client()
+    start = time.perf_counter()
+    response = client.post("/api/scrape-and-process-all?force=1")
+    wall_seconds = time.perf_counter() - start
+    server.shutdown()
+
+    body = response.get_json() or {}
+    latencies = [round(finished[idx] - started[idx], 3) for idx in finished if idx in started]
+    processed = body.get("total_processed", 0)
+
+    results = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "generator_latency": args.generator_latency,
+            "short_latency": args.short_latency,
+            "validator_reject_rate": args.validator_reject_rate,
+            "tts_rtf": args.tts_rtf,
+            "llm_workers": config.PIPELINE_LLM_WORKERS,
+            "tts_workers": config.PIPELINE_TTS_WORKERS,
+            "upload_workers": config.PIPELINE_UPLOAD_WORKERS,
+            "stream_tts": config.PIPELINE_STREAM_TTS,
+            "feed": os.path.basename(args.feed),
+        },
+        "status_code": response.status_code,
+        "total_scraped": body.get("total_scraped", 0),
+        "total_processed": processed,
+        "wall_seconds": round(wall_seconds, 3),
+        "articles_per_minute": round(processed / wall_seconds * 60, 2) if wall_seconds else None,
+        "latency_p50_seconds": percentile(latencies, 50),
+        "latency_p95_seconds": percentile(latencies, 95),
+        "first_audio_mean_seconds": first_audio_mean(metrics_service.TTS_FIRST_AUDIO_SECONDS),
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource else None,
+        "llm_calls": dict(llm_config.calls),
+        "llm_usage": (body.get("llm_usage") or {}).get("total"),
+    }
+
+    print("\n" + "=" * 60)
+    print(f"Processed {processed}/{results['total_scraped']} articles in {wall_seconds:.1f}s "
+          f"({results['articles_per_minute']} articles/min)")
+    print(f"Per-article latency p50={results['latency_p50_seconds']} p95={results['latency_p95_seconds']}")
+    print(f"Mean time to first audio chunk: {results['first_audio_mean_seconds']}s")
+    print(f"Peak RSS: {results['peak_rss_mb']} MB")
+    print("=" * 60)
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {output_path}")
+    else:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
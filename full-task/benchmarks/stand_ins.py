@@ -0,0 +1,275 @@
+"""
+Local stand-ins for the external services used by the pipeline:
+an OpenAI-compatible chat server (that also serves the recorded RSS fixture
+and a fake page for every article in it),
+an Xtts-like model with a configurable real-time factor, and a GCS client that
+writes into a local directory.
+"""
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_FEED_FIXTURE = os.path.join(FIXTURES_DIR, "alriyadh_columns.xml")
+
+# Rough speaking rate of the fine-tuned voices, used to size fake audio
+CHARS_PER_SECOND = 14
+SAMPLE_RATE = 24000
+
+# Cheap Fusha -> Najdi substitutions so fake generator output looks converted
+_NAJDI_REPLACEMENTS = (
+    ("هذه", "هذي"), ("الذي", "اللي"), ("التي", "اللي"), ("لماذا", "ليش"),
+    ("ماذا", "وش"), ("يريد", "يبي"), ("نحن", "حنا"), ("ليس", "مب"),
+)
+
+
+# ============ Fake OpenAI-compatible server ============
+
+class FakeLLMConfig:
+    def __init__(self, generator_latency=2.0, short_latency=0.4, validator_reject_rate=0.1,
+                 jitter=0.2, seed=0):
+        self.generator_latency = generator_latency
+        self.short_latency = short_latency
+        self.validator_reject_rate = validator_reject_rate
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {"generator": 0, "validator": 0, "classifier": 0, "classifier_batch": 0, "combined": 0}
+
+    def sleep_for(self, base):
+        with self.lock:
+            factor = 1 + self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, base * factor))
+
+    def chance(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+
+def _detect_role(system_prompt):
+    if "confidence" in system_prompt:
+        return "combined"
+    if "is_najde" in system_prompt:
+        return "validator"
+    if "classifications" in system_prompt:
+        return "classifier_batch"
+    if "classification" in system_prompt:
+        return "classifier"
+    return "generator"
+
+
+def _fake_dialect(user_prompt):
+    text = user_prompt.split("\n\n", 1)[-1]
+    for fusha, najdi in _NAJDI_REPLACEMENTS:
+        text = text.replace(fusha, najdi)
+    return "وش السالفة؟ " + text
+
+
+_item_page_re = re.compile(rb"<link>https?://[^<]*?/(\d+)</link>\s*<description><!\[CDATA\[(.*?)\]\]>", re.S)
+_feed_link_re = re.compile(rb"<link>https?://[^<]*?/(\d+)</link>")
+
+
+def _article_pages(feed):
+    """Fake article pages per feed link id: site chrome around the item's paragraphs, twice over"""
+    pages = {}
+    for article_id, description in _item_page_re.findall(feed):
+        pages[article_id.decode()] = (
+            "<html><head><title>article</title><script>var ads = 1;</script></head><body>"
+            "<header><nav><p>الرئيسية</p></nav></header><article><div class=\"body\">".encode()
+            + description + description
+            + b"</div></article><aside><p>related</p></aside><footer><p>footer</p></footer></body></html>"
+        )
+    return pages
+
+
+def _make_handler(llm_config, feed_path):
+    with open(feed_path, "rb") as f:
+        feed = f.read()
+    pages = _article_pages(feed)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/feed.xml"):
+                # Item links point back at this server's article pages
+                base = f"http://{self.headers.get('Host')}/article/".encode()
+                body = _feed_link_re.sub(lambda m: b"<link>" + base + m.group(1) + b"</link>", feed)
+                self._send(200, body, "application/rss+xml; charset=utf-8")
+            elif self.path.startswith("/article/") and self.path[len("/article/"):] in pages:
+                self._send(200, pages[self.path[len("/article/"):]], "text/html; charset=utf-8")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def _stream(self, request, content):
+            """Server-sent chat.completion.chunk events, spreading generator_latency over the words"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(payload):
+                self.wfile.write(b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            words = content.split(" ")
+            base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model", "fake")}
+            for i, word in enumerate(words):
+                llm_config.sleep_for(llm_config.generator_latency / len(words))
+                delta = word if i == 0 else " " + word
+                event(dict(base, choices=[{"index": 0, "delta": {"content": delta}, "finish_reason": None}]))
+            event(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+            tokens = len(content) // 3
+            event(dict(base, choices=[], usage={
+                "prompt_tokens": tokens, "completion_tokens": tokens, "total_tokens": 2 * tokens
+            }))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, b"{}", "application/json")
+                return
+
+            messages = request.get("messages", [])
+            system_prompt = messages[0]["content"] if messages else ""
+            user_prompt = messages[-1]["content"] if messages else ""
+            role = _detect_role(system_prompt)
+            with llm_config.lock:
+                llm_config.calls[role] += 1
+
+            if role == "validator":
+                llm_config.sleep_for(llm_config.short_latency)
+                content = json.dumps({"is_najde": not llm_config.chance(llm_config.validator_reject_rate)})
+            elif role == "classifier_batch":
+                llm_config.sleep_for(llm_config.short_latency)
+                ids = re.findall(r"^\[(\d+)\]", user_prompt, re.MULTILINE)
+                content = json.dumps({"classifications": {
+                    item_id: 1 if llm_config.chance(0.3) else 0 for item_id in ids
+                }})
+            elif role == "classifier":
+                llm_config.sleep_for(llm_config.short_latency)
+                content = json.dumps({"classification": 1 if llm_config.chance(0.3) else 0})
+            elif role == "combined":
+                # Low self-reported confidence at the same rate the validator would reject
+                llm_config.sleep_for(llm_config.generator_latency)
+                confident = not llm_config.chance(llm_config.validator_reject_rate)
+                content = json.dumps({
+                    "classification": 1 if llm_config.chance(0.3) else 0,
+                    "script": _fake_dialect(user_prompt),
+                    "confidence": 0.95 if confident else 0.4
+                }, ensure_ascii=False)
+            elif request.get("stream"):
+                try:
+                    self._stream(request, _fake_dialect(user_prompt))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client stopped reading (e.g. the rolling validator rejected the prefix)
+                return
+            else:
+                llm_config.sleep_for(llm_config.generator_latency)
+                content = _fake_dialect(user_prompt)
+
+            prompt_tokens = (len(system_prompt) + len(user_prompt)) // 3
+            completion_tokens = len(content) // 3
+            body = json.dumps({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }, ensure_ascii=False).encode("utf-8")
+            self._send(200, body, "application/json")
+
+    return Handler
+
+
+def start_fake_server(llm_config, feed_path=DEFAULT_FEED_FIXTURE):
+    """Start the fake OpenAI + RSS server on a free port. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(llm_config, feed_path))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ============ Fake XTTS ============
+
+class FakeXtts:
+    """Implements the part of Xtts that tts_service uses; sleeps audio_seconds * rtf per call / piece"""
+
+    def __init__(self, rtf=0.3):
+        self.rtf = rtf
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding, temperature=0.75,
+                  speed=1.0, enable_text_splitting=False, **kwargs):
+        audio_seconds = max(len(text), 1) / CHARS_PER_SECOND / max(speed, 0.05)
+        time.sleep(audio_seconds * self.rtf)
+        return {"wav": np.zeros(int(audio_seconds * SAMPLE_RATE), dtype=np.float32)}
+
+    def inference_stream(self, text, language, gpt_cond_latent, speaker_embedding, stream_chunk_size=20,
+                         temperature=0.75, speed=1.0, enable_text_splitting=False, **kwargs):
+        # One XTTS code is 1024 output samples
+        samples = int(max(len(text), 1) / CHARS_PER_SECOND / max(speed, 0.05) * SAMPLE_RATE)
+        piece = stream_chunk_size * 1024
+        for offset in range(0, samples, piece):
+            size = min(piece, samples - offset)
+            time.sleep(size / SAMPLE_RATE * self.rtf)
+            yield np.zeros(size, dtype=np.float32)
+
+
+# ============ Local GCS ============
+
+class _LocalBlob:
+    def __init__(self, root, name):
+        self.path = os.path.join(root, name)
+
+    def upload_from_filename(self, filename):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        shutil.copyfile(filename, self.path)
+
+
+class _LocalBucket:
+    def __init__(self, root):
+        self.root = root
+
+    def blob(self, name):
+        return _LocalBlob(self.root, name)
+
+
+class LocalStorageClient:
+    """Stands in for google.cloud.storage.Client, blobs end up under `root/<bucket>/`"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def bucket(self, name):
+        return _LocalBucket(os.path.join(self.root, name))
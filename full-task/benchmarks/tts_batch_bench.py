@@ -0,0 +1,130 @@
+"""
+Benchmark of batched XTTS synthesis: tts_batch.inference_batch at several
+batch sizes against per-chunk model.inference (batch size 1).
+
+Needs a real checkpoint (and ideally a GPU); the model is loaded the same way
+the service loads it, so local paths and s3:// URIs in config.py / env work.
+The text is the recorded feed fixture's descriptions, split with
+split_arabic_text_for_tts, so chunk lengths match what the service sees.
+
+    cd full-task
+    python benchmarks/tts_batch_bench.py --voice normal --batch-sizes 1,2,4,8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+
+import torch  # noqa: E402
+
+import tts_service  # noqa: E402
+from config import (  # noqa: E402
+    LIVELY_CHECKPOINT_PATH, LIVELY_SPEAKER_REFERENCE, LIVELY_CONFIG_PATH,
+    SERIOUS_CHECKPOINT_PATH, SERIOUS_SPEAKER_REFERENCE, SERIOUS_CONFIG_PATH
+)
+from feed_sources import RssSource  # noqa: E402
+from tts_batch import inference_batch  # noqa: E402
+
+DEFAULT_FEED_FIXTURE = os.path.join(BENCH_DIR, "fixtures", "alriyadh_columns.xml")
+VOICES = {
+    "normal": (LIVELY_CHECKPOINT_PATH, LIVELY_SPEAKER_REFERENCE, LIVELY_CONFIG_PATH),
+    "serious": (SERIOUS_CHECKPOINT_PATH, SERIOUS_SPEAKER_REFERENCE, SERIOUS_CONFIG_PATH),
+}
+
+
+def fixture_chunks(path: str, limit: int) -> list:
+    """TTS chunks of the fixture's descriptions, as tts_arabic would split them"""
+    with open(path, "rb") as f:
+        articles = RssSource(name="bench", url="http://bench/feed.xml", publisher="bench").parse(f.read())
+    chunks = []
+    for article in articles:
+        chunks.extend(tts_service.split_arabic_text_for_tts(article['description_fusha'], tts_service.MAX_CHUNK_LENGTH))
+        if len(chunks) >= limit:
+            break
+    return chunks[:limit]
+
+
+def _sync():
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def run(model, latents, chunks, batch_size, temperature):
+    """Synthesize every chunk at `batch_size` (length-sorted, as tts_arabic does); returns (seconds, audio seconds)"""
+    gpt_cond_latent, speaker_embedding = latents
+    audio_samples = 0
+    _sync()
+    start = time.perf_counter()
+    for batch in tts_service._batches_by_length(chunks, batch_size):
+        texts = [chunks[i] for i in batch]
+        if batch_size == 1:
+            wavs = [torch.as_tensor(model.inference(
+                text=texts[0], language="ar", gpt_cond_latent=gpt_cond_latent, speaker_embedding=speaker_embedding,
+                temperature=temperature, enable_text_splitting=False
+            )["wav"])]
+        else:
+            wavs = inference_batch(model, texts, "ar", gpt_cond_latent, speaker_embedding, temperature=temperature)
+        audio_samples += sum(wav.shape[-1] for wav in wavs)
+    _sync()
+    return time.perf_counter() - start, audio_samples / tts_service.SAMPLE_RATE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voice", choices=sorted(VOICES), default="normal")
+    parser.add_argument("--batch-sizes", default="1,2,4,8", help="comma-separated batch sizes; 1 = model.inference")
+    parser.add_argument("--chunks", type=int, default=32, help="chunks synthesized per batch size")
+    parser.add_argument("--fixture", default=DEFAULT_FEED_FIXTURE, help="RSS file whose descriptions are spoken")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    tts_service.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    loaded = tts_service._load_model_and_latents(args.voice, *VOICES[args.voice])
+    if loaded is None:
+        sys.exit(f"Could not load the {args.voice} model")
+    model, latents = loaded
+    chunks = fixture_chunks(args.fixture, args.chunks)
+    print(f"{len(chunks)} chunks on {tts_service.device}")
+
+    # Warm-up: CUDA kernels, allocator and the tokenizer's caches
+    run(model, latents, chunks[:2], min(2, max(batch_sizes)), args.temperature)
+
+    results = []
+    for batch_size in batch_sizes:
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        seconds, audio_seconds = run(model, latents, chunks, batch_size, args.temperature)
+        results.append({
+            "batch_size": batch_size,
+            "seconds": round(seconds, 2),
+            "chunks_per_second": round(len(chunks) / seconds, 3),
+            "audio_seconds_per_second": round(audio_seconds / seconds, 3),
+            "peak_gpu_mib": round(torch.cuda.max_memory_allocated() / 2 ** 20) if torch.cuda.is_available() else None,
+        })
+
+    print(f"{'batch':>5} {'seconds':>9} {'chunks/s':>9} {'audio s/s':>10} {'peak MiB':>9}")
+    for row in results:
+        print(f"{row['batch_size']:>5} {row['seconds']:>9} {row['chunks_per_second']:>9} "
+              f"{row['audio_seconds_per_second']:>10} {row['peak_gpu_mib'] or '-':>9}")
+    best = max(results, key=lambda row: row["audio_seconds_per_second"])
+    print(f"Best batch size: {best['batch_size']} (set TTS_BATCH_SIZE={best['batch_size']})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"voice": args.voice, "device": str(tts_service.device), "chunks": len(chunks),
+                       "results": results, "best_batch_size": best["batch_size"]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
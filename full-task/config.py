@@ -1,3 +1,4 @@
+import json
 import os
 
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "http://localhost:9000")  # minio api endpoint
@@ -21,6 +22,58 @@ MODEL_CLASSIFIER = 'gpt-4o-mini'
 # key is exposed, regenerate and populate from an environment variable
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MAX_RETRIES = 3
+# "combined": one JSON call returns classification + Najdi script, validator only on low confidence
+# "separate": classifier call, then generator + validator calls (previous behaviour)
+LLM_MODE = os.getenv("LLM_MODE", "combined")
+COMBINED_CONFIDENCE_THRESHOLD = float(os.getenv("COMBINED_CONFIDENCE_THRESHOLD", "0.8"))
+# Long articles are converted as concurrent segments split at paragraph / sentence boundaries
+DIALECT_SEGMENT_THRESHOLD_CHARS = int(os.getenv("DIALECT_SEGMENT_THRESHOLD_CHARS", "1500"))
+DIALECT_SEGMENT_MAX_CHARS = int(os.getenv("DIALECT_SEGMENT_MAX_CHARS", "800"))
+
+# Async client limits: one event loop serves every thread, so these are process-wide
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # requests in flight
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))  # per model, match the account's quota
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "200000"))  # per model, prompt + max_tokens
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))  # per API call, on 429/5xx/timeouts
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+# Completion budgets: fixed for classifier/validator, input length x learned ratio x headroom otherwise
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "4096"))  # hard cap per call
+LLM_MIN_TOKENS = int(os.getenv("LLM_MIN_TOKENS", "64"))  # floor for length-scaled budgets
+LLM_MAX_TOKENS_HEADROOM = float(os.getenv("LLM_MAX_TOKENS_HEADROOM", "1.5"))
+# Batched classification: articles per request are capped by prompt tokens and count
+CLASSIFIER_BATCH_TOKEN_BUDGET = int(os.getenv("CLASSIFIER_BATCH_TOKEN_BUDGET", "6000"))
+CLASSIFIER_BATCH_MAX_ITEMS = int(os.getenv("CLASSIFIER_BATCH_MAX_ITEMS", "40"))
+
+# Persistent cache of validated conversions / classifications (SQLite, shared by threads and processes)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("./tts_model", "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))  # LRU eviction above this
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 86400)))
+
+# ============ Scraper Configuration ============
+ALRIYADH_FEED_URL = os.getenv("ALRIYADH_FEED_URL", "https://www.alriyadh.com/section.columns.xml")
+# JSON list of {"name", "url", "publisher", "adapter": "rss" | "atom"}; defaults to the AlRiyadh columns feed
+FEED_SOURCES = os.getenv("FEED_SOURCES") or json.dumps([
+    {"name": "alriyadh-columns", "url": ALRIYADH_FEED_URL, "publisher": "AlRiyadh", "adapter": "rss"}
+])
+SCRAPER_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_TIMEOUT_SECONDS", "10"))  # connect / read timeout per feed
+SCRAPER_DEADLINE_SECONDS = float(os.getenv("SCRAPER_DEADLINE_SECONDS", "20"))  # feeds not done by then are skipped
+SCRAPER_FETCH_WORKERS = int(os.getenv("SCRAPER_FETCH_WORKERS", "8"))  # feeds fetched at once
+SCRAPER_PER_HOST_LIMIT = int(os.getenv("SCRAPER_PER_HOST_LIMIT", "2"))  # concurrent requests to one host
+# Full article pages (the feed only carries a description)
+ARTICLE_FETCH_ENABLED = os.getenv("ARTICLE_FETCH_ENABLED", "true").lower() == "true"
+ARTICLE_FETCH_WORKERS = int(os.getenv("ARTICLE_FETCH_WORKERS", "8"))
+ARTICLE_FETCH_PER_HOST_LIMIT = int(os.getenv("ARTICLE_FETCH_PER_HOST_LIMIT", "4"))
+ARTICLE_FETCH_TIMEOUT_SECONDS = float(os.getenv("ARTICLE_FETCH_TIMEOUT_SECONDS", "5"))  # connect / read timeout per page
+ARTICLE_FETCH_DEADLINE_SECONDS = float(os.getenv("ARTICLE_FETCH_DEADLINE_SECONDS", "15"))  # late pages keep the description
+ARTICLE_MIN_BODY_CHARS = int(os.getenv("ARTICLE_MIN_BODY_CHARS", "200"))  # shorter extractions are ignored
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # keep-alive connections per host
+# ETag / Last-Modified and the last body of every fetched URL, for conditional GETs
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", os.path.join("./tts_model", "http_cache.sqlite3"))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "2000"))  # LRU eviction above this
 
 # ============ TTS Configuration ============
 TTS_MODEL_DIR = f"s3://{MINIO_BUCKET}/{MINIO_PREFIX}"
@@ -37,6 +90,60 @@ SERIOUS_CONFIG_PATH = f"{TTS_MODEL_DIR}/serious/config.json"
 SERIOUS_SPEAKER_REFERENCE = f"{TTS_MODEL_DIR}/serious/sample_691.wav"
 
 OUTPUT_DIR = os.path.join("./tts_model", "audio_outputs")
+TTS_BATCH_SIZE = int(os.getenv("TTS_BATCH_SIZE", "4"))  # chunks per batched XTTS GPT pass; 1 = per-chunk inference()
+TTS_STREAM_CHUNK_TOKENS = int(os.getenv("TTS_STREAM_CHUNK_TOKENS", "20"))  # GPT tokens per inference_stream piece (~43ms of audio each)
+AUDIO_CACHE_ENABLED = os.getenv("AUDIO_CACHE_ENABLED", "true").lower() == "true"
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join("./tts_model", "audio_cache"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_MB", "1024")) * 1024 * 1024  # LRU eviction above this
+AUDIO_CACHE_DTYPE = os.getenv("AUDIO_CACHE_DTYPE", "int16")  # int16 or float16 samples on disk
 # ============ Google Cloud Storage Configuration ============
 GCS_CREDENTIALS_PATH = "./gcs-credentials.json"
-GCS_BUCKET_NAME = "arabic-news-podcast-storage"
\ No newline at end of file
+GCS_BUCKET_NAME = "arabic-news-podcast-storage"
+# ============ Server Configuration ============
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8001"))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "16"))  # HTTP threads; SSE/NDJSON streams hold one each
+
+# ============ Pipeline Configuration ============
+# Each stage of /api/scrape-and-process-all has its own worker pool and bounded input queue
+PIPELINE_LLM_WORKERS = int(os.getenv("PIPELINE_LLM_WORKERS", "8"))  # classify + dialect conversion (network bound)
+PIPELINE_TTS_WORKERS = int(os.getenv("PIPELINE_TTS_WORKERS", "1"))  # XTTS synthesis, keep at 1 per GPU
+PIPELINE_UPLOAD_WORKERS = int(os.getenv("PIPELINE_UPLOAD_WORKERS", "4"))  # file writes + GCS uploads
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))  # max items waiting in front of each stage
+# Stream the dialect script into TTS sentence by sentence instead of waiting for the whole script
+PIPELINE_STREAM_TTS = os.getenv("PIPELINE_STREAM_TTS", "false").lower() == "true"
+
+# ============ Job Configuration ============
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))  # pipeline runs executed at the same time (they share the GPU)
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))  # how long finished jobs stay fetchable
+JOB_SSE_HEARTBEAT_SECONDS = 15  # keep-alive comment interval on the events stream
+
+# ============ Processed Article Index ============
+# SQLite index of articles that already went through the full pipeline, so reruns skip them
+ARTICLE_STORE_PATH = os.getenv("ARTICLE_STORE_PATH", os.path.join("./tts_model", "article_index.sqlite3"))
+ARTICLE_STORE_RETENTION_DAYS = int(os.getenv("ARTICLE_STORE_RETENTION_DAYS", "30"))  # entries older than this are evicted
+
+# ============ Near-Duplicate Detection ============
+# MinHash + LSH over normalized Arabic text; duplicates of the batch or of the last few days are skipped
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", os.path.join("./tts_model", "near_dup_index.sqlite3"))
+NEAR_DUP_WINDOW_DAYS = float(os.getenv("NEAR_DUP_WINDOW_DAYS", "3"))
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))  # estimated Jaccard similarity of word shingles
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "64"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))  # must divide NEAR_DUP_NUM_PERM
+NEAR_DUP_SHINGLE_WORDS = int(os.getenv("NEAR_DUP_SHINGLE_WORDS", "3"))
+
+# ============ Batch Endpoints ============
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))  # per request
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "8"))  # parallel dialect conversions per batch
+
+# ============ Najdi Validator ============
+# "local": in-process lexical/n-gram scorer, LLM validator only for ambiguous scores; "llm": always call MODEL_VALIDATOR
+NAJDI_VALIDATOR_MODE = os.getenv("NAJDI_VALIDATOR_MODE", "local")
+NAJDI_ACCEPT_THRESHOLD = float(os.getenv("NAJDI_ACCEPT_THRESHOLD", "0.8"))  # score >= this: Najdi
+NAJDI_REJECT_THRESHOLD = float(os.getenv("NAJDI_REJECT_THRESHOLD", "0.2"))  # score <= this: still Fusha
+# Scores >= NAJDI_ACCEPT_THRESHOLD are accepted without the LLM validator (1.0 accuracy at 0.8 / 0.2 in
+# benchmarks/najdi_validator_eval.py); false makes local mode reject-only while recalibrating
+NAJDI_LOCAL_ACCEPT = os.getenv("NAJDI_LOCAL_ACCEPT", "true").lower() == "true"
+NAJDI_NGRAM_PROFILE_PATH = os.getenv("NAJDI_NGRAM_PROFILE_PATH", "")  # optional trained trigram profile (JSON)
+DIALECT_STREAM_CHECK_CHARS = int(os.getenv("DIALECT_STREAM_CHECK_CHARS", "200"))  # rolling prefix check interval
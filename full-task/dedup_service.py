@@ -0,0 +1,209 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    NEAR_DUP_INDEX_PATH, NEAR_DUP_WINDOW_DAYS, NEAR_DUP_THRESHOLD, NEAR_DUP_NUM_PERM, NEAR_DUP_BANDS,
+    NEAR_DUP_SHINGLE_WORDS
+)
+from metrics_service import NEAR_DUPLICATES
+from najdi_validator import normalize_arabic
+from sqlite_util import thread_connection
+
+ROWS_PER_BAND = NEAR_DUP_NUM_PERM // NEAR_DUP_BANDS
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed seed: signatures are stored and compared across runs and processes
+_rng = np.random.RandomState(1)
+_perm_a = _rng.randint(1, (1 << 61) - 1, size=NEAR_DUP_NUM_PERM, dtype=np.uint64)
+_perm_b = _rng.randint(0, (1 << 61) - 1, size=NEAR_DUP_NUM_PERM, dtype=np.uint64)
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+PRUNE_INTERVAL_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    fingerprint TEXT PRIMARY KEY,
+    title TEXT,
+    signature BLOB NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_seen_at ON lsh_buckets (seen_at);
+CREATE INDEX IF NOT EXISTS idx_signatures_seen_at ON signatures (seen_at);
+"""
+
+
+# ============ Signatures ============
+
+def _shingles(text: str) -> set:
+    """Word n-grams of the normalized text (diacritics removed, alef/yaa/taa marbuta unified)"""
+    words = normalize_arabic(text).split()
+    if len(words) < NEAR_DUP_SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + NEAR_DUP_SHINGLE_WORDS]) for i in range(len(words) - NEAR_DUP_SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(text: str):
+    """NEAR_DUP_NUM_PERM MinHash values (uint32) of the text's shingles, or None for empty text"""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # (a * x + b) mod p per permutation, wrapping in uint64 like the usual numpy MinHash
+    permuted = ((np.outer(hashes, _perm_a) + _perm_b) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """MinHash estimate of the Jaccard similarity of two texts"""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _band_buckets(signature):
+    """One bucket key per band; texts sharing any bucket are near-duplicate candidates"""
+    return [
+        (band, hashlib.blake2b(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes(),
+                               digest_size=8).hexdigest())
+        for band in range(NEAR_DUP_BANDS)
+    ]
+
+
+def _article_text(article: dict) -> str:
+    return f"{article.get('title') or ''} {article.get('description_fusha') or ''}"
+
+
+# ============ Rolling Window Index ============
+
+def _get_connection():
+    """This thread's connection to the signature index; a new one prunes expired signatures"""
+    return thread_connection(NEAR_DUP_INDEX_PATH, _SCHEMA, on_open=lambda conn: prune_expired())
+
+
+def _find_in_window(signature, fingerprint: str):
+    """(fingerprint, title, similarity) of the closest article seen in the window, or None"""
+    cutoff = time.time() - NEAR_DUP_WINDOW_DAYS * 86400
+    buckets = _band_buckets(signature)
+    try:
+        conn = _get_connection()
+        rows = conn.execute(
+            "SELECT DISTINCT s.fingerprint, s.title, s.signature FROM lsh_buckets b "
+            "JOIN signatures s ON s.fingerprint = b.fingerprint "
+            f"WHERE ({' OR '.join(['(b.band = ? AND b.bucket = ?)'] * len(buckets))}) "
+            "AND b.seen_at >= ? AND b.fingerprint != ?",
+            [value for bucket in buckets for value in bucket] + [cutoff, fingerprint]
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"Near-duplicate index lookup failed: {e}")
+        return None
+
+    best = None
+    for other_fingerprint, title, blob in rows:
+        score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+        if score >= NEAR_DUP_THRESHOLD and (best is None or score > best[2]):
+            best = (other_fingerprint, title, score)
+    return best
+
+
+def record_signature(fingerprint: str, title: str, signature):
+    """Add a processed article to the rolling window so later near-duplicates are skipped"""
+    if signature is None:
+        return
+    now = time.time()
+    try:
+        conn = _get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO signatures (fingerprint, title, signature, seen_at) VALUES (?, ?, ?, ?)",
+                (fingerprint, title, sqlite3.Binary(signature.tobytes()), now)
+            )
+            conn.execute("DELETE FROM lsh_buckets WHERE fingerprint = ?", (fingerprint,))
+            conn.executemany(
+                "INSERT INTO lsh_buckets (band, bucket, fingerprint, seen_at) VALUES (?, ?, ?, ?)",
+                [(band, bucket, fingerprint, now) for band, bucket in _band_buckets(signature)]
+            )
+    except sqlite3.Error as e:
+        print(f"Could not record article signature: {e}")
+        return
+    prune_expired()
+
+
+def prune_expired(force: bool = False):
+    """Drop signatures older than NEAR_DUP_WINDOW_DAYS (at most once per PRUNE_INTERVAL_SECONDS)"""
+    global _last_prune
+
+    now = time.time()
+    with _prune_lock:
+        if not force and now - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = now
+
+    cutoff = now - NEAR_DUP_WINDOW_DAYS * 86400
+    try:
+        conn = _get_connection()
+        with conn:
+            conn.execute("DELETE FROM lsh_buckets WHERE seen_at < ?", (cutoff,))
+            conn.execute("DELETE FROM signatures WHERE seen_at < ?", (cutoff,))
+    except sqlite3.Error as e:
+        print(f"Near-duplicate index pruning failed: {e}")
+
+
+# ============ Clustering ============
+
+def find_near_duplicates(articles, fingerprints):
+    """
+    Pick one representative per near-duplicate cluster.
+
+    `articles` and `fingerprints` are parallel lists. The longest text of a
+    cluster is its representative; the others, and articles that match one
+    processed within the last NEAR_DUP_WINDOW_DAYS, are duplicates. Candidates
+    come from LSH buckets (in memory for the batch, SQLite for the window)
+    and are kept only above NEAR_DUP_THRESHOLD estimated similarity.
+
+    Returns (signatures, duplicates): a signature per article (None for empty
+    text) and {position: (scope, title of the article it duplicates,
+    position of the batch representative or None for "window")}, in
+    longest-first order.
+    """
+    signatures = [minhash_signature(_article_text(article)) for article in articles]
+    duplicates = {}
+    batch_buckets = {}
+
+    # Longest first, so the fullest version of a story is the one synthesized
+    order = sorted(range(len(articles)), key=lambda i: -len(articles[i].get('description_fusha') or ""))
+    for position in order:
+        signature = signatures[position]
+        if signature is None:
+            continue
+        buckets = _band_buckets(signature)
+
+        candidates = {other for bucket in buckets for other in batch_buckets.get(bucket, ())}
+        match = max(candidates, key=lambda other: similarity(signature, signatures[other]), default=None)
+        if match is not None and similarity(signature, signatures[match]) >= NEAR_DUP_THRESHOLD:
+            duplicates[position] = ("batch", articles[match].get('title'), match)
+            NEAR_DUPLICATES.inc(scope="batch")
+            continue
+
+        past = _find_in_window(signature, fingerprints[position])
+        if past is not None:
+            duplicates[position] = ("window", past[1], None)
+            NEAR_DUPLICATES.inc(scope="window")
+            continue
+
+        for bucket in buckets:
+            batch_buckets.setdefault(bucket, []).append(position)
+
+    return signatures, duplicates
@@ -0,0 +1,145 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_CACHE_PATH, HTTP_CACHE_MAX_ENTRIES, HTTP_POOL_SIZE, HTTP_USER_AGENT
+from metrics_service import HTTP_CACHE_REQUESTS
+from sqlite_util import thread_connection
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT NOT NULL,
+    body BLOB NOT NULL,
+    changed_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache (last_access);
+"""
+
+
+# ============ Pooled Session ============
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session, so repeated fetches reuse TCP/TLS connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = HTTP_USER_AGENT
+            session.verify = False
+            _session = session
+        return _session
+
+
+def host_slot(kind: str, url: str, limit: int) -> threading.Semaphore:
+    """Semaphore bounding concurrent `kind` requests (feed / article) to the host of `url`"""
+    key = (kind, urlsplit(url).netloc)
+    with _host_slots_lock:
+        slot = _host_slots.get(key)
+        if slot is None:
+            slot = _host_slots[key] = threading.Semaphore(limit)
+        return slot
+
+
+# ============ Validator / Body Store ============
+
+def _get_connection():
+    """This thread's connection to the HTTP cache"""
+    return thread_connection(HTTP_CACHE_PATH, _SCHEMA)
+
+
+def _load_entry(url: str):
+    try:
+        return _get_connection().execute(
+            "SELECT etag, last_modified, content_hash, body FROM http_cache WHERE url = ?", (url,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"HTTP cache lookup failed: {e}")
+        return None
+
+
+def _write(statement: str, params, evict: bool = False):
+    try:
+        conn = _get_connection()
+        with conn:
+            conn.execute(statement, params)
+            if evict:
+                conn.execute(
+                    "DELETE FROM http_cache WHERE url IN ("
+                    " SELECT url FROM http_cache ORDER BY last_access"
+                    " LIMIT MAX(0, (SELECT COUNT(*) FROM http_cache) - ?))",
+                    (HTTP_CACHE_MAX_ENTRIES,)
+                )
+    except sqlite3.Error as e:
+        print(f"HTTP cache write failed: {e}")
+
+
+# ============ Conditional GET ============
+
+def conditional_get(url: str, kind: str, timeout: float):
+    """
+    GET `url`, revalidating against the stored ETag / Last-Modified.
+
+    Returns (body, changed). A 304, or a 200 whose body hashes the same as the
+    stored copy, returns the stored body with changed=False; only a body that
+    really differs replaces the stored copy and its hash. HTTP errors raise.
+    """
+    entry = _load_entry(url)
+    headers = {}
+    if entry:
+        etag, last_modified = entry[0], entry[1]
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    response = get_session().get(url, headers=headers, timeout=timeout)
+    now = time.time()
+
+    if response.status_code == 304 and entry:
+        HTTP_CACHE_REQUESTS.inc(kind=kind, result="not_modified")
+        _write("UPDATE http_cache SET last_access = ? WHERE url = ?", (now, url))
+        return entry[3], False
+
+    response.raise_for_status()
+    body = response.content
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    content_hash = hashlib.sha256(body).hexdigest()
+
+    if entry and entry[2] == content_hash:
+        # Server ignored the validators (or rotated them) but the content is the same
+        HTTP_CACHE_REQUESTS.inc(kind=kind, result="unchanged")
+        _write(
+            "UPDATE http_cache SET etag = ?, last_modified = ?, last_access = ? WHERE url = ?",
+            (etag, last_modified, now, url)
+        )
+        return entry[3], False
+
+    HTTP_CACHE_REQUESTS.inc(kind=kind, result="modified")
+    _write(
+        "INSERT OR REPLACE INTO http_cache "
+        "(url, etag, last_modified, content_hash, body, changed_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (url, etag, last_modified, content_hash, sqlite3.Binary(body), now, now),
+        evict=True
+    )
+    return body, True
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from config import JOB_WORKERS, JOB_RESULT_TTL_SECONDS, JOB_SSE_HEARTBEAT_SECONDS
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    """A background run with an append-only event log that clients can poll or stream"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.created_at = _now_iso()
+        self.started_at = None
+        self.finished_at = None
+        self.finished_monotonic = None
+        self.error = None
+        self.result = {}
+        self.events = []
+        self.cancel_event = threading.Event()
+        self._cond = threading.Condition()
+
+    def publish(self, event_type: str, data: dict):
+        """Append an event and wake up every stream waiting on this job"""
+        with self._cond:
+            self._append_event(event_type, data)
+
+    def _append_event(self, event_type: str, data: dict):
+        # Caller must hold self._cond
+        self.events.append({"id": len(self.events), "type": event_type, "data": data})
+        self._cond.notify_all()
+
+    def update_result(self, **values):
+        with self._cond:
+            self.result.update(values)
+
+    def set_status(self, status: str, error: str = None):
+        with self._cond:
+            self._set_status(status, error)
+
+    def transition(self, expected: str, status: str, error: str = None) -> bool:
+        """Compare-and-set: change the status only if it is still `expected`. Returns whether it changed."""
+        with self._cond:
+            if self.status != expected:
+                return False
+            self._set_status(status, error)
+            return True
+
+    def _set_status(self, status: str, error: str = None):
+        # Caller must hold self._cond
+        self.status = status
+        if status == RUNNING:
+            self.started_at = _now_iso()
+        if status in FINISHED_STATES:
+            self.finished_at = _now_iso()
+            self.finished_monotonic = time.monotonic()
+        if error:
+            self.error = error
+        # Same lock as the status change, so streams never see "finished" before this event
+        self._append_event("status", {"status": status, "error": error})
+
+    def wait_for_events(self, cursor: int, timeout: float):
+        """Block until there are events past `cursor` or the job finishes. Returns (events, finished)."""
+        with self._cond:
+            if cursor >= len(self.events) and self.status not in FINISHED_STATES:
+                self._cond.wait(timeout)
+            return self.events[cursor:], self.status in FINISHED_STATES
+
+    def to_dict(self, include_events: bool = False):
+        with self._cond:
+            data = {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "result": dict(self.result)
+            }
+            if include_events:
+                data["events"] = list(self.events)
+            return data
+
+
+class JobRegistry:
+    """Runs jobs on a background executor and keeps them around for a TTL after they finish"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, ttl_seconds: int = JOB_RESULT_TTL_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn) -> Job:
+        """Queue `fn(job)` for execution and return the job right away"""
+        self._purge_expired()
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.publish("status", {"status": QUEUED, "error": None})
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str):
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """Request cancellation. Queued jobs never start; running jobs stop after the current stage."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED_STATES:
+            job.cancel_event.set()
+            # Loses to _run if the job has just started; it then sees cancel_event and ends as CANCELLED
+            job.transition(QUEUED, CANCELLED)
+        return job
+
+    def _run(self, job: Job, fn):
+        if not job.transition(QUEUED, RUNNING):
+            return  # cancelled while queued
+        try:
+            fn(job)
+        except Exception as e:
+            print(f"Error in job {job.id}: {e}")
+            traceback.print_exc()
+            job.transition(RUNNING, FAILED, str(e))
+            return
+        job.transition(RUNNING, CANCELLED if job.cancel_event.is_set() else COMPLETED)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_monotonic is not None and now - job.finished_monotonic > self._ttl_seconds
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+def parse_last_event_id(value):
+    """
+    The event id in a Last-Event-ID header (None if absent). Raises ValueError
+    unless it is a plain non-negative integer, so the endpoint can answer 400
+    before the stream starts.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if not (value.isascii() and value.isdigit()):
+        raise ValueError("Last-Event-ID must be a non-negative integer")
+    return int(value)
+
+
+def sse_event_stream(job: Job, last_event_id=None):
+    """Yield Server-Sent Events for a job, resuming after `last_event_id` if given"""
+    cursor = int(last_event_id) + 1 if last_event_id is not None else 0
+
+    while True:
+        events, finished = job.wait_for_events(cursor, JOB_SSE_HEARTBEAT_SECONDS)
+        for event in events:
+            yield (
+                f"id: {event['id']}\n"
+                f"event: {event['type']}\n"
+                f"data: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+            )
+        cursor += len(events)
+
+        if finished and not events:
+            break
+        if not events:
+            yield ": keep-alive\n\n"
+
+
+# Shared registry for the Flask app
+job_registry = JobRegistry()
@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+from metrics_service import LLM_CACHE_REQUESTS
+from sqlite_util import thread_connection
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access);
+"""
+
+
+def _get_connection():
+    """This thread's connection to the LLM cache"""
+    return thread_connection(LLM_CACHE_PATH, _SCHEMA)
+
+
+def cache_key(kind: str, text: str, model: str, prompt_version: str, temperature: float) -> str:
+    """Content address of an LLM result: input text + everything that changes the output"""
+    payload = json.dumps([kind, text, model, prompt_version, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_get(kind: str, key: str):
+    """Return the cached value (JSON-decoded) or None. Expired entries count as misses."""
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    now = time.time()
+    try:
+        conn = _get_connection()
+        with conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - LLM_CACHE_TTL_SECONDS)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+    except sqlite3.Error as e:
+        print(f"LLM cache lookup failed: {e}")
+        row = None
+
+    LLM_CACHE_REQUESTS.inc(kind=kind, result="hit" if row else "miss")
+    return json.loads(row[0]) if row else None
+
+
+def cache_put(kind: str, key: str, value):
+    """Store a validated result and evict the least recently used entries above the size limit"""
+    if not LLM_CACHE_ENABLED:
+        return
+
+    now = time.time()
+    try:
+        conn = _get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - LLM_CACHE_TTL_SECONDS,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_access"
+                " LIMIT MAX(0, (SELECT COUNT(*) FROM llm_cache) - ?))",
+                (LLM_CACHE_MAX_ENTRIES,)
+            )
+    except sqlite3.Error as e:
+        print(f"LLM cache write failed: {e}")
+
+
+# SQLite calls block (up to the 30 s busy timeout), so coroutines on the shared
+# LLM event loop run them on a worker thread instead of stalling every request
+
+async def acache_get(kind: str, key: str):
+    return await asyncio.to_thread(cache_get, kind, key)
+
+
+async def acache_put(kind: str, key: str, value):
+    await asyncio.to_thread(cache_put, kind, key, value)
@@ -0,0 +1,391 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+
+from openai import (
+    AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+)
+from config import (
+    OPENAI_API_KEY, LLM_MAX_CONCURRENCY, LLM_RPM_LIMIT, LLM_TPM_LIMIT, LLM_MAX_ATTEMPTS,
+    LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, LLM_REQUEST_TIMEOUT_SECONDS, LLM_MAX_TOKENS
+)
+from metrics_service import (
+    LLM_CALL_SECONDS, LLM_CALL_ERRORS, LLM_CALL_RETRIES, LLM_LIMITER_WAIT_SECONDS, LLM_TRUNCATED
+)
+from llm_usage import max_tokens_for, observe_output_ratio, record_usage, active_totals, bind_totals
+
+# Rough Arabic chars per token, used to reserve TPM budget before the real usage is known
+CHARS_PER_TOKEN = 3
+
+# ============ Initialize OpenAI Client ============
+# Retries are handled here (rate limiter + backoff), so the SDK's own are disabled
+openai_client = None
+try:
+    openai_client = AsyncOpenAI(
+        api_key=OPENAI_API_KEY, max_retries=0, timeout=LLM_REQUEST_TIMEOUT_SECONDS
+    )
+    print("OpenAI client initialized")
+except Exception as e:
+    print(f"Error initializing OpenAI: {e}")
+
+
+# ============ Rate Limiting ============
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.available = self.capacity
+        self.refill_per_second = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        """Wait until `amount` units are available and take them; waiters are served in order"""
+        amount = min(amount, self.capacity)  # an oversized request still gets through eventually
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.refill_per_second)
+                self._refill()
+            self.available -= amount
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take (negative) units once the real cost is known"""
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model, plus a shared pause after 429s"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+
+    async def acquire(self, tokens: int):
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+    def pause(self, seconds: float):
+        """Hold back every caller of this model, not just the one that got throttled"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_limiters = {}
+_semaphore = None
+
+
+def _limiter_for(model):
+    # OpenAI quotas are per model; only touched from the event loop thread
+    limiter = _limiters.get(model)
+    if limiter is None:
+        limiter = _limiters[model] = RateLimiter(LLM_RPM_LIMIT, LLM_TPM_LIMIT)
+    return limiter
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+# ============ Backoff ============
+
+def _retry_after_seconds(error):
+    """Server hint from Retry-After / retry-after-ms, or None"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # HTTP-date form is rare for this API; fall back to our own backoff
+        return None
+    return None
+
+
+def _backoff_seconds(attempt):
+    """Full jitter: uniform in [0, min(max, base * 2^attempt)]"""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _retry_reason(error):
+    """Label for retryable errors, None for errors that retrying will not fix"""
+    if isinstance(error, RateLimitError):
+        return "rate_limited"
+    if isinstance(error, APITimeoutError):
+        return "timeout"
+    if isinstance(error, APIConnectionError):
+        return "connection"
+    if isinstance(error, APIStatusError) and (error.status_code >= 500 or error.status_code == 409):
+        return "server_error"
+    return None
+
+
+# ============ Calls ============
+
+class LLMTruncated(Exception):
+    """A streamed answer hit its max_tokens budget before finishing"""
+
+
+def _request_params(system_prompt, user_prompt, model, temperature, top_p, max_tokens):
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": top_p
+    }
+
+
+async def _wait_before_retry(error, attempt, model, limiter, what="retrying"):
+    """Sleep for the backoff / Retry-After delay; False if the error is not worth retrying"""
+    reason = _retry_reason(error)
+    if reason is None or attempt == LLM_MAX_ATTEMPTS - 1:
+        return False
+
+    delay = _backoff_seconds(attempt)
+    hint = _retry_after_seconds(error)
+    if hint is not None:
+        delay = max(delay, hint)
+    if reason == "rate_limited":
+        limiter.pause(delay)
+    LLM_CALL_RETRIES.inc(model=model, reason=reason)
+    print(f"OpenAI API {reason} ({error}); {what} in {delay:.1f}s "
+          f"(attempt {attempt + 2}/{LLM_MAX_ATTEMPTS})")
+    await asyncio.sleep(delay)
+    return True
+
+
+async def acall_llm(system_prompt, user_prompt, model, is_json_mode=False, role="generator",
+                    temperature=0.7, top_p=0.95, max_tokens=None):
+    """
+    One chat completion through the global concurrency cap and the model's
+    RPM/TPM limiter. Transient failures (429, 5xx, timeouts, connection
+    errors) are retried with jittered exponential backoff, waiting at least as
+    long as the server's Retry-After. Returns the message content or None.
+
+    `max_tokens` defaults to the role's budget (see llm_usage.max_tokens_for);
+    an answer cut off by it is retried once with double the budget. Token
+    usage and latency are recorded in the metrics and the active usage scopes.
+
+    Must run on the LLM event loop; use run_sync() from threads.
+    """
+    if not openai_client:
+        print("Error: OpenAI client not initialized.")
+        return None
+
+    if max_tokens is None:
+        max_tokens = max_tokens_for(role, len(user_prompt))
+    limiter = _limiter_for(model)
+    attempt = 0
+
+    while attempt < LLM_MAX_ATTEMPTS:
+        params = _request_params(system_prompt, user_prompt, model, temperature, top_p, max_tokens)
+        if is_json_mode:
+            params["response_format"] = {"type": "json_object"}
+        # The provider counts max_tokens against TPM up front; reconcile with real usage afterwards
+        reserved = (len(system_prompt) + len(user_prompt)) // CHARS_PER_TOKEN + max_tokens
+
+        async with _get_semaphore():
+            wait_start = time.perf_counter()
+            await limiter.acquire(reserved)
+            LLM_LIMITER_WAIT_SECONDS.observe(time.perf_counter() - wait_start, model=model)
+
+            start = time.perf_counter()
+            try:
+                chat_completion = await openai_client.chat.completions.create(**params)
+            except Exception as e:
+                error = e
+            else:
+                latency = time.perf_counter() - start
+                LLM_CALL_SECONDS.observe(latency, model=model, role=role)
+                usage = getattr(chat_completion, "usage", None)
+                prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                if prompt_tokens or completion_tokens:
+                    limiter.tokens.adjust(reserved - prompt_tokens - completion_tokens)
+                record_usage(model, role, prompt_tokens, completion_tokens, latency)
+
+                choice = chat_completion.choices[0]
+                if choice.finish_reason != "length":
+                    observe_output_ratio(role, len(user_prompt), completion_tokens)
+                    return choice.message.content
+
+                LLM_TRUNCATED.inc(model=model, role=role)
+                if max_tokens >= LLM_MAX_TOKENS:
+                    return choice.message.content
+                max_tokens = min(LLM_MAX_TOKENS, max_tokens * 2)
+                print(f"OpenAI API answer truncated ({role}); retrying with max_tokens={max_tokens}")
+                attempt += 1
+                continue
+
+        if not await _wait_before_retry(error, attempt, model, limiter):
+            print(f"Error calling OpenAI API: {error}")
+            LLM_CALL_ERRORS.inc(model=model, role=role)
+            return None
+        attempt += 1
+
+    return None
+
+
+async def astream_llm(system_prompt, user_prompt, model, role="generator",
+                      temperature=0.7, top_p=0.95, max_tokens=None):
+    """
+    Streaming version of acall_llm: an async generator of content deltas.
+
+    Rate limiting and backoff are the same, but a request is only retried if
+    it fails before the first delta; a failure mid-stream raises, since the
+    caller has already consumed part of the answer. An answer cut off by
+    max_tokens raises LLMTruncated once the stream ends.
+    """
+    if not openai_client:
+        raise RuntimeError("OpenAI client not initialized")
+
+    if max_tokens is None:
+        max_tokens = max_tokens_for(role, len(user_prompt))
+    params = _request_params(system_prompt, user_prompt, model, temperature, top_p, max_tokens)
+    params.update({"stream": True, "stream_options": {"include_usage": True}})
+    reserved = (len(system_prompt) + len(user_prompt)) // CHARS_PER_TOKEN + max_tokens
+    limiter = _limiter_for(model)
+
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        async with _get_semaphore():
+            wait_start = time.perf_counter()
+            await limiter.acquire(reserved)
+            LLM_LIMITER_WAIT_SECONDS.observe(time.perf_counter() - wait_start, model=model)
+
+            start = time.perf_counter()
+            started = False
+            stream = None
+            usage = None
+            finish_reason = None
+            try:
+                stream = await openai_client.chat.completions.create(**params)
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices:
+                        finish_reason = chunk.choices[0].finish_reason or finish_reason
+                        if chunk.choices[0].delta.content:
+                            started = True
+                            yield chunk.choices[0].delta.content
+            except Exception as e:
+                if started:
+                    LLM_CALL_ERRORS.inc(model=model, role=role)
+                    raise
+                error = e
+            else:
+                latency = time.perf_counter() - start
+                LLM_CALL_SECONDS.observe(latency, model=model, role=role)
+                prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                if prompt_tokens or completion_tokens:
+                    limiter.tokens.adjust(reserved - prompt_tokens - completion_tokens)
+                record_usage(model, role, prompt_tokens, completion_tokens, latency)
+                if finish_reason == "length":
+                    LLM_TRUNCATED.inc(model=model, role=role)
+                    raise LLMTruncated(f"{role} answer hit max_tokens={max_tokens}")
+                observe_output_ratio(role, len(user_prompt), completion_tokens)
+                return
+            finally:
+                if stream is not None:
+                    await stream.close()
+
+        if not await _wait_before_retry(error, attempt, model, limiter, what="retrying stream"):
+            LLM_CALL_ERRORS.inc(model=model, role=role)
+            raise error
+
+
+# ============ Event Loop ============
+# One long-lived loop owns the async client, the semaphore and the limiters, so
+# every thread in the process shares the same connection pool and rate limits.
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    """Start the LLM event loop thread on first use"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True)
+            _loop_thread.start()
+    return _loop
+
+
+def submit(coro):
+    """
+    Schedule a coroutine on the LLM loop; returns a concurrent.futures.Future.
+    Calls inside it count into the calling thread's usage scopes.
+    """
+    return asyncio.run_coroutine_threadsafe(bind_totals(coro, active_totals()), get_loop())
+
+
+def run_sync(coro):
+    """Run a coroutine on the LLM loop and block the calling thread until it finishes"""
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the LLM event loop; await the coroutine instead")
+    return submit(coro).result()
+
+
+_STREAM_END = object()
+
+
+def iter_sync(agen):
+    """
+    Consume an async generator on the LLM loop from a regular thread.
+
+    Items are handed over through a queue as they arrive; exceptions are
+    re-raised in the calling thread. Closing the returned generator early
+    cancels the async side.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            items.put((_STREAM_END, e))
+            return
+        items.put((_STREAM_END, None))
+
+    future = submit(pump())
+    try:
+        while True:
+            item, error = items.get()
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        future.cancel()
@@ -1,79 +1,98 @@
-import time
+import asyncio
 import json
+import re
 import traceback
-from openai import OpenAI
-from config import OPENAI_API_KEY, MODEL_GENERATOR, MODEL_VALIDATOR, MODEL_CLASSIFIER, MAX_RETRIES
-
-# ============ Initialize OpenAI Client ============
-openai_client = None
-try:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    print("OpenAI client initialized")
-except Exception as e:
-    print(f"Error initializing OpenAI: {e}")
+from config import (
+    MODEL_GENERATOR, MODEL_VALIDATOR, MODEL_CLASSIFIER, MAX_RETRIES,
+    COMBINED_CONFIDENCE_THRESHOLD, NAJDI_VALIDATOR_MODE, NAJDI_LOCAL_ACCEPT, DIALECT_STREAM_CHECK_CHARS,
+    DIALECT_SEGMENT_THRESHOLD_CHARS, DIALECT_SEGMENT_MAX_CHARS,
+    CLASSIFIER_BATCH_TOKEN_BUDGET, CLASSIFIER_BATCH_MAX_ITEMS
+)
+from metrics_service import DIALECT_ATTEMPTS, DIALECT_FAILURES, DIALECT_SEGMENTS, NAJDI_LOCAL_VERDICTS
+from najdi_validator import classify_najdi
+from llm_cache import cache_key, cache_get, cache_put, acache_get, acache_put
+from llm_client import openai_client, acall_llm, astream_llm, run_sync, iter_sync, CHARS_PER_TOKEN
+
+# Sampling temperature for every call; part of the cache key
+LLM_TEMPERATURE = 0.7
+# Bump these when the corresponding system prompt changes so old cache entries stop matching
+DIALECT_PROMPT_VERSION = "dialect-v1"
+CLASSIFIER_PROMPT_VERSION = "classifier-v1"
+# Numbering and separators around each article in a batched classifier prompt
+CLASSIFIER_BATCH_ITEM_OVERHEAD_TOKENS = 10
 
 
 # ============ Helper Functions (Updated) ============
 
-def call_openai_llm(system_prompt, user_prompt, model, is_json_mode=False):
-    """Unified function for calling OpenAI Chat Completions (using provided logic)"""
+async def acall_openai_llm(system_prompt, user_prompt, model, is_json_mode=False, role="generator"):
+    """Async version of call_openai_llm, for code already running on the LLM event loop"""
+    return await acall_llm(
+        system_prompt, user_prompt, model,
+        is_json_mode=is_json_mode, role=role, temperature=LLM_TEMPERATURE
+    )
+
+
+def call_openai_llm(system_prompt, user_prompt, model, is_json_mode=False, role="generator"):
+    """
+    Unified function for calling OpenAI Chat Completions (using provided logic)
 
+    Blocking wrapper around the async client: the request runs on the shared
+    LLM event loop, under the global concurrency cap and RPM/TPM limiter, and
+    transient errors are retried there with backoff. Safe to call from many
+    threads at once. `role` (generator / validator / classifier / combined)
+    only labels the latency metrics. Returns None if the call failed.
+    """
     if not openai_client:
         print("Error: OpenAI client not initialized.")
         return None
 
-    try:
-        params = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 4096,
-            "top_p": 0.95,
-            "stream": False
-        }
-
-        if is_json_mode:
-            params["response_format"] = {"type": "json_object"}
-
-        chat_completion = openai_client.chat.completions.create(**params)
-
-        return chat_completion.choices[0].message.content
-
-    except Exception as e:
-        print(f"Error calling OpenAI API: {e}")
-        return None
+    return run_sync(acall_openai_llm(system_prompt, user_prompt, model, is_json_mode, role))
 
 
 # --- MODIFICATION: New news_classifier_agent function (Copied from colleague's code) ---
-def news_classifier_agent(title: str, description: str):
-    """
-    Agent يصنف الخبر إلى جاد (1) أو عادي (0) باستخدام LLM.
-    """
+CLASSIFIER_SYSTEM_PROMPT = (
+    "أنت مصنف محترف للأخبار. مهمتك هي تحليل العنوان والمحتوى وتحديد ما إذا كان الخبر:\n"
+    "- 'جادة': أخبار سياسية، أمنية، صحية سيئة، قرارات حكومية\n"
+    "- 'عادية': أخبار ثقافية، ترفيهية، رياضية، حياتية، تقنية غير حرجة، مقالات رأي\n"
+    " اركز للجادة ب 1 والعادية ب0"
+)
+
+
+def _classifier_user_prompt(title: str, description: str) -> str:
+    # Also the cache key text, so single and batched classifications share entries
+    return f"العنوان: {title}\n\nالمحتوى: {description[:500]}..."
+
+
+def _parse_json_response(response_str: str):
+    if response_str.startswith("```json"):
+        response_str = response_str[7:-3].strip()
+    return json.loads(response_str)
+
+
+async def aclassify_news(title: str, description: str):
+    """Async version of news_classifier_agent"""
     if not title or not description or not openai_client:
         return "UNKNOWN"  # Changed from 'client' to 'openai_client'
 
-    # Use the unified call_openai_llm
-    client = openai_client
-
-    system_prompt_classify = (
-        "أنت مصنف محترف للأخبار. مهمتك هي تحليل العنوان والمحتوى وتحديد ما إذا كان الخبر:\n"
-        "- 'جادة': أخبار سياسية، أمنية، صحية سيئة، قرارات حكومية\n"
-        "- 'عادية': أخبار ثقافية، ترفيهية، رياضية، حياتية، تقنية غير حرجة، مقالات رأي\n"
-        " اركز للجادة ب 1 والعادية ب0"
+    system_prompt_classify = CLASSIFIER_SYSTEM_PROMPT + (
         "يجب أن ترد بتنسيق JSON فقط: {\"classification\": 0} أو {\"classification\": 1}\n"
         "لا تكتب أي شيء آخر."
     )
+    user_prompt_classify = _classifier_user_prompt(title, description)
 
-    user_prompt_classify = f"العنوان: {title}\n\nالمحتوى: {description[:500]}..."
+    key = cache_key("classification", user_prompt_classify, MODEL_CLASSIFIER,
+                    CLASSIFIER_PROMPT_VERSION, LLM_TEMPERATURE)
+    cached = await acache_get("classification", key)
+    if cached is not None:
+        print(f" [المصنف] النتيجة (cache): {cached}")
+        return cached
 
-    classification_response = call_openai_llm(  # Using the unified LLM caller
+    classification_response = await acall_openai_llm(  # Using the unified LLM caller
         system_prompt_classify,
         user_prompt_classify,
         MODEL_CLASSIFIER,
-        is_json_mode=True
+        is_json_mode=True,
+        role="classifier"
     )
 
     if not classification_response:
@@ -81,14 +100,13 @@ def news_classifier_agent(title: str, description: str):
         return "UNKNOWN"
 
     try:
-        if classification_response.startswith("```json"):
-            classification_response = classification_response[7:-3].strip()
-
-        classification_json = json.loads(classification_response)
+        classification_json = _parse_json_response(classification_response)
         # Return 0 or 1, or UNKNOWN if key is missing/invalid
         news_class = classification_json.get("classification", "UNKNOWN")
 
         print(f" [المصنف] النتيجة: {news_class}")
+        if news_class in (0, 1):
+            await acache_put("classification", key, news_class)
         return news_class
 
     except json.JSONDecodeError as e:
@@ -96,15 +114,219 @@ def news_classifier_agent(title: str, description: str):
         return "UNKNOWN"
 
 
-# ============ Main Conversion Function (Updated) ============
+def news_classifier_agent(title: str, description: str):
+    """
+    Agent يصنف الخبر إلى جاد (1) أو عادي (0) باستخدام LLM.
+    """
+    return run_sync(aclassify_news(title, description))
+
+
+# ============ Batched Classification ============
+
+def _pack_classifier_batches(items):
+    """Greedily split (id, user_prompt) pairs into batches under the token and item budgets"""
+    batches, current, current_tokens = [], [], 0
+    for item_id, prompt in items:
+        tokens = len(prompt) // CHARS_PER_TOKEN + CLASSIFIER_BATCH_ITEM_OVERHEAD_TOKENS
+        if current and (current_tokens + tokens > CLASSIFIER_BATCH_TOKEN_BUDGET
+                        or len(current) >= CLASSIFIER_BATCH_MAX_ITEMS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((item_id, prompt))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _classify_batch(batch):
+    """One JSON-mode request for a batch; returns {batch position: 0/1} for the ids the model answered"""
+    system_prompt = CLASSIFIER_SYSTEM_PROMPT + (
+        "ستصلك قائمة أخبار، كل خبر يبدأ برقمه بين قوسين مربعين.\n"
+        "صنف كل خبر على حدة. يجب أن ترد بتنسيق JSON فقط: "
+        "{\"classifications\": {\"رقم الخبر\": 0 أو 1, ...}}\n"
+        "لا تكتب أي شيء آخر."
+    )
+    user_prompt = "\n\n".join(f"[{position}] {prompt}" for position, (_, prompt) in enumerate(batch))
 
-def convert_to_saudi_dialect(fusha_text: str):
-    """Convert Fusha Arabic to Saudi dialect using generation + validation (using colleague's logic)"""
+    response = await acall_openai_llm(
+        system_prompt, user_prompt, MODEL_CLASSIFIER, is_json_mode=True, role="classifier_batch"
+    )
+    if not response:
+        return {}
+    try:
+        answers = _parse_json_response(response).get("classifications", {})
+    except (json.JSONDecodeError, AttributeError) as e:
+        print(f" فشل تحليل JSON من المصنف (دفعة): {e}")
+        return {}
+    if not isinstance(answers, dict):
+        return {}
+
+    results = {}
+    for position, value in answers.items():
+        try:
+            position, value = int(str(position).strip("[] ")), int(value)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= position < len(batch) and value in (0, 1):
+            results[position] = value
+    return results
+
+
+async def aclassify_news_batch(articles):
+    """Async version of classify_news_batch"""
+    results = {}
+    pending = []
+    for item_id, title, description in articles:
+        if not title or not description or not openai_client:
+            results[item_id] = "UNKNOWN"
+            continue
+        prompt = _classifier_user_prompt(title, description)
+        key = cache_key("classification", prompt, MODEL_CLASSIFIER, CLASSIFIER_PROMPT_VERSION, LLM_TEMPERATURE)
+        cached = await acache_get("classification", key)
+        if cached is not None:
+            results[item_id] = cached
+        else:
+            pending.append((item_id, prompt, key, title, description))
+
+    if not pending:
+        return results
+
+    by_id = {item_id: (key, title, description) for item_id, _, key, title, description in pending}
+    batches = _pack_classifier_batches([(item_id, prompt) for item_id, prompt, *_ in pending])
+    print(f" [المصنف] {len(pending)} خبر في {len(batches)} دفعة")
+    answers = await asyncio.gather(*(_classify_batch(batch) for batch in batches))
+
+    missing = []
+    for batch, batch_answers in zip(batches, answers):
+        for position, (item_id, _) in enumerate(batch):
+            if position in batch_answers:
+                results[item_id] = batch_answers[position]
+                await acache_put("classification", by_id[item_id][0], batch_answers[position])
+            else:
+                missing.append(item_id)
 
-    if not openai_client:
-        print("ERROR: OpenAI client not initialized")
+    if missing:
+        print(f" [المصنف] {len(missing)} خبر بدون نتيجة في الدفعة، جاري التصنيف فردياً...")
+        singles = await asyncio.gather(*(aclassify_news(*by_id[item_id][1:]) for item_id in missing))
+        results.update(zip(missing, singles))
+    return results
+
+
+def classify_news_batch(articles):
+    """
+    Classify many articles with as few requests as possible.
+
+    `articles` is a list of (id, title, description). Cached results are
+    reused, the rest are packed into JSON-mode requests sized to
+    CLASSIFIER_BATCH_TOKEN_BUDGET and sent concurrently. Any id the model
+    leaves out of its answer is reclassified on its own. Returns
+    {id: 0 / 1 / "UNKNOWN"} like news_classifier_agent.
+    """
+    return run_sync(aclassify_news_batch(articles))
+
+
+# ============ Validation ============
+
+async def avalidate_najdi_with_llm(text: str):
+    """Async version of validate_najdi_with_llm"""
+    system_prompt_validate = (
+        "أنت مدقق لغوي سريع. مهمتك هي تقييم النص المُعطى."
+        "هل هو مكتوب بشكل عام بلهجة نجدية عامية مفهومة؟ أم أنه لا يزال (فصحى بالكامل)؟"
+        "يجب أن ترد بتنسيق JSON حصراً. لا تكتب أي شيء آخر."
+        "التنسيق المطلوب هو: {\"is_najde\": true} إذا كان النص عامياً."
+        "أو {\"is_najde\": false} فقط إذا كان النص لا يزال (فصحى) ولم يتم تحويله."
+    )
+    user_prompt_validate = f"الرجاء تقييم هذا النص: \n\n{text}"
+
+    validation_response_str = await acall_openai_llm(
+        system_prompt_validate,
+        user_prompt_validate,
+        MODEL_VALIDATOR,
+        is_json_mode=True,
+        role="validator"
+    )
+
+    if not validation_response_str:
+        print("فشل التدقيق (LLM 2). جاري إعادة المحاولة...")
         return None
 
+    try:
+        if validation_response_str.startswith("```json"):
+            validation_response_str = validation_response_str[7:-3].strip()
+
+        validation_json = json.loads(validation_response_str)
+        return validation_json.get("is_najde") is True
+
+    except json.JSONDecodeError as e:
+        print(f"fail فشل تحليل JSON من المدقق: {e}. جاري إعادة المحاولة...")
+        return False
+
+
+def validate_najdi_with_llm(text: str):
+    """
+    Ask MODEL_VALIDATOR whether `text` is Najdi dialect.
+    Returns True / False, or None when the call itself failed.
+    """
+    return run_sync(avalidate_najdi_with_llm(text))
+
+
+def local_najdi_verdict(text: str):
+    """
+    In-process Najdi verdict (True / False), or None when ambiguous or local validation is off.
+    A Najdi verdict is only returned with NAJDI_LOCAL_ACCEPT; otherwise the LLM validator confirms it.
+    """
+    if NAJDI_VALIDATOR_MODE != "local":
+        return None
+    verdict = classify_najdi(text)
+    NAJDI_LOCAL_VERDICTS.inc(result={True: "najdi", False: "fusha", None: "ambiguous"}[verdict])
+    if verdict is True and not NAJDI_LOCAL_ACCEPT:
+        return None
+    return verdict
+
+
+def validate_najdi(text: str):
+    """
+    Decide whether `text` is Najdi: the local scorer answers clear cases in
+    microseconds (Najdi ones only with NAJDI_LOCAL_ACCEPT) and the rest go to MODEL_VALIDATOR.
+    Returns True / False, or None when the LLM call failed.
+    """
+    verdict = local_najdi_verdict(text)
+    if verdict is not None:
+        return verdict
+    return validate_najdi_with_llm(text)
+
+
+async def avalidate_najdi(text: str):
+    """Async version of validate_najdi"""
+    verdict = local_najdi_verdict(text)
+    if verdict is not None:
+        return verdict
+    return await avalidate_najdi_with_llm(text)
+
+
+def looks_converted(fusha_text: str, dialect_text: str) -> bool:
+    """Cheap sanity check that a script was actually rewritten and not truncated or echoed back"""
+    if not dialect_text or not dialect_text.strip():
+        return False
+    if dialect_text.strip() == fusha_text.strip():
+        return False
+    ratio = len(dialect_text) / max(len(fusha_text), 1)
+    return 0.3 <= ratio <= 3.0
+
+
+# ============ Main Conversion Function (Updated) ============
+
+DIALECT_SYSTEM_PROMPT = (
+    "أنت مذيع بودكاست عربي متخصص في تبسيط الأخبار."
+    "مهمتك هي تحويل النص الفصيح التالي إلى لهجة نجدية سهلة ومفهومة للجميع،"
+    "بأسلوب شيق وجذاب وكأنك تسولف."
+    "لا تضف أي مقدمات أو خواتيم، فقط النص المحول."
+)
+
+
+async def _aconvert_text(fusha_text: str):
+    """Generate + validate one piece of text, up to MAX_RETRIES attempts; None if all fail"""
     current_retries = 0
     generated_text = ""
 
@@ -112,67 +334,366 @@ def convert_to_saudi_dialect(fusha_text: str):
         print(f"[Agent 2] معالجة: {fusha_text[:40]}... (محاولة {current_retries + 1}/{MAX_RETRIES})")
 
         # Generation Step (Podcast Agent Logic)
-        system_prompt_generate = (
-            "أنت مذيع بودكاست عربي متخصص في تبسيط الأخبار."
-            "مهمتك هي تحويل النص الفصيح التالي إلى لهجة نجدية سهلة ومفهومة للجميع،"
-            "بأسلوب شيق وجذاب وكأنك تسولف."
-            "لا تضف أي مقدمات أو خواتيم، فقط النص المحول."
-        )
         user_prompt_generate = f"حول هذا النص: \n\n{fusha_text}"
 
-        generated_text = call_openai_llm(
-            system_prompt_generate,
+        generated_text = await acall_openai_llm(
+            DIALECT_SYSTEM_PROMPT,
             user_prompt_generate,
-            MODEL_GENERATOR
+            MODEL_GENERATOR,
+            role="generator"
         )
 
         if not generated_text:
             print(" فشل التوليد (LLM 1). جاري إعادة المحاولة...")
             current_retries += 1
-            time.sleep(1)
             continue
 
         # Validation Step (Podcast Agent Logic)
-        system_prompt_validate = (
-            "أنت مدقق لغوي سريع. مهمتك هي تقييم النص المُعطى."
-            "هل هو مكتوب بشكل عام بلهجة نجدية عامية مفهومة؟ أم أنه لا يزال (فصحى بالكامل)؟"
-            "يجب أن ترد بتنسيق JSON حصراً. لا تكتب أي شيء آخر."
-            "التنسيق المطلوب هو: {\"is_najde\": true} إذا كان النص عامياً."
-            "أو {\"is_najde\": false} فقط إذا كان النص لا يزال (فصحى) ولم يتم تحويله."
-        )
-        user_prompt_validate = f"الرجاء تقييم هذا النص: \n\n{generated_text}"
-
-        validation_response_str = call_openai_llm(
-            system_prompt_validate,
-            user_prompt_validate,
-            MODEL_VALIDATOR,
-            is_json_mode=True
-        )
+        is_najde = await avalidate_najdi(generated_text)
 
-        if not validation_response_str:
-            print("فشل التدقيق (LLM 2). جاري إعادة المحاولة...")
+        if is_najde is None:
             current_retries += 1
-            time.sleep(1)
             continue
 
-        try:
-            if validation_response_str.startswith("```json"):
-                validation_response_str = validation_response_str[7:-3].strip()
+        if is_najde:
+            print("Done نجح التحقق (لهجة نجدية).")
+            DIALECT_ATTEMPTS.observe(current_retries + 1)
+            return generated_text
+
+        print("Fail فشل التحقق (ليست لهجة نجدية). جاري إعادة التوليد...")
+        current_retries += 1
+
+    # Final failure
+    print(f" drop فشل نهائي في معالجة النص: {fusha_text[:50]}...")
+    DIALECT_ATTEMPTS.observe(MAX_RETRIES)
+    DIALECT_FAILURES.inc()
+    return None
+
+
+# Paragraph breaks, and sentence ends (punctuation followed by whitespace) inside paragraphs
+_paragraph_break_re = re.compile(r"\n\s*\n|\n")
+_sentence_break_re = re.compile(r"(?<=[.!?؟؛])\s+")
+
+
+def _pack_pieces(pieces, separator, max_chars):
+    """Greedily join consecutive pieces with `separator` while they fit in max_chars"""
+    packed = []
+    for piece in pieces:
+        if packed and len(packed[-1]) + len(separator) + len(piece) <= max_chars:
+            packed[-1] = packed[-1] + separator + piece
+        else:
+            packed.append(piece)
+    return packed
 
-            validation_json = json.loads(validation_response_str)
-            is_najde = validation_json.get("is_najde")
 
-            if is_najde is True:
-                print("Done نجح التحقق (لهجة نجدية).")
-                return generated_text
+def split_fusha_segments(text: str, max_chars: int = DIALECT_SEGMENT_MAX_CHARS):
+    """
+    Split Fusha text into segments of at most max_chars (where possible),
+    cutting at paragraph breaks first, then sentence ends, then spaces.
+    Returns [(segment, separator to put after its converted text)].
+    """
+    segments = []
+    paragraphs = [p.strip() for p in _paragraph_break_re.split(text) if p.strip()]
+    for paragraph in _pack_pieces(paragraphs, "\n\n", max_chars):
+        if len(paragraph) <= max_chars:
+            segments.append((paragraph, "\n\n"))
+            continue
+        sentences = []
+        for sentence in _sentence_break_re.split(paragraph):
+            if len(sentence) <= max_chars:
+                sentences.append(sentence)
             else:
-                print("Fail فشل التحقق (ليست لهجة نجدية). جاري إعادة التوليد...")
-                current_retries += 1
+                sentences.extend(_pack_pieces(sentence.split(), " ", max_chars))
+        parts = _pack_pieces(sentences, " ", max_chars)
+        segments.extend((part, " ") for part in parts[:-1])
+        segments.append((parts[-1], "\n\n"))
+    return segments
+
+
+async def _aconvert_segmented(fusha_text: str, convert_segment_text=None):
+    """
+    Convert a long text segment by segment, all segments at once. Each
+    segment retries on its own, so one rejection only redoes that segment.
+    `convert_segment_text` (default _aconvert_text) converts one segment.
+    """
+    convert_segment_text = convert_segment_text or _aconvert_text
+    segments = split_fusha_segments(fusha_text)
+    print(f"[Agent 2] نص طويل ({len(fusha_text)} حرف): {len(segments)} مقطع بالتوازي")
+    DIALECT_SEGMENTS.observe(len(segments))
+
+    async def convert_segment(segment):
+        key = cache_key("dialect", segment, MODEL_GENERATOR, DIALECT_PROMPT_VERSION, LLM_TEMPERATURE)
+        cached = await acache_get("dialect", key)
+        if cached is not None:
+            return cached
+        converted = await convert_segment_text(segment)
+        if converted:
+            await acache_put("dialect", key, converted)
+        return converted
+
+    converted = await asyncio.gather(*(convert_segment(segment) for segment, _ in segments))
+    if not all(converted):
+        print(f" drop فشل {sum(1 for c in converted if not c)} مقطع من {len(segments)}: {fusha_text[:50]}...")
+        return None
+
+    parts = []
+    for text, (_, separator) in zip(converted, segments):
+        parts.extend((text.strip(), separator))
+    return "".join(parts[:-1])
+
+
+async def aconvert_to_saudi_dialect(fusha_text: str):
+    """Async version of convert_to_saudi_dialect"""
+    if not openai_client:
+        print("ERROR: OpenAI client not initialized")
+        return None
+
+    key = cache_key("dialect", fusha_text, MODEL_GENERATOR, DIALECT_PROMPT_VERSION, LLM_TEMPERATURE)
+    cached = await acache_get("dialect", key)
+    if cached is not None:
+        print(f"[Agent 2] cache hit: {fusha_text[:40]}...")
+        return cached
+
+    if len(fusha_text) > DIALECT_SEGMENT_THRESHOLD_CHARS:
+        generated_text = await _aconvert_segmented(fusha_text)
+    else:
+        generated_text = await _aconvert_text(fusha_text)
+
+    if generated_text:
+        await acache_put("dialect", key, generated_text)
+    return generated_text
+
+
+def convert_to_saudi_dialect(fusha_text: str):
+    """
+    Convert Fusha Arabic to Saudi dialect using generation + validation (using colleague's logic)
+
+    Texts longer than DIALECT_SEGMENT_THRESHOLD_CHARS are split at paragraph /
+    sentence boundaries and the segments are converted concurrently.
+    """
+    return run_sync(aconvert_to_saudi_dialect(fusha_text))
+
+# ============ Streaming Conversion ============
+
+class DialectRejected(Exception):
+    """A streamed script turned out not to be Najdi (or could not be finished)"""
+
+
+class DialectStream:
+    """
+    One attempt at the Najdi script for an article, streamed as it is written.
+
+    Iterating yields text deltas from MODEL_GENERATOR. Every
+    DIALECT_STREAM_CHECK_CHARS characters the local scorer looks at the text
+    so far and stops the stream with DialectRejected on a clear Fusha verdict.
+    At the end the whole script goes through validate_najdi and, if rejected,
+    DialectRejected is raised so consumers discard what they built from the
+    deltas. A cached conversion is replayed without calling the LLM.
+    After a full iteration `text` holds the script and `accepted` is True.
+    """
 
+    def __init__(self, fusha_text: str):
+        self.fusha_text = fusha_text
+        self.text = ""
+        self.accepted = False
+
+    def __iter__(self):
+        key = cache_key("dialect", self.fusha_text, MODEL_GENERATOR, DIALECT_PROMPT_VERSION, LLM_TEMPERATURE)
+        cached = cache_get("dialect", key)
+        if cached is not None:
+            print(f"[Agent 2] cache hit (stream): {self.fusha_text[:40]}...")
+            self.text, self.accepted = cached, True
+            yield cached
+            return
+
+        print(f"[Agent 2] معالجة متدفقة: {self.fusha_text[:40]}...")
+        user_prompt_generate = f"حول هذا النص: \n\n{self.fusha_text}"
+        parts = []
+        length = 0
+        next_check = DIALECT_STREAM_CHECK_CHARS
+
+        deltas = iter_sync(astream_llm(
+            DIALECT_SYSTEM_PROMPT, user_prompt_generate, MODEL_GENERATOR,
+            role="generator", temperature=LLM_TEMPERATURE
+        ))
+        try:
+            for delta in deltas:
+                parts.append(delta)
+                length += len(delta)
+                if length >= next_check:
+                    next_check += DIALECT_STREAM_CHECK_CHARS
+                    if NAJDI_VALIDATOR_MODE == "local" and classify_najdi("".join(parts)) is False:
+                        raise DialectRejected("stream prefix is still Fusha")
+                yield delta
+        finally:
+            deltas.close()
+
+        self.text = "".join(parts)
+        if not looks_converted(self.fusha_text, self.text) or validate_najdi(self.text) is not True:
+            raise DialectRejected("streamed script failed validation")
+
+        print("Done نجح التحقق (لهجة نجدية، متدفق).")
+        self.accepted = True
+        cache_put("dialect", key, self.text)
+
+
+# ============ Combined Classification + Conversion ============
+
+_COMBINED_SCRIPT_TASK = (
+    "حول النص الفصيح إلى لهجة نجدية سهلة ومفهومة للجميع،"
+    "بأسلوب شيق وجذاب وكأنك تسولف. لا تضف أي مقدمات أو خواتيم، فقط النص المحول.\n"
+    "قيّم ثقتك (من 0 إلى 1) بأن النص المحول كله باللهجة النجدية وليس فصحى.\n"
+)
+COMBINED_SYSTEM_PROMPT = (
+    "أنت مذيع بودكاست عربي متخصص في تبسيط الأخبار، ومصنف محترف للأخبار.\n"
+    "المهمة الأولى: صنف الخبر إلى:\n"
+    "- 'جادة' (1): أخبار سياسية، أمنية، صحية سيئة، قرارات حكومية\n"
+    "- 'عادية' (0): أخبار ثقافية، ترفيهية، رياضية، حياتية، تقنية غير حرجة، مقالات رأي\n"
+    "المهمة الثانية: " + _COMBINED_SCRIPT_TASK +
+    "يجب أن ترد بتنسيق JSON فقط: "
+    "{\"classification\": 0 أو 1, \"script\": \"النص المحول\", \"confidence\": 0.0-1.0}"
+)
+# Segments of a long article: the article is classified separately, only script + confidence here
+COMBINED_SEGMENT_SYSTEM_PROMPT = (
+    "أنت مذيع بودكاست عربي متخصص في تبسيط الأخبار.\n"
+    "المهمة: " + _COMBINED_SCRIPT_TASK +
+    "يجب أن ترد بتنسيق JSON فقط: "
+    "{\"script\": \"النص المحول\", \"confidence\": 0.0-1.0}"
+)
+
+
+async def _aconvert_combined(fusha_text: str, system_prompt: str, user_prompt: str):
+    """
+    JSON-mode generation of {script, confidence} (plus classification, if the
+    prompt asks for it), up to MAX_RETRIES attempts.
+
+    A clear local verdict decides on its own; an ambiguous one goes to the LLM
+    validator only when the self-reported confidence is below
+    COMBINED_CONFIDENCE_THRESHOLD. Returns (classification or None, script or None).
+    """
+    classification = None
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        print(f"[Agent 2] معالجة مدمجة: {fusha_text[:40]}... (محاولة {attempt}/{MAX_RETRIES})")
+
+        response_str = await acall_openai_llm(
+            system_prompt,
+            user_prompt,
+            MODEL_GENERATOR,
+            is_json_mode=True,
+            role="combined"
+        )
+
+        if not response_str:
+            print(" فشل التوليد المدمج. جاري إعادة المحاولة...")
+            continue
+
+        try:
+            response_json = _parse_json_response(response_str)
         except json.JSONDecodeError as e:
-            print(f"fail فشل تحليل JSON من المدقق: {e}. جاري إعادة المحاولة...")
-            current_retries += 1
+            print(f"fail فشل تحليل JSON من الرد المدمج: {e}. جاري إعادة المحاولة...")
+            continue
+        if not isinstance(response_json, dict):
+            print("fail الرد المدمج ليس كائن JSON. جاري إعادة المحاولة...")
+            continue
 
-    # Final failure
-    print(f" drop فشل نهائي في معالجة النص: {fusha_text[:50]}...")
-    return None
\ No newline at end of file
+        if response_json.get("classification") in (0, 1):
+            classification = response_json["classification"]
+
+        script = response_json.get("script")
+        try:
+            confidence = float(response_json.get("confidence", 0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+
+        if not isinstance(script, str) or not looks_converted(fusha_text, script):
+            print("Fail النص المحول فارغ أو غير صالح. جاري إعادة التوليد...")
+            continue
+
+        is_najde = local_najdi_verdict(script)
+        if is_najde is None and confidence < COMBINED_CONFIDENCE_THRESHOLD:
+            print(f"[Agent 2] ثقة منخفضة ({confidence:.2f}), جاري التدقيق...")
+            is_najde = await avalidate_najdi_with_llm(script)
+            if is_najde is None:
+                continue
+
+        if is_najde is False:
+            print("Fail فشل التحقق (ليست لهجة نجدية). جاري إعادة التوليد...")
+            continue
+
+        print(f"Done نجح التحويل المدمج (تصنيف: {classification}, ثقة: {confidence:.2f}).")
+        DIALECT_ATTEMPTS.observe(attempt)
+        return classification, script
+
+    print(f" drop فشل نهائي في المعالجة المدمجة: {fusha_text[:50]}...")
+    DIALECT_ATTEMPTS.observe(MAX_RETRIES)
+    DIALECT_FAILURES.inc()
+    return classification, None
+
+
+async def _aconvert_segment_combined(segment: str):
+    _, script = await _aconvert_combined(
+        segment, COMBINED_SEGMENT_SYSTEM_PROMPT, f"النص: \n\n{segment}"
+    )
+    return script
+
+
+async def _aclassify_and_convert_long(title: str, fusha_text: str, classification):
+    """
+    Long texts: every segment goes through the combined JSON prompt, all at once.
+    The classification normally comes from the up-front batch; without one,
+    the classifier call runs alongside the segments.
+    """
+    if classification is None:
+        classification, script = await asyncio.gather(
+            aclassify_news(title, fusha_text), _aconvert_segmented(fusha_text, _aconvert_segment_combined)
+        )
+    else:
+        script = await _aconvert_segmented(fusha_text, _aconvert_segment_combined)
+    return classification, script
+
+
+def classify_and_convert(title: str, fusha_text: str, classification=None):
+    """
+    Classify the article and write its Najdi script in one JSON-mode call.
+
+    The model also reports how confident it is that the script is fully Najdi.
+    A clear verdict from the local scorer decides on its own; otherwise the
+    LLM validator only runs when that confidence is below
+    COMBINED_CONFIDENCE_THRESHOLD.
+    Texts longer than DIALECT_SEGMENT_THRESHOLD_CHARS are converted by
+    segments, each through the same JSON prompt without the classification;
+    pass the article's `classification` (e.g. from classify_news_batch) so it
+    needs no classifier call of its own.
+    Returns (classification, dialect_script); the script is None on failure.
+    """
+    if not openai_client:
+        print("ERROR: OpenAI client not initialized")
+        return "UNKNOWN", None
+
+    dialect_key = cache_key("dialect", fusha_text, MODEL_GENERATOR, DIALECT_PROMPT_VERSION, LLM_TEMPERATURE)
+    classify_key = cache_key("classification", _classifier_user_prompt(title, fusha_text),
+                             MODEL_CLASSIFIER, CLASSIFIER_PROMPT_VERSION, LLM_TEMPERATURE)
+    cached_script = cache_get("dialect", dialect_key)
+    cached_class = classification if classification is not None else cache_get("classification", classify_key)
+    if cached_script is not None and cached_class is not None:
+        print(f"[Agent 2] cache hit (combined): {fusha_text[:40]}...")
+        return cached_class, cached_script
+
+    if len(fusha_text) > DIALECT_SEGMENT_THRESHOLD_CHARS:
+        # One long generation would dominate latency; convert by segments concurrently
+        print(f"[Agent 2] نص طويل، تحويل مدمج بالمقاطع: {fusha_text[:40]}...")
+        new_class, script = run_sync(_aclassify_and_convert_long(title, fusha_text, cached_class))
+        if script:
+            cache_put("dialect", dialect_key, script)
+        return new_class, script
+
+    user_prompt_combined = f"العنوان: {title}\n\nالنص: \n\n{fusha_text}"
+    new_class, script = run_sync(_aconvert_combined(fusha_text, COMBINED_SYSTEM_PROMPT, user_prompt_combined))
+
+    if new_class is not None:
+        cache_put("classification", classify_key, new_class)
+    if script:
+        cache_put("dialect", dialect_key, script)
+    classification = new_class if new_class is not None else cached_class
+    return (classification if classification is not None else "UNKNOWN"), script
@@ -0,0 +1,149 @@
+import contextvars
+import math
+import threading
+from contextlib import contextmanager
+
+from config import LLM_MAX_TOKENS, LLM_MAX_TOKENS_HEADROOM, LLM_MIN_TOKENS
+from metrics_service import LLM_TOKENS
+
+# ============ Token Budgets ============
+# Roles whose answer size does not depend on the input
+FIXED_MAX_TOKENS = {"classifier": 16, "validator": 16}
+# Output tokens per input character, per role; seeds for a cold start, then learned
+DEFAULT_OUTPUT_RATIOS = {"generator": 0.6, "combined": 0.7, "classifier_batch": 0.03}
+RATIO_SMOOTHING = 0.1  # weight of the newest observation in the moving average
+
+_output_ratios = dict(DEFAULT_OUTPUT_RATIOS)
+_ratios_lock = threading.Lock()
+
+
+def max_tokens_for(role: str, input_chars: int) -> int:
+    """
+    Completion budget for one call: fixed for short-answer roles, otherwise the
+    learned output/input ratio times the input length with some headroom.
+    """
+    if role in FIXED_MAX_TOKENS:
+        return FIXED_MAX_TOKENS[role]
+    with _ratios_lock:
+        ratio = _output_ratios.get(role)
+    if ratio is None:
+        return LLM_MAX_TOKENS
+    budget = math.ceil(input_chars * ratio * LLM_MAX_TOKENS_HEADROOM)
+    return max(LLM_MIN_TOKENS, min(LLM_MAX_TOKENS, budget))
+
+
+def observe_output_ratio(role: str, input_chars: int, completion_tokens: int):
+    """Fold a finished (not truncated) answer into the role's output/input ratio"""
+    if role in FIXED_MAX_TOKENS or input_chars <= 0 or not completion_tokens:
+        return
+    observed = completion_tokens / input_chars
+    with _ratios_lock:
+        previous = _output_ratios.get(role)
+        _output_ratios[role] = observed if previous is None else (
+            previous + RATIO_SMOOTHING * (observed - previous)
+        )
+
+
+def output_ratios() -> dict:
+    with _ratios_lock:
+        return dict(_output_ratios)
+
+
+# ============ Usage Accounting ============
+
+class UsageTotals:
+    """Running sums of LLM calls, tokens and latency, overall and per role"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_seconds = 0.0
+        self.by_role = {}
+
+    def add(self, role, prompt_tokens, completion_tokens, latency_seconds):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.latency_seconds += latency_seconds
+            role_totals = self.by_role.setdefault(role, [0, 0, 0])
+            role_totals[0] += 1
+            role_totals[1] += prompt_tokens
+            role_totals[2] += completion_tokens
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "latency_seconds": round(self.latency_seconds, 3),
+                "by_role": {
+                    role: {"calls": calls, "prompt_tokens": prompt, "completion_tokens": completion}
+                    for role, (calls, prompt, completion) in sorted(self.by_role.items())
+                }
+            }
+
+
+class RunUsage:
+    """Usage of one pipeline run: a run total plus one UsageTotals per article index"""
+
+    def __init__(self):
+        self.total = UsageTotals()
+        self._articles = {}
+        self._lock = threading.Lock()
+
+    def article(self, index) -> UsageTotals:
+        with self._lock:
+            totals = self._articles.get(index)
+            if totals is None:
+                totals = self._articles[index] = UsageTotals()
+            return totals
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            articles = dict(self._articles)
+        return {
+            "total": self.total.to_dict(),
+            "articles": {str(index): totals.to_dict() for index, totals in sorted(articles.items())}
+        }
+
+
+# Totals that calls made in the current context are added to
+_active_totals = contextvars.ContextVar("llm_usage_totals", default=())
+
+
+@contextmanager
+def usage_scope(*totals):
+    """Count every LLM call made inside the block (in this thread) into `totals` too"""
+    token = _active_totals.set(_active_totals.get() + tuple(totals))
+    try:
+        yield
+    finally:
+        _active_totals.reset(token)
+
+
+def active_totals():
+    return _active_totals.get()
+
+
+def bind_totals(coro, totals):
+    """Wrap a coroutine so calls inside it count into `totals` (contexts don't cross threads)"""
+    async def bound():
+        token = _active_totals.set(totals)
+        try:
+            return await coro
+        finally:
+            _active_totals.reset(token)
+    return bound()
+
+
+def record_usage(model, role, prompt_tokens, completion_tokens, latency_seconds):
+    """Account one finished call in the metrics and in every active scope"""
+    LLM_TOKENS.inc(prompt_tokens, model=model, role=role, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model, role=role, kind="completion")
+    for totals in _active_totals.get():
+        totals.add(role, prompt_tokens, completion_tokens, latency_seconds)
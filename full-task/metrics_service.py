@@ -0,0 +1,202 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast local work up to long XTTS runs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000, 100_000_000)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+COUNT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+        with self._lock:
+            snapshot = {key: self._copy(value) for key, value in self._series.items()}
+        for key in sorted(snapshot):
+            lines.extend(self._render_series(key, snapshot[key]))
+        return lines
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"]
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observe() is one bisect and a few additions under a lock"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (+Inf last), sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][idx] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ("le", _format_number(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============ Pipeline Metrics ============
+
+SCRAPE_SECONDS = Histogram(
+    "scrape_duration_seconds", "Time to fetch and parse the news feed")
+FEED_FETCH_SECONDS = Histogram(
+    "feed_fetch_duration_seconds", "Time to fetch and parse one feed source", ("source",))
+FEED_FETCH_FAILURES = Counter(
+    "feed_fetch_failures_total", "Feed sources that failed or missed the scrape deadline", ("source", "reason"))
+ARTICLE_FETCHES = Counter(
+    "article_fetches_total", "Full article page fetches (body / too_short / timeout / error)", ("result",))
+HTTP_CACHE_REQUESTS = Counter(
+    "http_cache_requests_total", "Conditional GETs by outcome (not_modified / unchanged / modified)",
+    ("kind", "result"))
+NEAR_DUPLICATES = Counter(
+    "near_duplicates_total", "Articles skipped as near-duplicates of the batch or the rolling window", ("scope",))
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "Latency of successful OpenAI chat completion requests", ("model", "role"))
+LLM_CALL_ERRORS = Counter(
+    "llm_call_errors_total", "call_openai_llm calls that raised or returned nothing", ("model", "role"))
+LLM_CALL_RETRIES = Counter(
+    "llm_call_retries_total", "OpenAI requests retried after a transient error", ("model", "reason"))
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Prompt / completion tokens reported by the API", ("model", "role", "kind"))
+LLM_TRUNCATED = Counter(
+    "llm_truncated_total", "Answers cut off by their max_tokens budget", ("model", "role"))
+LLM_LIMITER_WAIT_SECONDS = Histogram(
+    "llm_limiter_wait_seconds", "Time spent waiting on the RPM/TPM limiter before a request", ("model",))
+DIALECT_ATTEMPTS = Histogram(
+    "dialect_conversion_attempts", "Generation attempts per converted text or segment (validator retries + 1)",
+    buckets=COUNT_BUCKETS)
+DIALECT_SEGMENTS = Histogram(
+    "dialect_conversion_segments", "Segments per long-text dialect conversion", buckets=COUNT_BUCKETS)
+DIALECT_FAILURES = Counter(
+    "dialect_conversion_failures_total", "Conversions that exhausted MAX_RETRIES")
+NAJDI_LOCAL_VERDICTS = Counter(
+    "najdi_local_verdicts_total", "Local Najdi scorer decisions (ambiguous ones go to the LLM validator)", ("result",))
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total", "LLM result cache lookups", ("kind", "result"))
+TTS_CHUNK_INFERENCE_SECONDS = Histogram(
+    "tts_chunk_inference_seconds", "Time spent in model.inference per text chunk (batch time / chunks when batched)", ("voice",))
+TTS_BATCH_CHUNKS = Histogram(
+    "tts_batch_chunks", "Chunks per batched XTTS inference pass", ("voice",), buckets=COUNT_BUCKETS)
+TTS_AUDIO_CACHE_REQUESTS = Counter(
+    "tts_audio_cache_requests_total", "Synthesized chunk cache lookups", ("voice", "result"))
+TTS_AUDIO_CACHE_BYTES = Gauge(
+    "tts_audio_cache_bytes", "Size of the synthesized chunk cache on disk")
+TTS_REAL_TIME_FACTOR = Histogram(
+    "tts_real_time_factor", "tts_arabic synthesis time divided by audio duration", ("voice",),
+    buckets=RATIO_BUCKETS)
+TTS_FIRST_AUDIO_SECONDS = Histogram(
+    "tts_first_audio_seconds", "Time from the start of dialect generation (or of a live audio request) to the first synthesized audio",
+    ("mode",))
+TTS_CROSSFADE_SECONDS = Histogram(
+    "tts_crossfade_duration_seconds", "Time spent combining chunks with crossfade per tts_arabic call")
+UPLOAD_SECONDS = Histogram(
+    "upload_duration_seconds", "upload_to_gcs latency", ("kind",))
+UPLOAD_BYTES = Histogram(
+    "upload_bytes", "Size of files passed to upload_to_gcs", ("kind",), buckets=SIZE_BUCKETS)
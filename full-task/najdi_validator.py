@@ -0,0 +1,205 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from config import NAJDI_ACCEPT_THRESHOLD, NAJDI_REJECT_THRESHOLD, NAJDI_NGRAM_PROFILE_PATH
+
+# ============ Normalization ============
+
+_diacritics_re = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u0640]")  # tashkeel + tatweel
+_non_arabic_re = re.compile(r"[^\u0621-\u064A\s]")
+_whitespace_re = re.compile(r"\s+")
+_LETTER_FORMS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+
+
+def normalize_arabic(text: str) -> str:
+    """Strip diacritics/punctuation and unify alef/yaa/taa marbuta forms so markers match regardless of spelling"""
+    text = _diacritics_re.sub("", text or "")
+    text = text.translate(_LETTER_FORMS)
+    text = _non_arabic_re.sub(" ", text)
+    return _whitespace_re.sub(" ", text).strip()
+
+
+# ============ Lexical Markers ============
+# Weights are rough log-odds: higher = stronger evidence. Keys are normalized forms.
+
+NAJDI_MARKERS = {
+    "وش": 2.0, "وشلون": 2.0, "وشو": 2.0, "ليش": 1.5, "يبي": 2.0, "تبي": 2.0, "نبي": 2.0, "ابي": 1.5,
+    "يبون": 2.0, "ودي": 1.2, "حنا": 1.5, "مب": 1.5, "مهب": 2.0, "ذا": 1.0, "ذي": 1.0, "هذي": 1.0,
+    "ذولا": 1.5, "هذولا": 1.5, "اللي": 1.0, "الحين": 1.5, "كذا": 0.8, "زين": 1.0, "عشان": 1.0,
+    "ترا": 1.0, "تري": 1.0, "واجد": 1.2, "مره": 0.5, "شي": 0.6, "سالفه": 1.2, "السالفه": 1.2,
+    "يسولف": 1.5, "نسولف": 1.5, "بس": 0.6, "وين": 1.2, "متي": 0.3, "يوم": 0.2, "اجل": 0.8,
+    "علشان": 1.0, "يعني": 0.4, "طيب": 0.5, "ياخي": 1.0, "هالشي": 1.5, "فيه": 0.2,
+}
+# Prefix markers: the demonstrative "هال" (هالموضوع) and the future "بـ" on verbs are hard to
+# match reliably, so only the unambiguous demonstrative is used
+NAJDI_PREFIXES = {"هال": 1.2}
+
+FUSHA_MARKERS = {
+    "لم": 1.0, "لن": 1.0, "سوف": 1.2, "الذي": 1.2, "التي": 1.2, "الذين": 1.2, "اللذان": 1.5,
+    "اللتان": 1.5, "ليس": 1.0, "ليست": 1.0, "لماذا": 1.2, "ماذا": 1.0, "هذه": 0.5, "ايضا": 0.6,
+    "حيث": 0.8, "قد": 0.5, "يريد": 1.0, "تريد": 1.0, "نحن": 1.0, "ثمه": 1.2, "اذ": 0.6, "عندئذ": 1.5,
+    "ريثما": 1.5, "لدي": 0.8, "لدينا": 0.8, "انما": 0.8, "كي": 0.6, "لكي": 0.8, "اولئك": 1.2, "هؤلاء": 0.8,
+    "يوجد": 0.8, "كلا": 0.8, "بل": 0.6,
+}
+
+# ============ Character N-gram Model ============
+# Small seed corpora; replace with a profile trained on real samples via benchmarks/najdi_validator_eval.py
+# (--train-profile). Keep them disjoint from benchmarks/fixtures/najdi_samples.jsonl, or the eval is inflated.
+
+_NAJDI_SEED = [
+    "وش السالفة يا جماعة؟ اليوم بنسولف عن موضوع يهم الكل",
+    "أمس رحت السوق وما لقيت موقف، الدنيا زحمة على الآخر",
+    "الولد يبي جوال جديد وأبوه يقول له اصبر لين يجي راتبي",
+    "اللي صار إن الجهات المختصة طلعت بمبادرة جديدة عشان تحسن حياة الناس",
+    "ليش كذا؟ لأن الناس يبون حدائق وممشى زين",
+    "مب كل شي يجي بسهولة، لازم الواحد يتعب شوي",
+    "تدري وش أحلى شي في الشتا؟ القعدة عند النار مع الربع",
+    "يعني بالمختصر، السالفة كلها تدور حول الأكل المحلي ودعم المزارعين",
+    "وش فيك ساكت؟ قل لنا وش اللي مضايقك",
+    "حطوا في بالكم ترى الدوام بكرة بيبدأ بدري",
+]
+_FUSHA_SEED = [
+    "يعد التعليم المبكر حجر الأساس في بناء شخصية الطفل وتنمية مهاراته",
+    "وتتضمن الخطة إنشاء مراكز صحية جديدة في القرى والمناطق النائية",
+    "ويؤكد الباحثون أن القراءة المنتظمة تنمي قدرة الطفل على التركيز والتعبير",
+    "ليس من السهل أن يكتب المرء عن مدينته دون أن يستحضر طفولته فيها",
+    "وفي المساء تعود الأسر إلى بيوتها بعد يوم طويل من العمل والدراسة",
+    "ومن المتوقع أن تسهم هذه الاتفاقية في تعزيز التبادل التجاري بين البلدين",
+    "وقد شهدت الأسواق المالية تراجعاً ملحوظاً خلال الأسبوع الماضي",
+    "وحذرت الجهات المعنية من الاقتراب من الأودية أثناء هطول الأمطار الغزيرة",
+    "فالشباب يحملون أحلاماً كبيرة، والكبار يحملون خبرة طويلة، ولا غنى لأحدهما عن الآخر",
+    "وينبغي للمؤسسات أن تراجع سياساتها بما يتلاءم مع متطلبات المرحلة المقبلة",
+]
+NGRAM_SIZE = 3
+
+
+def _char_ngrams(text: str):
+    padded = f" {text} "
+    return [padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)]
+
+
+def build_ngram_profile(najdi_texts, fusha_texts):
+    """Per-trigram log-likelihood ratios (Najdi vs Fusha) with add-one smoothing"""
+    najdi_counts = Counter(g for t in najdi_texts for g in _char_ngrams(normalize_arabic(t)))
+    fusha_counts = Counter(g for t in fusha_texts for g in _char_ngrams(normalize_arabic(t)))
+    vocabulary = set(najdi_counts) | set(fusha_counts)
+    najdi_total = sum(najdi_counts.values()) + len(vocabulary)
+    fusha_total = sum(fusha_counts.values()) + len(vocabulary)
+    return {
+        gram: math.log((najdi_counts[gram] + 1) / najdi_total) - math.log((fusha_counts[gram] + 1) / fusha_total)
+        for gram in vocabulary
+    }
+
+
+def _load_ngram_profile():
+    if NAJDI_NGRAM_PROFILE_PATH and os.path.exists(NAJDI_NGRAM_PROFILE_PATH):
+        try:
+            with open(NAJDI_NGRAM_PROFILE_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load Najdi n-gram profile, using seed profile: {e}")
+    return build_ngram_profile(_NAJDI_SEED, _FUSHA_SEED)
+
+
+_ngram_llr = _load_ngram_profile()
+
+# Weights of the three signals inside the logistic score
+LEXICAL_WEIGHT = 0.35     # per marker point per 100 tokens
+NGRAM_WEIGHT = 6.0        # per mean trigram log-ratio
+SCORE_BIAS = 0.0
+# Marker evidence is counted per window of tokens, so Najdi has to run through
+# the text: one strong opener in front of a Fusha paragraph must not carry it
+WINDOW_TOKENS = 16
+WINDOW_POINTS_CAP = 3.0   # marker points a single window can contribute, per side
+
+
+# ============ Scoring ============
+
+def _marker_points(tokens):
+    najdi_points = 0.0
+    fusha_points = 0.0
+    for token in tokens:
+        # Conjunction "و" is glued to the next word in Arabic script
+        bare = token[1:] if token.startswith("و") and len(token) > 2 else token
+        najdi_points += NAJDI_MARKERS.get(token, 0.0) or NAJDI_MARKERS.get(bare, 0.0)
+        fusha_points += FUSHA_MARKERS.get(token, 0.0) or FUSHA_MARKERS.get(bare, 0.0)
+        for prefix, weight in NAJDI_PREFIXES.items():
+            if bare.startswith(prefix) and len(bare) > len(prefix) + 1:
+                najdi_points += weight
+    return najdi_points, fusha_points
+
+
+def _windows(tokens):
+    """WINDOW_TOKENS-token windows; a short remainder joins the previous window"""
+    windows = [tokens[i:i + WINDOW_TOKENS] for i in range(0, len(tokens), WINDOW_TOKENS)]
+    if len(windows) > 1 and len(windows[-1]) < WINDOW_TOKENS // 2:
+        windows[-2] = windows[-2] + windows.pop()
+    return windows
+
+
+def najdi_features(text: str) -> dict:
+    """
+    Capped marker densities (per 100 tokens), the share of windows that lean
+    Najdi and the mean trigram log-ratio of a text
+    """
+    normalized = normalize_arabic(text)
+    tokens = normalized.split()
+    if not tokens:
+        return {"tokens": 0, "najdi_density": 0.0, "fusha_density": 0.0, "najdi_coverage": 0.0, "ngram_llr": 0.0}
+
+    windows = _windows(tokens)
+    najdi_points = 0.0
+    fusha_points = 0.0
+    najdi_windows = 0
+    for window in windows:
+        najdi, fusha = _marker_points(window)
+        najdi_points += min(najdi, WINDOW_POINTS_CAP)
+        fusha_points += min(fusha, WINDOW_POINTS_CAP)
+        najdi_windows += najdi > fusha
+
+    grams = _char_ngrams(normalized)
+    ngram_llr = sum(_ngram_llr.get(g, 0.0) for g in grams) / len(grams)
+
+    scale = 100.0 / len(tokens)
+    return {
+        "tokens": len(tokens),
+        "najdi_density": najdi_points * scale,
+        "fusha_density": fusha_points * scale,
+        "najdi_coverage": najdi_windows / len(windows),
+        "ngram_llr": ngram_llr,
+    }
+
+
+def najdi_score(text: str) -> float:
+    """
+    Probability-like score in [0, 1] that the text is Najdi dialect rather than Fusha.
+    It can only go above 0.5 as far as the share of Najdi-leaning windows allows.
+    """
+    features = najdi_features(text)
+    if not features["tokens"]:
+        return 0.0
+    logit = (
+        LEXICAL_WEIGHT * (features["najdi_density"] - features["fusha_density"])
+        + NGRAM_WEIGHT * features["ngram_llr"]
+        + SCORE_BIAS
+    )
+    score = 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, logit))))
+    return min(score, 0.5 + 0.5 * features["najdi_coverage"])
+
+
+def classify_najdi(text: str, accept_threshold: float = None, reject_threshold: float = None):
+    """
+    Local verdict: True (Najdi), False (still Fusha) or None when the score is
+    between the thresholds and the LLM validator should decide.
+    """
+    accept = NAJDI_ACCEPT_THRESHOLD if accept_threshold is None else accept_threshold
+    reject = NAJDI_REJECT_THRESHOLD if reject_threshold is None else reject_threshold
+    score = najdi_score(text)
+    if score >= accept:
+        return True
+    if score <= reject:
+        return False
+    return None
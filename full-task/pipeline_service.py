@@ -0,0 +1,483 @@
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from config import (
+    OUTPUT_DIR, LLM_MODE, PIPELINE_LLM_WORKERS, PIPELINE_TTS_WORKERS,
+    PIPELINE_UPLOAD_WORKERS, PIPELINE_QUEUE_SIZE, PIPELINE_STREAM_TTS, NEAR_DUP_ENABLED,
+    DIALECT_SEGMENT_THRESHOLD_CHARS
+)
+from llm_service import (
+    convert_to_saudi_dialect, news_classifier_agent, classify_and_convert, classify_news_batch,
+    DialectStream
+)
+from tts_service import generate_audio, generate_audio_streaming
+from storage_service import upload_to_gcs, cleanup_local_files
+from article_store import article_fingerprint, get_processed_episode, record_processed_episode
+from dedup_service import find_near_duplicates, record_signature
+from llm_usage import RunUsage, usage_scope
+
+# Marks the end of a stage's input queue
+_STOP = object()
+
+
+# ============ Staged Pipeline Engine ============
+
+def run_staged_pipeline(items, stages, queue_size=PIPELINE_QUEUE_SIZE, on_result=None,
+                        on_progress=None, cancel_event=None, collect=True):
+    """
+    Run items through a chain of stages that overlap in time.
+
+    `stages` is a list of (name, fn, workers). Every stage gets its own pool of
+    worker threads reading from a bounded queue, so a slow stage applies
+    backpressure instead of piling up work in memory. A stage function returns
+    the payload for the next stage, or None to drop the item.
+
+    `on_progress(item_idx, stage_name, status)` is called after every stage
+    with status 'done', 'dropped' or 'error'. Setting `cancel_event` stops
+    feeding new items and drops whatever is still queued; items already inside
+    a stage function finish that stage first.
+
+    Returns the outputs of the last stage in the original item order, or an
+    empty list with `collect=False` (results then only go to `on_result`).
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    remaining_workers = [workers for _, _, workers in stages]
+    counter_lock = threading.Lock()
+    results = {}
+    results_lock = threading.Lock()
+
+    def notify(callback, *args):
+        """Run an on_progress / on_result callback; a failing callback must not kill the worker"""
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Pipeline callback {getattr(callback, '__name__', callback)} failed: {e}")
+            traceback.print_exc()
+
+    def worker(stage_idx):
+        name, fn, _ = stages[stage_idx]
+        in_queue = queues[stage_idx]
+        is_last = stage_idx == len(stages) - 1
+
+        try:
+            while True:
+                entry = in_queue.get()
+                if entry is _STOP:
+                    break
+
+                item_idx, payload = entry
+                if cancel_event is not None and cancel_event.is_set():
+                    continue
+
+                status = 'done'
+                try:
+                    output = fn(payload)
+                except Exception as e:
+                    print(f"Error in {name} stage for item {item_idx + 1}: {e}")
+                    traceback.print_exc()
+                    output = None
+                    status = 'error'
+
+                if output is None and status == 'done':
+                    status = 'dropped'
+                if on_progress:
+                    notify(on_progress, item_idx, name, status)
+                if output is None:
+                    continue
+
+                if is_last:
+                    if collect:
+                        with results_lock:
+                            results[item_idx] = output
+                    if on_result:
+                        notify(on_result, item_idx, output)
+                else:
+                    queues[stage_idx + 1].put((item_idx, output))
+        finally:
+            # The last worker to leave a stage closes the next stage's queue, even if this one died
+            with counter_lock:
+                remaining_workers[stage_idx] -= 1
+                stage_done = remaining_workers[stage_idx] == 0
+            if stage_done and not is_last:
+                for _ in range(stages[stage_idx + 1][2]):
+                    queues[stage_idx + 1].put(_STOP)
+
+    threads = []
+    for stage_idx, (name, _, workers) in enumerate(stages):
+        for n in range(workers):
+            thread = threading.Thread(target=worker, args=(stage_idx,), name=f"{name}-{n}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    for item_idx, item in enumerate(items):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        queues[0].put((item_idx, item))
+    for _ in range(stages[0][2]):
+        queues[0].put(_STOP)
+
+    for thread in threads:
+        thread.join()
+
+    return [results[idx] for idx in sorted(results)]
+
+
+# ============ Article Stages ============
+
+def _prepare_article(work):
+    """Copy title / text / ISO publication date / publisher from the scraped article into the work item"""
+    article = work['article']
+    publication_date = article['date']
+    if publication_date:
+        dt = parsedate_to_datetime(publication_date)
+        publication_date = dt.isoformat()
+
+    work.update({
+        "title": article['title'],
+        "fusha_text": article['description_fusha'],
+        "publication_date": publication_date,
+        "publisher": article.get('publisher')
+    })
+    return work['title'], work['fusha_text']
+
+
+def _llm_stage(work):
+    """Classify the article and convert it to Saudi dialect"""
+    idx, total = work['index'], work['total']
+
+    print(f"\n--- [LLM] Article {idx}/{total}: {work['article']['title'][:50]}...")
+    work['llm_started'] = time.perf_counter()
+
+    title, fusha_text = _prepare_article(work)
+
+    if LLM_MODE == "combined":
+        # Long articles come with their classification from the up-front batch
+        classification_result, dialect_script = classify_and_convert(title, fusha_text, work.get('classification'))
+    else:
+        # Normally classified up front for the whole scrape by process_articles
+        classification_result = work.get('classification')
+        if classification_result is None:
+            classification_result = news_classifier_agent(title, fusha_text)
+        dialect_script = convert_to_saudi_dialect(fusha_text)
+
+    # Determine voice type: '1' (Serious) maps to 'serious', '0' (Normal/Default) maps to 'normal'
+    voice_type = 'serious' if classification_result == 1 else 'normal'
+    print(f"[LLM] Article {idx} classification: {classification_result} -> Voice: {voice_type}")
+
+    if not dialect_script or "ERROR" in dialect_script:
+        print(f"Skipping article {idx} (LLM failed)")
+        return None
+
+    work.update({
+        "voice_type": voice_type,
+        "dialect_script": dialect_script
+    })
+    return work
+
+
+def _tts_stage(work):
+    """Synthesize the dialect script with the voice picked by the classifier"""
+    idx, voice_type = work['index'], work['voice_type']
+
+    print(f"[TTS] Article {idx}: generating audio with **{voice_type.upper()}** voice...")
+    audio_filename = f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{voice_type}"
+    audio_path, audio_duration = generate_audio(
+        work['dialect_script'], audio_filename, voice_type=voice_type, generation_started=work.get('llm_started')
+    )
+
+    if not audio_path:
+        print(f"Skipping article {idx} (TTS failed)")
+        return None
+
+    print(f"[TTS] Article {idx} duration: {audio_duration} seconds")
+
+    work.update({
+        "audio_filename": audio_filename,
+        "audio_path": audio_path,
+        "audio_duration": audio_duration
+    })
+    return work
+
+
+def _stream_stage(work):
+    """
+    Write the dialect script and synthesize it in one pass: each chunk is
+    queued for TTS as soon as the generator finishes its sentence. If the
+    streamed script is rejected, the partial audio is dropped and the article
+    goes through the regular convert + generate path instead.
+    """
+    idx, total = work['index'], work['total']
+
+    print(f"\n--- [LLM+TTS] Article {idx}/{total}: {work['article']['title'][:50]}...")
+
+    title, fusha_text = _prepare_article(work)
+
+    # Classified up front for the whole scrape by process_articles
+    classification_result = work.get('classification')
+    if classification_result is None:
+        classification_result = news_classifier_agent(title, fusha_text)
+    voice_type = 'serious' if classification_result == 1 else 'normal'
+    print(f"[LLM+TTS] Article {idx} classification: {classification_result} -> Voice: {voice_type}")
+
+    audio_filename = f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{voice_type}"
+    stream = DialectStream(fusha_text)
+    audio_path, audio_duration = generate_audio_streaming(stream, audio_filename, voice_type=voice_type)
+
+    if stream.accepted and audio_path:
+        dialect_script = stream.text
+    else:
+        print(f"[LLM+TTS] Article {idx}: streamed script rejected, falling back to full conversion")
+        dialect_script = convert_to_saudi_dialect(fusha_text)
+        if not dialect_script:
+            print(f"Skipping article {idx} (LLM failed)")
+            return None
+        audio_path, audio_duration = generate_audio(dialect_script, audio_filename, voice_type=voice_type)
+        if not audio_path:
+            print(f"Skipping article {idx} (TTS failed)")
+            return None
+
+    print(f"[LLM+TTS] Article {idx} duration: {audio_duration} seconds")
+
+    work.update({
+        "voice_type": voice_type,
+        "dialect_script": dialect_script,
+        "audio_filename": audio_filename,
+        "audio_path": audio_path,
+        "audio_duration": audio_duration
+    })
+    return work
+
+
+def _is_remote_url(url) -> bool:
+    return isinstance(url, str) and url.startswith(("https://", "http://"))
+
+
+def _upload_stage(work):
+    """Write the script/original files, upload everything and build the episode JSON"""
+    idx = work['index']
+    audio_filename = work['audio_filename']
+
+    script_filename = f"{audio_filename}_script.txt"
+    script_path = os.path.join(OUTPUT_DIR, script_filename)
+    with open(script_path, 'w', encoding='utf-8') as f:
+        f.write(work['dialect_script'])
+
+    content_filename = f"{audio_filename}_original.txt"
+    content_path = os.path.join(OUTPUT_DIR, content_filename)
+    with open(content_path, 'w', encoding='utf-8') as f:
+        f.write(work['fusha_text'])
+
+    print(f"[Upload] Article {idx}: uploading to Google Cloud Storage...")
+    audio_gcs_url = upload_to_gcs(work['audio_path'], f"audio/{audio_filename}.wav")
+    script_gcs_url = upload_to_gcs(script_path, f"scripts/{script_filename}")
+    content_gcs_url = upload_to_gcs(content_path, f"content/{content_filename}")
+
+    cleanup_local_files(work['audio_path'], script_path, content_path)
+
+    title = work['title']
+    episode_json = {
+        "article": {
+            "title": title,
+            "category": "news",
+            "author": None,
+            "publisher": work['publisher'],
+            "publicationDate": work['publication_date'],
+            "contentRawUrl": content_gcs_url,
+            "scriptUrl": script_gcs_url
+        },
+        "audio": {
+            "duration": work['audio_duration'],
+            "format": "wav",
+            "urlPath": audio_gcs_url
+        },
+        "episode": {
+            "title": title,
+            "description": f"بودكاست: {title}",
+            "scriptUrlPath": script_gcs_url,
+            "imageUrl": "https://i.imgur.com/WRPZCQa.png"
+        }
+    }
+
+    if all(_is_remote_url(url) for url in (audio_gcs_url, script_gcs_url, content_gcs_url)):
+        record_processed_episode(work['fingerprint'], episode_json)
+        record_signature(work['fingerprint'], title, work.get('signature'))
+    else:
+        # upload_to_gcs fell back to local paths, which were just cleaned up; a later run retries
+        print(f"[Upload] Article {idx}: not all files reached GCS, not recording it as processed")
+
+    print(f"Article {idx} processed successfully")
+    return episode_json
+
+
+def _with_usage_scope(stage_fn, run_usage):
+    """Count the LLM calls a stage makes into the run total and the article's own total"""
+    def run(work):
+        with usage_scope(run_usage.total, run_usage.article(work['index'])):
+            return stage_fn(work)
+    return run
+
+
+def _needs_up_front_classification(work):
+    """Whether the LLM stage would otherwise spend a classifier call of its own on this article"""
+    if LLM_MODE != "combined" or PIPELINE_STREAM_TTS:
+        return True
+    return len(work['article']['description_fusha']) > DIALECT_SEGMENT_THRESHOLD_CHARS
+
+
+def _classify_up_front(items, run_usage):
+    """
+    One batched classifier pass instead of a request per article; the feed
+    description is enough to pick a voice and keeps the batches small
+    """
+    pending = [(item_idx, work) for item_idx, work in items
+               if 'classification' not in work and _needs_up_front_classification(work)]
+    if not pending:
+        return
+    with usage_scope(run_usage.total):
+        classifications = classify_news_batch([
+            (item_idx, work['article']['title'],
+             work['article'].get('summary') or work['article']['description_fusha'])
+            for item_idx, work in pending
+        ])
+    for item_idx, work in pending:
+        work['classification'] = classifications.get(item_idx, "UNKNOWN")
+
+
+def process_articles(articles, on_result=None, on_progress=None, cancel_event=None, force=False,
+                     collect=True, usage=None):
+    """
+    Turn scraped articles into episode JSON objects.
+
+    Articles already in the processed-article index are answered from it; only
+    new ones go through the pipeline (`force=True` reprocesses everything).
+    New articles that are near-duplicates of an article processed in the last
+    NEAR_DUP_WINDOW_DAYS are skipped. Of near-duplicates within the scrape,
+    only the longest goes through the pipeline; the others are skipped once
+    it is uploaded, or tried in turn if it fails, so each story is
+    synthesized once (see dedup_service).
+    In "separate" LLM mode (and when streaming into TTS, which needs the voice
+    before the script exists) the new articles are classified up front in
+    batched requests. In "combined" mode only articles long enough to be
+    converted by segments are; for the others classification rides along
+    with the combined dialect conversion call.
+    LLM, TTS and upload work overlap across articles, so the total time is
+    close to that of the slowest stage. Episodes come back in scrape order;
+    articles that fail in any stage are left out. With `collect=False` nothing
+    is kept in memory and episodes are only delivered through `on_result`.
+
+    Pass a RunUsage as `usage` to get the LLM calls, tokens and latency of
+    the run, in total and per article index (1-based, as in the logs).
+    """
+    run_usage = usage if usage is not None else RunUsage()
+    total = len(articles)
+    known_episodes = {}
+    items = []
+
+    for item_idx, article in enumerate(articles):
+        fingerprint = article_fingerprint(article)
+        episode = None if force else get_processed_episode(fingerprint)
+        if episode is not None:
+            if collect:
+                known_episodes[item_idx] = episode
+            if on_progress:
+                on_progress(item_idx, "index", "cached")
+            if on_result:
+                on_result(item_idx, episode)
+        else:
+            items.append((item_idx, {
+                "article": article,
+                "index": item_idx + 1,
+                "total": total,
+                "fingerprint": fingerprint
+            }))
+
+    print(f"{total - len(items)} article(s) already processed, {len(items)} new")
+
+    # Batch representative item_idx -> its near-duplicates (longest first), tried in turn if it fails
+    backups = {}
+    if NEAR_DUP_ENABLED and items:
+        signatures, duplicates = find_near_duplicates(
+            [work['article'] for _, work in items], [work['fingerprint'] for _, work in items]
+        )
+        for (item_idx, work), signature in zip(items, signatures):
+            work['signature'] = signature
+        for position, (scope, original_title, representative) in duplicates.items():
+            if scope == "batch":
+                backups.setdefault(items[representative][0], []).append(items[position])
+                continue
+            item_idx = items[position][0]
+            print(f"Skipping article {item_idx + 1}: near-duplicate ({scope}) of '{(original_title or '')[:50]}'")
+            if on_progress:
+                on_progress(item_idx, "dedup", "duplicate")
+        items = [item for position, item in enumerate(items) if position not in duplicates]
+
+    if not items:
+        return [known_episodes[idx] for idx in sorted(known_episodes)]
+
+    episodes = dict(known_episodes)
+    uploaded = set()
+
+    if PIPELINE_STREAM_TTS:
+        # Synthesis runs on the inference thread while the LLM writes, so there is no separate TTS stage
+        stages = [
+            ("llm_tts", _with_usage_scope(_stream_stage, run_usage), PIPELINE_LLM_WORKERS),
+            ("upload", _upload_stage, PIPELINE_UPLOAD_WORKERS),
+        ]
+    else:
+        stages = [
+            ("llm", _with_usage_scope(_llm_stage, run_usage), PIPELINE_LLM_WORKERS),
+            ("tts", _tts_stage, PIPELINE_TTS_WORKERS),
+            ("upload", _upload_stage, PIPELINE_UPLOAD_WORKERS),
+        ]
+
+    while items:
+        _classify_up_front(items, run_usage)
+
+        # The engine numbers its items 0..n-1; map them back to scrape positions
+        positions = [item_idx for item_idx, _ in items]
+
+        def forward_result(pipeline_idx, episode, positions=positions):
+            uploaded.add(positions[pipeline_idx])
+            if collect:
+                episodes[positions[pipeline_idx]] = episode
+            if on_result:
+                on_result(positions[pipeline_idx], episode)
+
+        def forward_progress(pipeline_idx, stage, status, positions=positions):
+            if on_progress:
+                on_progress(positions[pipeline_idx], stage, status)
+
+        run_staged_pipeline(
+            [work for _, work in items], stages,
+            on_result=forward_result,
+            on_progress=forward_progress,
+            cancel_event=cancel_event,
+            collect=False
+        )
+
+        # Near-duplicates are only dropped once their representative is uploaded;
+        # if it failed, the next version of the story gets its own round
+        retry = []
+        for item_idx in positions:
+            members = backups.pop(item_idx, [])
+            if item_idx in uploaded:
+                for duplicate_idx, _ in members:
+                    print(f"Skipping article {duplicate_idx + 1}: near-duplicate (batch) of article {item_idx + 1}")
+                    if on_progress:
+                        on_progress(duplicate_idx, "dedup", "duplicate")
+            elif members and not (cancel_event is not None and cancel_event.is_set()):
+                print(f"Article {item_idx + 1} failed, trying its near-duplicate {members[0][0] + 1} instead")
+                backups[members[0][0]] = members[1:]
+                retry.append(members[0])
+        items = retry
+
+    totals = run_usage.total.to_dict()
+    print(f"LLM usage: {totals['calls']} calls, {totals['prompt_tokens']} prompt + "
+          f"{totals['completion_tokens']} completion tokens, {totals['latency_seconds']}s in calls")
+    return [episodes[idx] for idx in sorted(episodes)]
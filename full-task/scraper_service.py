@@ -1,70 +1,74 @@
-import requests
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
-import re
-from datetime import datetime
-import urllib3
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import (
+    SCRAPER_TIMEOUT_SECONDS, SCRAPER_DEADLINE_SECONDS, SCRAPER_FETCH_WORKERS, SCRAPER_PER_HOST_LIMIT,
+    ARTICLE_FETCH_ENABLED
+)
+from article_fetcher import fetch_article_bodies
+from feed_sources import SOURCES
+from http_cache import conditional_get, host_slot
+from metrics_service import SCRAPE_SECONDS, FEED_FETCH_SECONDS, FEED_FETCH_FAILURES
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Shared by all scrapes so fetch threads (and their pooled connections) are reused
+_fetch_pool = ThreadPoolExecutor(max_workers=SCRAPER_FETCH_WORKERS, thread_name_prefix="feed-fetch")
 
 
-def scrape_alriyadh_news():
-    """Scrape news from AlRiyadh RSS feed"""
+def _fetch_source(source, only_if_changed: bool):
+    """Articles of one source, or None when it is unchanged and only_if_changed is set"""
+    with host_slot("feed", source.url, SCRAPER_PER_HOST_LIMIT), FEED_FETCH_SECONDS.time(source=source.name):
+        content, changed = conditional_get(source.url, kind="feed", timeout=SCRAPER_TIMEOUT_SECONDS)
+        if not changed:
+            print(f"[{source.name}] feed not modified since the last fetch")
+            if only_if_changed:
+                return None
+        return source.parse(content)
 
-    try:
-        print("Fetching news from AlRiyadh...")
-        url = "https://www.alriyadh.com/section.columns.xml"
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-        response = requests.get(url, headers=headers, verify=False, timeout=10)
-        response.raise_for_status()
 
-        root = ET.fromstring(response.content)
-        news_data = []
+@SCRAPE_SECONDS.time()
+def scrape_feeds(only_if_changed: bool = False, sources=None):
+    """
+    Scrape all configured feed sources concurrently and merge their articles
 
-        for item in root.findall('.//item'):
-            try:
-                # Extract title
-                title_elem = item.find('title')
-                title_text = title_elem.text if title_elem is not None else "No title"
-                if title_text and title_text.startswith('<![CDATA['):
-                    title_text = title_text[9:-3]
+    Every feed is fetched with a conditional GET. When one has not changed
+    since the last fetch, its stored copy is parsed instead, or, with
+    only_if_changed=True, it contributes nothing; if no feed changed at all
+    None is returned. A feed that fails or is still running after
+    SCRAPER_DEADLINE_SECONDS is skipped, so one dead host never holds up the
+    others. Articles are merged in source order and tagged with their source.
+    With ARTICLE_FETCH_ENABLED their text is then replaced by the full pages
+    (see article_fetcher.fetch_article_bodies).
+    """
+    sources = SOURCES if sources is None else sources
+    print(f"Fetching news from {len(sources)} feed(s)...")
+    futures = [(source, _fetch_pool.submit(_fetch_source, source, only_if_changed)) for source in sources]
+    done, _ = wait([future for _, future in futures], timeout=SCRAPER_DEADLINE_SECONDS)
 
-                # Extract description
-                description_elem = item.find('description')
-                description_text = description_elem.text if description_elem is not None else ""
-                if description_text and description_text.startswith('<![CDATA['):
-                    description_text = description_text[9:-3]
+    news_data = []
+    unchanged = 0
+    for source, future in futures:
+        if future not in done:
+            future.cancel()
+            print(f"[{source.name}] skipped: no response within {SCRAPER_DEADLINE_SECONDS}s")
+            FEED_FETCH_FAILURES.inc(source=source.name, reason="deadline")
+            continue
+        try:
+            articles = future.result()
+        except Exception as e:
+            print(f"[{source.name}] Error scraping news: {e}")
+            FEED_FETCH_FAILURES.inc(source=source.name, reason="error")
+            continue
+        if articles is None:
+            unchanged += 1
+            continue
+        print(f"[{source.name}] {len(articles)} articles")
+        news_data.extend(articles)
 
-                # Extract date
-                pub_date_elem = item.find('pubDate')
-                pub_date_text = pub_date_elem.text if pub_date_elem is not None else ""
+    if sources and unchanged == len(sources):
+        return None
 
-                # Clean HTML
-                if description_text and "<" in description_text:
-                    soup = BeautifulSoup(description_text, 'html.parser')
-                    description_text = soup.get_text()
-
-                description_text = re.sub(r'\s+', ' ', description_text if description_text else "").strip()
-
-                # Only include substantial articles
-                if description_text and len(description_text) > 50:
-                    news_data.append({
-                        'title': title_text.strip() if title_text else "",
-                        'description_fusha': description_text,
-                        'date': pub_date_text,
-                        'source': 'AlRiyadh',
-                        'scraped_time': datetime.now().astimezone().isoformat()
-                    })
-            except Exception as e:
-                print(f"Error processing item: {e}")
-                continue
-
-        print(f"✓ Successfully scraped {len(news_data)} articles")
-        return news_data
-
-    except Exception as e:
-        print(f"Error scraping news: {e}")
-        return []
+    print(f"✓ Successfully scraped {len(news_data)} articles")
+    if ARTICLE_FETCH_ENABLED:
+        fetch_article_bodies(news_data)
+    return news_data
 
 """
     # mock data for quick testing
@@ -0,0 +1,23 @@
+"""
+Production entry point.
+
+Loads both XTTS models once in this process, then serves the Flask app with
+waitress on a pool of HTTP threads. Synthesis from every thread goes through
+the single inference queue in tts_service, so LLM-only and scrape endpoints
+keep answering while a long synthesis runs.
+"""
+from waitress import serve
+
+from app import app, startup
+from config import SERVER_HOST, SERVER_PORT, SERVER_THREADS
+
+if __name__ == '__main__':
+    print("\n" + "=" * 60)
+    print(f"Starting Agent Service on http://{SERVER_HOST}:{SERVER_PORT} ({SERVER_THREADS} threads)")
+    print("=" * 60)
+
+    startup()
+
+    print("=" * 60 + "\n")
+
+    serve(app, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS, channel_timeout=600)
@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import threading
+
+_local = threading.local()
+
+
+def thread_connection(path: str, schema: str, on_open=None):
+    """
+    This thread's connection to the SQLite database at `path`, opened on first use.
+
+    SQLite connections must not be shared between threads, so every thread
+    gets its own. WAL lets readers work while another connection writes, and
+    the busy timeout makes concurrent writers (other threads or worker
+    processes) wait instead of failing. A new connection creates the parent
+    directory, applies `schema` and then calls `on_open(conn)`.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(schema)
+        # Registered before on_open, so a callback that needs the connection gets this one
+        connections[path] = conn
+        if on_open is not None:
+            on_open(conn)
+    return conn
@@ -1,7 +1,9 @@
 import os
+import time
 import wave
 from google.cloud import storage
 from config import GCS_CREDENTIALS_PATH, GCS_BUCKET_NAME
+from metrics_service import UPLOAD_SECONDS, UPLOAD_BYTES
 
 # Initialize GCS client
 gcs_client = None
@@ -38,8 +40,12 @@ def upload_to_gcs(local_file_path: str, destination_blob_name: str):
         bucket = gcs_client.bucket(GCS_BUCKET_NAME)
         blob = bucket.blob(destination_blob_name)
 
-        # Upload file
+        # Upload file (metrics are labelled by the top-level folder: audio / scripts / content)
+        kind = destination_blob_name.split('/', 1)[0]
+        start = time.perf_counter()
         blob.upload_from_filename(local_file_path)
+        UPLOAD_SECONDS.observe(time.perf_counter() - start, kind=kind)
+        UPLOAD_BYTES.observe(os.path.getsize(local_file_path), kind=kind)
 
         # Make blob publicly accessible (optional - for direct access)
         # blob.make_public()
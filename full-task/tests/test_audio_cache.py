@@ -0,0 +1,29 @@
+from audio_cache import cache_key
+
+MODEL = ("checkpoint-sha", "speaker-sha")
+
+
+def test_cache_key_ignores_whitespace_differences():
+    assert cache_key("  هلا   والله\nبكم ", "normal", MODEL, 0.7, 1.0) == cache_key("هلا والله بكم", "normal", MODEL, 0.7, 1.0)
+
+
+def test_cache_key_changes_with_everything_that_changes_the_audio():
+    base = cache_key("هلا والله", "normal", MODEL, 0.7, 1.0)
+    variants = [
+        cache_key("هلا واللة", "normal", MODEL, 0.7, 1.0),
+        cache_key("هلا والله", "serious", MODEL, 0.7, 1.0),
+        cache_key("هلا والله", "normal", ("other-checkpoint", "speaker-sha"), 0.7, 1.0),
+        cache_key("هلا والله", "normal", ("checkpoint-sha", "other-speaker"), 0.7, 1.0),
+        cache_key("هلا والله", "normal", MODEL, 0.75, 1.0),
+        cache_key("هلا والله", "normal", MODEL, 0.7, 1.1),
+    ]
+    assert base not in variants
+    assert len(set(variants)) == len(variants)
+
+
+def test_cache_key_keeps_diacritics():
+    assert cache_key("هَلا", "normal", MODEL, 0.7, 1.0) != cache_key("هلا", "normal", MODEL, 0.7, 1.0)
+
+
+def test_cache_key_ignores_float_noise():
+    assert cache_key("هلا", "normal", MODEL, 0.7, 1.0) == cache_key("هلا", "normal", MODEL, 0.70000001, 1.0)
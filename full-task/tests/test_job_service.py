@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from job_service import CANCELLED, COMPLETED, QUEUED, RUNNING, Job, JobRegistry, parse_last_event_id, sse_event_stream
+
+
+@pytest.mark.parametrize("header, expected", [(None, None), ("0", 0), ("42", 42), (" 7 ", 7)])
+def test_parse_last_event_id_accepts_non_negative_integers(header, expected):
+    assert parse_last_event_id(header) == expected
+
+
+@pytest.mark.parametrize("header", ["", "abc", "-1", "1.5", "٣", "²", "1 2"])
+def test_parse_last_event_id_rejects_anything_else(header):
+    with pytest.raises(ValueError):
+        parse_last_event_id(header)
+
+
+def _finished_job(events):
+    job = Job("test")
+    for n in range(events):
+        job.publish("progress", {"n": n})
+    job.set_status(COMPLETED)
+    return job
+
+
+def _event_ids(stream):
+    return [int(block.split("\n")[0][len("id: "):]) for block in stream if block.startswith("id: ")]
+
+
+def test_sse_stream_resumes_after_last_event_id():
+    job = _finished_job(5)  # events 0-4, then the status event 5
+
+    assert _event_ids(sse_event_stream(job)) == [0, 1, 2, 3, 4, 5]
+    assert _event_ids(sse_event_stream(job, parse_last_event_id("3"))) == [4, 5]
+
+
+def test_transition_is_compare_and_set():
+    job = Job("test")
+
+    assert job.transition(QUEUED, RUNNING)
+    assert not job.transition(QUEUED, CANCELLED)
+    assert job.status == RUNNING
+
+
+def test_job_cancelled_while_queued_never_runs():
+    registry = JobRegistry(max_workers=1)
+    release = threading.Event()
+    blocker = registry.submit("blocker", lambda job: release.wait(5))
+    ran = threading.Event()
+
+    queued = registry.submit("queued", lambda job: ran.set())
+    registry.cancel(queued.id)
+    release.set()
+    registry._executor.shutdown(wait=True)
+
+    assert not ran.is_set()
+    assert queued.status == CANCELLED
+    assert blocker.status == COMPLETED
+    statuses = [event["data"]["status"] for event in queued.events if event["type"] == "status"]
+    assert statuses == [QUEUED, CANCELLED]
+
+
+def test_job_cancelled_while_running_ends_cancelled():
+    registry = JobRegistry(max_workers=1)
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        job.cancel_event.wait(5)
+
+    job = registry.submit("running", run)
+    started.wait(5)
+    registry.cancel(job.id)
+    registry._executor.shutdown(wait=True)
+
+    statuses = [event["data"]["status"] for event in job.events if event["type"] == "status"]
+    assert statuses == [QUEUED, RUNNING, CANCELLED]
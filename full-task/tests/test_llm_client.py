@@ -0,0 +1,80 @@
+import asyncio
+import types
+
+import pytest
+
+import llm_client
+from llm_client import TokenBucket
+
+
+class FakeClock:
+    """Stands in for llm_client's `time` and `asyncio.sleep`, so waits take no real time"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_client, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(llm_client, "asyncio", types.SimpleNamespace(Lock=asyncio.Lock, sleep=clock.sleep))
+    return clock
+
+
+def test_acquire_within_capacity_does_not_wait(clock):
+    bucket = TokenBucket(60)
+
+    asyncio.run(bucket.acquire(60))
+
+    assert clock.sleeps == []
+    assert bucket.available == 0
+
+
+def test_acquire_waits_for_the_refill(clock):
+    bucket = TokenBucket(60)  # one unit per second
+    asyncio.run(bucket.acquire(60))
+
+    asyncio.run(bucket.acquire(3))
+
+    assert sum(clock.sleeps) == pytest.approx(3.0)
+    assert bucket.available == pytest.approx(0.0)
+
+
+def test_oversized_request_is_capped_at_capacity(clock):
+    bucket = TokenBucket(10)
+
+    asyncio.run(bucket.acquire(1000))
+
+    assert clock.sleeps == []
+    assert bucket.available == 0
+
+
+def test_refill_never_exceeds_capacity(clock):
+    bucket = TokenBucket(60)
+    asyncio.run(bucket.acquire(30))
+
+    clock.now += 3600
+    bucket.adjust(0)
+
+    assert bucket.available == 60
+
+
+def test_adjust_gives_back_and_takes_units(clock):
+    bucket = TokenBucket(100)
+    asyncio.run(bucket.acquire(80))
+
+    bucket.adjust(50)
+    assert bucket.available == 70
+    bucket.adjust(-90)
+    assert bucket.available == -20
+    bucket.adjust(500)
+    assert bucket.available == 100
@@ -0,0 +1,42 @@
+import llm_service
+from llm_client import CHARS_PER_TOKEN
+from llm_service import CLASSIFIER_BATCH_ITEM_OVERHEAD_TOKENS, _pack_classifier_batches
+
+
+def _prompt(tokens):
+    """A prompt that _pack_classifier_batches counts as `tokens` tokens"""
+    return "x" * ((tokens - CLASSIFIER_BATCH_ITEM_OVERHEAD_TOKENS) * CHARS_PER_TOKEN)
+
+
+def test_pack_classifier_batches_respects_token_budget(monkeypatch):
+    monkeypatch.setattr(llm_service, "CLASSIFIER_BATCH_TOKEN_BUDGET", 100)
+    monkeypatch.setattr(llm_service, "CLASSIFIER_BATCH_MAX_ITEMS", 40)
+    items = [(i, _prompt(40)) for i in range(5)]
+
+    batches = _pack_classifier_batches(items)
+
+    assert [[item_id for item_id, _ in batch] for batch in batches] == [[0, 1], [2, 3], [4]]
+
+
+def test_pack_classifier_batches_respects_item_limit(monkeypatch):
+    monkeypatch.setattr(llm_service, "CLASSIFIER_BATCH_TOKEN_BUDGET", 10 ** 6)
+    monkeypatch.setattr(llm_service, "CLASSIFIER_BATCH_MAX_ITEMS", 3)
+
+    batches = _pack_classifier_batches([(i, _prompt(20)) for i in range(7)])
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [item_id for batch in batches for item_id, _ in batch] == list(range(7))
+
+
+def test_pack_classifier_batches_gives_an_oversized_item_its_own_batch(monkeypatch):
+    monkeypatch.setattr(llm_service, "CLASSIFIER_BATCH_TOKEN_BUDGET", 100)
+    monkeypatch.setattr(llm_service, "CLASSIFIER_BATCH_MAX_ITEMS", 40)
+    items = [("a", _prompt(30)), ("big", _prompt(500)), ("b", _prompt(30))]
+
+    batches = _pack_classifier_batches(items)
+
+    assert [[item_id for item_id, _ in batch] for batch in batches] == [["a"], ["big"], ["b"]]
+
+
+def test_pack_classifier_batches_empty():
+    assert _pack_classifier_batches([]) == []
@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+import najdi_validator
+from najdi_validator import classify_najdi, najdi_features, najdi_score
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks", "fixtures", "najdi_samples.jsonl")
+OPENERS = ("وش السالفة؟", "ترى", "يا جماعة", "حياكم الله", "وش رايكم؟", "يعني بالمختصر")
+
+
+def _samples():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_empty_text_scores_zero():
+    assert najdi_score("") == 0.0
+    assert najdi_features("   ")["tokens"] == 0
+
+
+def test_score_is_a_probability():
+    for sample in _samples():
+        assert 0.0 <= najdi_score(sample["text"]) <= 1.0
+
+
+@pytest.mark.parametrize("sample", _samples(), ids=lambda sample: sample["text"][:20])
+def test_decided_fixture_samples_match_their_label(sample):
+    verdict = classify_najdi(sample["text"], accept_threshold=0.8, reject_threshold=0.2)
+    if verdict is not None:
+        assert verdict == (sample["label"] == "najdi")
+
+
+def test_najdi_opener_does_not_carry_a_fusha_paragraph():
+    negatives = [
+        sample["text"] for sample in _samples()
+        if sample["label"] == "fusha" and sample["text"].startswith(OPENERS)
+    ]
+    assert negatives
+    for text in negatives:
+        assert najdi_features(text)["najdi_coverage"] < 0.5
+        assert najdi_score(text) < 0.8
+
+
+def test_score_ceiling_follows_coverage(monkeypatch):
+    # Strong marker density, but only one window in five leans Najdi
+    features = {"tokens": 80, "najdi_density": 40.0, "fusha_density": 0.0, "najdi_coverage": 0.2, "ngram_llr": 0.5}
+    monkeypatch.setattr(najdi_validator, "najdi_features", lambda text: features)
+
+    assert najdi_score("...") == pytest.approx(0.6)
@@ -0,0 +1,95 @@
+import threading
+
+from pipeline_service import run_staged_pipeline
+
+
+def _stages(*fns, workers=2):
+    return [(f"stage{n}", fn, workers) for n, fn in enumerate(fns)]
+
+
+def test_results_come_back_in_item_order():
+    stages = _stages(lambda x: x + 1, lambda x: x * 10)
+
+    assert run_staged_pipeline(list(range(20)), stages, queue_size=2) == [(x + 1) * 10 for x in range(20)]
+
+
+def test_failing_and_dropped_items_are_reported_and_skipped():
+    progress = []
+    lock = threading.Lock()
+
+    def on_progress(item_idx, stage, status):
+        with lock:
+            progress.append((item_idx, stage, status))
+
+    def first(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return None if x == 5 else x
+
+    results = run_staged_pipeline(list(range(8)), _stages(first, lambda x: -x), on_progress=on_progress)
+
+    assert results == [0, -1, -2, -4, -6, -7]
+    assert (3, "stage0", "error") in progress
+    assert (5, "stage0", "dropped") in progress
+    assert not any(item_idx in (3, 5) and stage == "stage1" for item_idx, stage, _ in progress)
+
+
+def test_error_in_a_later_stage_does_not_stop_the_others():
+    def second(x):
+        if x % 2:
+            raise ValueError(x)
+        return x
+
+    assert run_staged_pipeline(list(range(10)), _stages(lambda x: x, second, lambda x: x)) == [0, 2, 4, 6, 8]
+
+
+def test_failing_callbacks_do_not_kill_workers():
+    delivered = []
+
+    def on_result(item_idx, output):
+        delivered.append(item_idx)
+        raise RuntimeError("callback bug")
+
+    def on_progress(item_idx, stage, status):
+        raise RuntimeError("callback bug")
+
+    results = run_staged_pipeline(list(range(30)), _stages(lambda x: x, workers=1),
+                                  on_result=on_result, on_progress=on_progress)
+
+    assert results == list(range(30))
+    assert sorted(delivered) == list(range(30))
+
+
+def test_cancel_stops_feeding_and_drops_queued_items():
+    cancel_event = threading.Event()
+    first_started = threading.Event()
+    processed = []
+
+    def slow(x):
+        first_started.set()
+        if x == 0:
+            cancel_event.wait(5)
+        processed.append(x)
+        return x
+
+    def cancel_soon():
+        first_started.wait(5)
+        cancel_event.set()
+
+    threading.Thread(target=cancel_soon).start()
+    results = run_staged_pipeline(list(range(50)), _stages(slow, workers=1), queue_size=2,
+                                  cancel_event=cancel_event)
+
+    # Item 0 was inside the stage when the cancel came and finishes it; nothing after it runs
+    assert processed == [0]
+    assert results == [0]
+
+
+def test_collect_false_only_delivers_through_on_result():
+    delivered = {}
+
+    results = run_staged_pipeline([1, 2, 3], _stages(lambda x: x * 2),
+                                  on_result=delivered.__setitem__, collect=False)
+
+    assert results == []
+    assert delivered == {0: 2, 1: 4, 2: 6}
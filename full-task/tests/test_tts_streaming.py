@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import torch
+
+from tts_service import (
+    CROSSFADE_MS, SAMPLE_RATE, IncrementalTextSplitter, StreamingCrossfader, assemble_audio,
+    split_arabic_text_for_tts
+)
+
+ARTICLE = (
+    "أعلنت الهيئة العامة للترفيه عن إطلاق موسم جديد يتضمن فعاليات متنوعة في عدة مدن. "
+    "وقال المتحدث الرسمي إن الموسم سيستمر ثلاثة أشهر، ويشمل حفلات ومعارض وعروضا مسرحية! "
+    "هل ستشارك العائلات؟ نعم، فقد خصصت الهيئة مناطق للأطفال وكبار السن؛ "
+    "كما ستوفر وسائل نقل مجانية من المحطات الرئيسية إلى مواقع الفعاليات طوال أيام الأسبوع. "
+    "وأكدت الهيئة أن التذاكر ستطرح إلكترونيا عبر المنصة الرسمية خلال الأيام المقبلة"
+)
+
+
+def _feed_in_pieces(splitter, text, size):
+    chunks = []
+    for start in range(0, len(text), size):
+        chunks.extend(splitter.feed(text[start:start + size]))
+    return chunks + splitter.flush()
+
+
+@pytest.mark.parametrize("piece_size", [1, 3, 17, 1000])
+def test_incremental_splitter_matches_whole_text_split(piece_size):
+    expected = split_arabic_text_for_tts(ARTICLE, use_spacy=False)
+    assert len(expected) > 1
+    assert _feed_in_pieces(IncrementalTextSplitter(use_spacy=False), ARTICLE, piece_size) == expected
+
+
+def test_incremental_splitter_holds_back_an_unfinished_sentence():
+    splitter = IncrementalTextSplitter(use_spacy=False)
+    assert splitter.feed("جملة أولى لم تنته بعد") == []
+    assert splitter.flush() == ["جملة أولى لم تنته بعد"]
+    assert splitter.flush() == []
+
+
+def _chunks(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(-0.5, 0.5, length).astype(np.float32) for length in lengths]
+
+
+def _stream(chunks, piece_size):
+    fader = StreamingCrossfader()
+    out = []
+    for chunk in chunks:
+        for start in range(0, len(chunk), piece_size):
+            out.append(fader.feed(chunk[start:start + piece_size]))
+        out.append(fader.end_chunk())
+    out.append(fader.flush())
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("piece_size", [1, 500, 100000])
+def test_streaming_crossfader_matches_assemble_audio(piece_size):
+    fade = int(SAMPLE_RATE * CROSSFADE_MS / 1000)
+    chunks = _chunks([SAMPLE_RATE, fade // 2, 3 * fade, 0, SAMPLE_RATE // 2])
+    expected = assemble_audio([torch.from_numpy(chunk) for chunk in chunks]).numpy()[0]
+
+    streamed = _stream(chunks, piece_size)
+
+    assert streamed.shape == expected.shape
+    np.testing.assert_allclose(streamed, expected, atol=1e-6)
+
+
+def test_streaming_crossfader_single_chunk_passes_through():
+    chunk = _chunks([5000])[0]
+    np.testing.assert_array_equal(_stream([chunk], 700), chunk)
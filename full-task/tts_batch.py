@@ -0,0 +1,112 @@
+import torch
+import torch.nn.functional as F
+
+# Xtts.inference() defaults (TTS 0.22), which tts_arabic relies on
+INFERENCE_DEFAULTS = {
+    "length_penalty": 1.0,
+    "repetition_penalty": 10.0,
+    "top_k": 50,
+    "top_p": 0.85,
+    "do_sample": True,
+}
+
+
+def supports_batching(model) -> bool:
+    """True for Coqui Xtts models, whose GPT / decoder internals this module drives"""
+    return all(hasattr(model, name) for name in ("gpt", "hifigan_decoder", "tokenizer"))
+
+
+def _text_tokens(model, text: str, language: str):
+    tokens = torch.IntTensor(model.tokenizer.encode(text.strip().lower(), lang=language)).unsqueeze(0).to(model.device)
+    if tokens.shape[-1] >= model.args.gpt_max_text_tokens:
+        raise ValueError(f"Chunk is too long for XTTS ({tokens.shape[-1]} tokens): {text[:40]}...")
+    return tokens
+
+
+def _prefix_embedding(gpt, text_tokens, gpt_cond_latent):
+    """Conditioning latents + text embeddings of one chunk, as in GPT.compute_embeddings"""
+    text_inputs = F.pad(text_tokens, (0, 1), value=gpt.stop_text_token)
+    text_inputs = F.pad(text_inputs, (1, 0), value=gpt.start_text_token)
+    emb = gpt.text_embedding(text_inputs) + gpt.text_pos_embedding(text_inputs)
+    return torch.cat([gpt_cond_latent, emb], dim=1)
+
+
+def _generate_codes(gpt, prefixes, temperature, sampling):
+    """Autoregressive GPT pass for a batch of prefixes; returns each sequence's codes up to its stop token"""
+    batch = len(prefixes)
+    longest = max(prefix.shape[1] for prefix in prefixes)
+    padded = prefixes[0].new_zeros((batch, longest, prefixes[0].shape[-1]))
+    # One extra column for the start-of-audio token
+    attention_mask = torch.zeros((batch, longest + 1), dtype=torch.long, device=padded.device)
+    for row, prefix in enumerate(prefixes):
+        padded[row, longest - prefix.shape[1]:] = prefix[0]
+        attention_mask[row, longest - prefix.shape[1]:] = 1
+
+    gpt.gpt_inference.store_prefix_emb(padded)
+    gpt_inputs = torch.full((batch, longest + 1), fill_value=1, dtype=torch.long, device=padded.device)
+    gpt_inputs[:, -1] = gpt.start_audio_token
+
+    generated = gpt.gpt_inference.generate(
+        gpt_inputs,
+        attention_mask=attention_mask,
+        bos_token_id=gpt.start_audio_token,
+        pad_token_id=gpt.stop_audio_token,
+        eos_token_id=gpt.stop_audio_token,
+        max_length=gpt.max_gen_mel_tokens + gpt_inputs.shape[-1],
+        temperature=temperature,
+        num_return_sequences=1,
+        num_beams=1,
+        output_attentions=False,
+        **sampling
+    )[:, gpt_inputs.shape[-1]:]
+
+    codes = []
+    for row in generated:
+        # Finished sequences are padded with the stop token; keep the first one, as inference() does
+        stops = (row == gpt.stop_audio_token).nonzero()
+        end = int(stops[0]) + 1 if len(stops) else row.shape[0]
+        codes.append(row[:end].unsqueeze(0))
+    return codes
+
+
+def inference_batch(model, texts, language, gpt_cond_latent, speaker_embedding, temperature=0.75, speed=1.0,
+                    **sampling):
+    """
+    Synthesize several texts with one batched autoregressive GPT pass.
+    Returns one 1-D float CPU waveform per text, in order, like inference()["wav"].
+
+    The sampling pass dominates XTTS time and is launch-bound at batch size 1.
+    Here every chunk's prefix is built as GPT.compute_embeddings builds it,
+    left-padded to the longest and masked out. XTTS's GPT adds text and mel
+    positions to the embeddings itself (no absolute position embeddings), so
+    padding shifts nothing, and each sequence stops at its own stop token.
+    The latent pass and HiFiGAN then run per chunk on the trimmed codes, as in
+    inference(). Greedy decoding gives inference()'s codes token for token;
+    with sampling each chunk is an independent draw from the same distribution.
+    """
+    sampling = {**INFERENCE_DEFAULTS, **sampling}
+    language = language.split("-")[0]
+    length_scale = 1.0 / max(speed, 0.05)
+    gpt = model.gpt
+    gpt_cond_latent = gpt_cond_latent.to(model.device)
+    speaker_embedding = speaker_embedding.to(model.device)
+
+    with torch.no_grad():
+        tokens = [_text_tokens(model, text, language) for text in texts]
+        prefixes = [_prefix_embedding(gpt, text_tokens, gpt_cond_latent) for text_tokens in tokens]
+        codes = _generate_codes(gpt, prefixes, temperature, sampling)
+
+        wavs = []
+        for text_tokens, gpt_codes in zip(tokens, codes):
+            expected_output_len = torch.tensor([gpt_codes.shape[-1] * gpt.code_stride_len], device=model.device)
+            text_len = torch.tensor([text_tokens.shape[-1]], device=model.device)
+            gpt_latents = gpt(
+                text_tokens, text_len, gpt_codes, expected_output_len,
+                cond_latents=gpt_cond_latent, return_attentions=False, return_latent=True
+            )
+            if length_scale != 1.0:
+                gpt_latents = F.interpolate(
+                    gpt_latents.transpose(1, 2), scale_factor=length_scale, mode="linear"
+                ).transpose(1, 2)
+            wavs.append(model.hifigan_decoder(gpt_latents, g=speaker_embedding).cpu().squeeze())
+    return wavs
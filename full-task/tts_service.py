@@ -1,4 +1,7 @@
+import functools
 import os
+import struct
+import numpy as np
 import torch
 import torchaudio
 from datetime import datetime
@@ -7,7 +10,17 @@ from TTS.tts.models.xtts import Xtts
 import uuid
 from typing import Optional, Dict, Any, Tuple
 import re
+import time
+import queue
+import threading
+from concurrent.futures import Future
 from minio_resolver import resolve_path
+from metrics_service import (
+    TTS_CHUNK_INFERENCE_SECONDS, TTS_REAL_TIME_FACTOR, TTS_CROSSFADE_SECONDS, TTS_FIRST_AUDIO_SECONDS,
+    TTS_BATCH_CHUNKS
+)
+from tts_batch import inference_batch, supports_batching
+from audio_cache import cache_get, cache_put, cache_key as audio_cache_key, file_fingerprint
 
 # --- import for text splitting ---
 try:
@@ -20,12 +33,14 @@ except ImportError:
 from config import (
     SERIOUS_SPEAKER_REFERENCE, SERIOUS_CONFIG_PATH, SERIOUS_CHECKPOINT_PATH,
     LIVELY_SPEAKER_REFERENCE, LIVELY_CONFIG_PATH, LIVELY_CHECKPOINT_PATH,
-    OUTPUT_DIR, TOKENIZER_PATH
+    OUTPUT_DIR, TOKENIZER_PATH, TTS_BATCH_SIZE, TTS_STREAM_CHUNK_TOKENS
 )
 
 # ============ Global Model and Latents ============
 tts_models: Dict[str, Xtts] = {}
 model_latents: Dict[str, Tuple[Any, Any]] = {}
+# (checkpoint fingerprint, speaker reference fingerprint) per voice, for the chunk audio cache
+model_identities: Dict[str, Tuple[str, str]] = {}
 device = None  # Will be set once during initialization
 # General Configs for Inference (based on the notebook)
 SAMPLE_RATE = 24000
@@ -38,6 +53,54 @@ _whitespace_re = re.compile(r"\s+")
 nlp_arabic = None
 
 
+# ============ Inference Queue ============
+# All synthesis runs on one thread that owns the models, so HTTP threads and
+# pipeline workers never run XTTS concurrently on the same weights.
+_inference_queue = queue.Queue()
+_inference_thread = None
+_inference_thread_lock = threading.Lock()
+
+
+def _inference_worker():
+    while True:
+        fn, args, kwargs, future = _inference_queue.get()
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+def start_inference_worker():
+    """Start the inference thread (idempotent)"""
+    global _inference_thread
+
+    with _inference_thread_lock:
+        if _inference_thread is None:
+            _inference_thread = threading.Thread(target=_inference_worker, name="tts-inference", daemon=True)
+            _inference_thread.start()
+
+
+def submit_inference(fn, *args, **kwargs) -> Future:
+    """Queue `fn(*args, **kwargs)` on the inference thread and return a Future"""
+    start_inference_worker()
+    future = Future()
+    _inference_queue.put((fn, args, kwargs, future))
+    return future
+
+
+def run_inference(fn, *args, **kwargs):
+    """Run `fn` on the inference thread and wait for its result"""
+    if threading.current_thread() is _inference_thread:
+        return fn(*args, **kwargs)
+    return submit_inference(fn, *args, **kwargs).result()
+
+
+def inference_queue_depth() -> int:
+    return _inference_queue.qsize()
+
+
 # ============ TTS Model Loading and Status ============
 
 def is_tts_ready() -> bool:
@@ -94,6 +157,14 @@ def _load_model_and_latents(voice_type: str, checkpoint_path: str, speaker_ref:
         gpt_cond_latent = gpt_cond_latent.to(device)
         speaker_embedding = speaker_embedding.to(device)
 
+        try:
+            model_identities[voice_type] = (
+                file_fingerprint(resolved_checkpoint_path, sample_only=True),
+                file_fingerprint(resolve_path(speaker_ref))
+            )
+        except OSError as e:
+            print(f"Could not fingerprint the {voice_type} model, its chunks will not be cached: {e}")
+
         print(f"DING DING DING! {voice_type.capitalize()}")
         return tts_model, (gpt_cond_latent, speaker_embedding)
     except Exception as e:
@@ -111,6 +182,7 @@ def initialize_tts():
 
     # Initialize Spacy once
     nlp_arabic = load_arabic_spacy()
+    start_inference_worker()
     successful_init = True
 
     # 1. Initialize LIVELY voice model (key is 'normal' for app.py compatibility)
@@ -181,12 +253,12 @@ def split_arabic_text_with_regex(text):
     sentences = []
     current = []
 
-    for char in text:
+    for position, char in enumerate(text):
         current.append(char)
         if re.match(arabic_punctuation, char):
-            if len(text) > len(''.join(current)):
-                next_char = text[len(''.join(current))]
-                if next_char in ' \t\n' or len(''.join(current)) == len(text):
+            if position + 1 < len(text):
+                next_char = text[position + 1]
+                if next_char in ' \t\n':
                     sentence = ''.join(current).strip()
                     if sentence:
                         sentences.append(_whitespace_re.sub(" ", sentence))
@@ -263,8 +335,22 @@ def split_arabic_text_for_tts(text, max_length=MAX_CHUNK_LENGTH, use_spacy=True)
     if not sentences:
         sentences = [text]
 
+    chunks, current_chunk = _pack_sentences(sentences, max_length)
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    chunks = [chunk for chunk in chunks if chunk]
+
+    return chunks
+
+
+def _pack_sentences(sentences, max_length, current_chunk=""):
+    """
+    Greedily pack sentences into chunks of at most max_length, wrapping long ones.
+    Returns (finished chunks, open chunk that may still grow).
+    """
     chunks = []
-    current_chunk = ""
 
     for sentence in sentences:
         if len(sentence) > max_length:
@@ -285,12 +371,57 @@ def split_arabic_text_for_tts(text, max_length=MAX_CHUNK_LENGTH, use_spacy=True)
                 chunks.append(current_chunk.strip())
                 current_chunk = sentence
 
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    return chunks, current_chunk
 
-    chunks = [chunk for chunk in chunks if chunk]
 
-    return chunks
+# Sentence end as split_arabic_text_with_regex sees it: punctuation followed by whitespace
+_sentence_end_re = re.compile(r"[.!?؟;؛،](?=[ \t\n])")
+
+
+class IncrementalTextSplitter:
+    """
+    Split streamed text into the same chunks split_arabic_text_for_tts would
+    produce for the whole text, emitting each chunk once it can no longer change.
+
+    feed() takes the next piece of text and returns newly finished chunks;
+    flush() returns the rest when the text is complete.
+    """
+
+    def __init__(self, max_length=MAX_CHUNK_LENGTH, use_spacy=True):
+        self.max_length = max_length
+        self.use_spacy = use_spacy
+        self.buffer = ""
+        self.open_chunk = ""
+
+    def _sentences(self, text):
+        text = text.strip()
+        if not text:
+            return []
+        sentences = []
+        if self.use_spacy and nlp_arabic:
+            sentences = split_arabic_text_with_spacy(text)
+        if not sentences:
+            sentences = split_arabic_text_with_regex(text)
+        return sentences or [_whitespace_re.sub(" ", text)]
+
+    def feed(self, text):
+        self.buffer += text
+        last_end = None
+        for last_end in _sentence_end_re.finditer(self.buffer):
+            pass
+        if last_end is None:
+            return []
+        # Only sentences followed by whitespace are final; the tail may still grow
+        complete, self.buffer = self.buffer[:last_end.end()], self.buffer[last_end.end():]
+        chunks, self.open_chunk = _pack_sentences(self._sentences(complete), self.max_length, self.open_chunk)
+        return [chunk for chunk in chunks if chunk]
+
+    def flush(self):
+        chunks, open_chunk = _pack_sentences(self._sentences(self.buffer), self.max_length, self.open_chunk)
+        if open_chunk:
+            chunks.append(open_chunk.strip())
+        self.buffer, self.open_chunk = "", ""
+        return [chunk for chunk in chunks if chunk]
 
 
 def crossfade_audio(wav_a, wav_b, fade_ms=CROSSFADE_MS, sample_rate=SAMPLE_RATE):
@@ -324,6 +455,122 @@ def crossfade_audio(wav_a, wav_b, fade_ms=CROSSFADE_MS, sample_rate=SAMPLE_RATE)
     return combined
 
 
+@functools.lru_cache(maxsize=8)
+def _fade_ramps(fade_samples: int):
+    """(fade_out, fade_in) linear ramps of crossfade_audio, on the CPU"""
+    return torch.linspace(1.0, 0.0, fade_samples), torch.linspace(0.0, 1.0, fade_samples)
+
+
+def assemble_audio(chunks, fade_ms=CROSSFADE_MS, sample_rate=SAMPLE_RATE):
+    """
+    Crossfade 1-D CPU chunk waveforms into one [1, samples] tensor.
+
+    Gives the same result as folding crossfade_audio over the chunks, but the
+    final length is computed first, one buffer is allocated and every chunk
+    is overlap-added into it once, instead of re-concatenating the growing
+    result for each chunk (quadratic in article length).
+    """
+    fade_samples = int(sample_rate * fade_ms / 1000)
+    chunks = [chunk for chunk in chunks if chunk.shape[-1]]
+
+    # Overlap with everything before it, capped by both lengths as in crossfade_audio
+    overlaps = []
+    total = 0
+    for chunk in chunks:
+        overlap = min(fade_samples, total, chunk.shape[-1])
+        overlaps.append(overlap)
+        total += chunk.shape[-1] - overlap
+
+    combined = torch.empty(total, dtype=torch.float32)
+    position = 0
+    for chunk, overlap in zip(chunks, overlaps):
+        if overlap:
+            fade_out, fade_in = _fade_ramps(overlap)
+            combined[position - overlap:position].mul_(fade_out).addcmul_(chunk[:overlap], fade_in)
+        length = chunk.shape[-1] - overlap
+        combined[position:position + length].copy_(chunk[overlap:])
+        position += length
+
+    return combined.unsqueeze(0)
+
+
+class StreamingCrossfader:
+    """
+    Joins chunk audio as it arrives, with the same linear crossfade as crossfade_audio.
+
+    The last `fade` samples of the audio so far are held back until the start
+    of the next chunk has been mixed into them (or flush() is called), so every
+    sample returned is final and the output equals crossfading whole chunks.
+    Works on 1-D float32 numpy arrays on the CPU.
+    """
+
+    def __init__(self, fade_ms=CROSSFADE_MS, sample_rate=SAMPLE_RATE):
+        self.fade_samples = int(sample_rate * fade_ms / 1000)
+        self.fade_out = np.linspace(1.0, 0.0, self.fade_samples, dtype=np.float32)
+        self.fade_in = np.linspace(0.0, 1.0, self.fade_samples, dtype=np.float32)
+        self.tail = np.zeros(0, dtype=np.float32)  # held-back end of the audio so far
+        self.head = None  # start of the current chunk while it still has to be mixed into `tail`
+
+    def feed(self, piece):
+        """Add the next piece of the current chunk; returns the samples that are now final"""
+        if self.head is not None:
+            self.head = np.concatenate([self.head, piece])
+            if len(self.head) < self.fade_samples:
+                return np.zeros(0, dtype=np.float32)
+            piece = self._mix()
+        return self._hold_back(piece)
+
+    def end_chunk(self):
+        """Mark the end of a chunk; the next piece starts a chunk that is crossfaded into this one"""
+        out = np.zeros(0, dtype=np.float32)
+        if self.head is not None:
+            if not len(self.head):
+                return out  # empty chunk: keep waiting for audio to crossfade into
+            out = self._hold_back(self._mix())
+        if len(self.tail):
+            self.head = np.zeros(0, dtype=np.float32)
+        return out
+
+    def flush(self):
+        """The held-back samples, once no more audio will follow"""
+        if self.head is not None and len(self.head):
+            self._hold_back(self._mix())
+        out, self.tail, self.head = self.tail, np.zeros(0, dtype=np.float32), None
+        return out
+
+    def _mix(self):
+        head, self.head = self.head, None
+        fade = min(self.fade_samples, len(self.tail), len(head))
+        if fade == self.fade_samples:
+            fade_out, fade_in = self.fade_out, self.fade_in
+        else:
+            fade_out = np.linspace(1.0, 0.0, fade, dtype=np.float32)
+            fade_in = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        mixed = self.tail[len(self.tail) - fade:] * fade_out + head[:fade] * fade_in
+        audio = np.concatenate([self.tail[:len(self.tail) - fade], mixed, head[fade:]])
+        self.tail = np.zeros(0, dtype=np.float32)
+        return audio
+
+    def _hold_back(self, piece):
+        audio = np.concatenate([self.tail, piece]) if len(self.tail) else piece
+        keep = min(self.fade_samples, len(audio))
+        self.tail = audio[len(audio) - keep:]
+        return audio[:len(audio) - keep]
+
+
+def wav_stream_header(sample_rate=SAMPLE_RATE):
+    """16-bit mono WAV header with the maximum sizes, for audio whose length is not known yet"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE", b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16, b"data", 0xFFFFFFFF
+    )
+
+
+def pcm16_bytes(audio) -> bytes:
+    """Little-endian 16-bit PCM of a float waveform in [-1, 1]"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
 def tts_arabic(prompt: str,
                model: Xtts,
                gpt_cond_latent: torch.Tensor,
@@ -332,11 +579,16 @@ def tts_arabic(prompt: str,
                temperature: float = 0.7,
                speed: float = 1.0,
                max_chunk_length: int = MAX_CHUNK_LENGTH,
-               crossfade_ms: int = CROSSFADE_MS):
+               crossfade_ms: int = CROSSFADE_MS,
+               voice_type: str = 'normal',
+               generation_started: Optional[float] = None):
     """
     Main TTS generation function using external text splitting and crossfading.
 
     Returns the path to the combined audio file.
+    `voice_type` only labels the inference / real-time-factor metrics.
+    `generation_started` (time.perf_counter() when the script started being
+    written) feeds the time-to-first-audio metric.
     """
     global device
 
@@ -352,55 +604,122 @@ def tts_arabic(prompt: str,
 
     print(f"Split into {len(chunks)} chunk(s)")
 
-    # Generate audio for each chunk
-    audio_chunks = []
+    # Reuse chunks synthesized before with the same text, voice, model and settings
+    audio_chunks = [None] * len(chunks)
+    synthesis_start = time.perf_counter()
+    cache_keys = _chunk_cache_keys(chunks, model, voice_type, temperature, speed)
+    if cache_keys:
+        for i, key in enumerate(cache_keys):
+            cached = cache_get(key, voice_type)
+            if cached is not None:
+                audio_chunks[i] = torch.from_numpy(cached)
+    pending = [i for i, wav_data in enumerate(audio_chunks) if wav_data is None]
+    if len(pending) < len(chunks):
+        print(f"Reusing {len(chunks) - len(pending)} cached chunk(s)")
+        if generation_started is not None:
+            TTS_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - generation_started, mode="buffered")
+            generation_started = None
+
+    # Generate audio for the other chunks, several at a time when the model supports it
+    batches = _batches_by_length([chunks[i] for i in pending], TTS_BATCH_SIZE if supports_batching(model) else 1)
+    for batch_index, batch in enumerate(batches):
+        batch = [pending[j] for j in batch]
+        batch_audio = _synthesize_batch(
+            [chunks[i] for i in batch], model, gpt_cond_latent, speaker_embedding, temperature, speed, voice_type
+        )
+        for i, wav_data in zip(batch, batch_audio):
+            audio_chunks[i] = wav_data
+            if cache_keys:
+                cache_put(cache_keys[i], voice_type, wav_data.numpy())
+        if batch_index == 0 and generation_started is not None:
+            TTS_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - generation_started, mode="buffered")
 
-    for i, chunk_text in enumerate(chunks):
-        # print(f"Generating audio for chunk {i+1}/{len(chunks)}...") # Suppressed for cleaner logs
+    return _save_combined_audio(audio_chunks, output_name, crossfade_ms, synthesis_start, voice_type)
 
-        result = model.inference(
-            text=chunk_text,
-            language="ar",
-            gpt_cond_latent=gpt_cond_latent,
-            speaker_embedding=speaker_embedding,
-            temperature=temperature,
-            speed=speed,
-            enable_text_splitting=False  # Ensure the model's internal splitting is off
-        )
 
-        wav_data = torch.tensor(result["wav"], dtype=torch.float32)
+def _chunk_cache_keys(chunks, model, voice_type, temperature, speed):
+    """Audio cache key per chunk, or None when the model is not one of the fingerprinted service models"""
+    identity = model_identities.get(voice_type)
+    if identity is None or tts_models.get(voice_type) is not model:
+        return None
+    return [audio_cache_key(chunk_text, voice_type, identity, temperature, speed) for chunk_text in chunks]
+
 
-        if wav_data.ndim == 1:
-            wav_data = wav_data.unsqueeze(0)
+def _batches_by_length(chunks, batch_size):
+    """
+    Chunk indices grouped into batches of similar length (less padding per
+    batch); batch_size 1 keeps the original order.
+    """
+    order = list(range(len(chunks)))
+    if batch_size > 1:
+        order.sort(key=lambda i: len(chunks[i]))
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def _synthesize_batch(chunk_texts, model, gpt_cond_latent, speaker_embedding, temperature, speed, voice_type):
+    """Synthesize several chunks in one batched pass; 1-D CPU float tensors, in order"""
+    if len(chunk_texts) == 1:
+        return [_synthesize_chunk(
+            chunk_texts[0], model, gpt_cond_latent, speaker_embedding, temperature, speed, voice_type
+        )]
+
+    batch_start = time.perf_counter()
+    wavs = inference_batch(
+        model, chunk_texts, "ar", gpt_cond_latent, speaker_embedding, temperature=temperature, speed=speed
+    )
+    per_chunk = (time.perf_counter() - batch_start) / len(chunk_texts)
+    TTS_BATCH_CHUNKS.observe(len(chunk_texts), voice=voice_type)
+    for _ in chunk_texts:
+        TTS_CHUNK_INFERENCE_SECONDS.observe(per_chunk, voice=voice_type)
+    return [wav.float().reshape(-1) for wav in wavs]
+
+
+def _synthesize_chunk(chunk_text, model, gpt_cond_latent, speaker_embedding, temperature, speed, voice_type):
+    """Run model.inference for one text chunk and return its 1-D CPU float waveform"""
+    chunk_start = time.perf_counter()
+    result = model.inference(
+        text=chunk_text,
+        language="ar",
+        gpt_cond_latent=gpt_cond_latent,
+        speaker_embedding=speaker_embedding,
+        temperature=temperature,
+        speed=speed,
+        enable_text_splitting=False  # Ensure the model's internal splitting is off
+    )
+    TTS_CHUNK_INFERENCE_SECONDS.observe(time.perf_counter() - chunk_start, voice=voice_type)
 
-        wav_data = wav_data.to(device)
-        audio_chunks.append(wav_data)
+    # XTTS returns a CPU float32 numpy array; as_tensor wraps it without a copy
+    return torch.as_tensor(result["wav"], dtype=torch.float32).reshape(-1)
 
+
+def _save_combined_audio(audio_chunks, output_name, crossfade_ms, synthesis_start, voice_type):
+    """Crossfade the chunks, write the WAV and return (path, whole seconds)"""
     # Combine all audio chunks with crossfade
     print("Combining audio chunks...")
-    combined_audio = audio_chunks[0]
-
-    for next_chunk in audio_chunks[1:]:
-        combined_audio = crossfade_audio(combined_audio, next_chunk, crossfade_ms, SAMPLE_RATE)
+    crossfade_start = time.perf_counter()
+    combined_audio = assemble_audio(audio_chunks, crossfade_ms, SAMPLE_RATE)
+    TTS_CROSSFADE_SECONDS.observe(time.perf_counter() - crossfade_start)
 
     # Save the combined audio
     combined_filename = f"{output_name}.wav"
     combined_path = os.path.join(OUTPUT_DIR, combined_filename)  # Use OUTPUT_DIR from config
 
-    combined_audio_cpu = combined_audio.cpu() # move to CPU before saving file
-    torchaudio.save(combined_path, combined_audio_cpu, SAMPLE_RATE)
+    torchaudio.save(combined_path, combined_audio, SAMPLE_RATE)
 
     print(f"Combined audio saved: {combined_path}")
 
     # Calculate final duration
-    duration_seconds = combined_audio_cpu.shape[1] / SAMPLE_RATE
+    duration_seconds = combined_audio.shape[1] / SAMPLE_RATE
+    if duration_seconds > 0:
+        TTS_REAL_TIME_FACTOR.observe((time.perf_counter() - synthesis_start) / duration_seconds, voice=voice_type)
 
     return combined_path, int(duration_seconds)
 
 
 # ============ Main Application Function ============
 
-def generate_audio(text: str, output_name: Optional[str] = None, voice_type: str = 'normal'):
+def generate_audio(text: str, output_name: Optional[str] = None, voice_type: str = 'normal',
+                   generation_started: Optional[float] = None):
     """
     Generate audio from text using the selected TTS model and return (path, duration).
     This function now acts as a wrapper for the new tts_arabic core logic.
@@ -425,8 +744,9 @@ def generate_audio(text: str, output_name: Optional[str] = None, voice_type: str
 
         print(f"Generating audio with '{voice_type}' voice (length: {len(text)} chars)...")
 
-        # --- CALL THE NEW CORE FUNCTION ---
-        output_path, duration = tts_arabic(
+        # --- CALL THE NEW CORE FUNCTION (on the inference thread) ---
+        output_path, duration = run_inference(
+            tts_arabic,
             prompt=text,
             model=tts_model_instance,
             gpt_cond_latent=gpt_cond_latent,
@@ -435,7 +755,9 @@ def generate_audio(text: str, output_name: Optional[str] = None, voice_type: str
             temperature=0.7,
             speed=1.0,
             max_chunk_length=MAX_CHUNK_LENGTH,
-            crossfade_ms=CROSSFADE_MS
+            crossfade_ms=CROSSFADE_MS,
+            voice_type=voice_type,
+            generation_started=generation_started
         )
         # ----------------------------------
 
@@ -448,3 +770,171 @@ def generate_audio(text: str, output_name: Optional[str] = None, voice_type: str
         import traceback
         traceback.print_exc()
         return None, 0
+
+
+def generate_audio_streaming(text_stream, output_name: Optional[str] = None, voice_type: str = 'normal'):
+    """
+    Generate audio while the text is still being written and return (path, duration).
+
+    `text_stream` yields pieces of text (e.g. LLM deltas). Finished chunks are
+    found incrementally with the same rules as split_arabic_text_for_tts and
+    queued on the inference thread right away, so synthesis overlaps with
+    generation. If the stream raises, queued chunks are cancelled and
+    (None, 0) is returned.
+    """
+    if voice_type not in tts_models:
+        print(f"Voice type '{voice_type}' not initialized. Defaulting to 'normal'.")
+        voice_type = 'normal'
+
+    if voice_type not in tts_models:
+        print("Neither TTS model initialized.")
+        return None, 0
+
+    tts_model_instance = tts_models[voice_type]
+    gpt_cond_latent, speaker_embedding = model_latents[voice_type]
+
+    if not output_name:
+        output_name = f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{voice_type}"
+
+    splitter = IncrementalTextSplitter(MAX_CHUNK_LENGTH, use_spacy=True)
+    futures = []
+    start = time.perf_counter()
+
+    def submit(chunks):
+        for chunk_text in chunks:
+            future = submit_inference(
+                _synthesize_chunk, chunk_text, tts_model_instance, gpt_cond_latent, speaker_embedding,
+                0.7, 1.0, voice_type
+            )
+            if not futures:
+                future.add_done_callback(
+                    lambda _: TTS_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - start, mode="streamed")
+                )
+            futures.append(future)
+
+    try:
+        print(f"Streaming audio with '{voice_type}' voice...")
+        for piece in text_stream:
+            submit(splitter.feed(piece))
+        submit(splitter.flush())
+
+        if not futures:
+            raise RuntimeError("No text chunks were created from input.")
+
+        audio_chunks = [future.result() for future in futures]
+        print(f"Synthesized {len(audio_chunks)} streamed chunk(s)")
+        output_path, duration = run_inference(
+            _save_combined_audio, audio_chunks, output_name, CROSSFADE_MS, start, voice_type
+        )
+        print(f"✓ Duration: {duration} seconds")
+        return output_path, duration
+
+    except Exception as e:
+        for future in futures:
+            future.cancel()
+        print(f"Error generating streamed audio: {e}")
+        return None, 0
+
+
+_STREAM_CHUNK_END = object()
+_STREAM_END = object()
+
+
+def _as_numpy(wav):
+    if hasattr(wav, "detach"):
+        wav = wav.detach().cpu().numpy()
+    return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+
+def _stream_chunks(chunks, model, gpt_cond_latent, speaker_embedding, temperature, speed, voice_type, pieces, stop):
+    """
+    Synthesize `chunks` on the inference thread, putting audio pieces on the
+    `pieces` queue as they are decoded and a marker after every chunk.
+    Uses model.inference_stream when the model has it, else one piece per chunk.
+    """
+    try:
+        for chunk_text in chunks:
+            if stop.is_set():
+                return
+            chunk_start = time.perf_counter()
+            if hasattr(model, "inference_stream"):
+                for piece in model.inference_stream(
+                    chunk_text,
+                    "ar",
+                    gpt_cond_latent,
+                    speaker_embedding,
+                    stream_chunk_size=TTS_STREAM_CHUNK_TOKENS,
+                    temperature=temperature,
+                    speed=speed,
+                    enable_text_splitting=False
+                ):
+                    pieces.put(_as_numpy(piece))
+                    if stop.is_set():
+                        return
+            else:
+                result = model.inference(
+                    text=chunk_text,
+                    language="ar",
+                    gpt_cond_latent=gpt_cond_latent,
+                    speaker_embedding=speaker_embedding,
+                    temperature=temperature,
+                    speed=speed,
+                    enable_text_splitting=False
+                )
+                pieces.put(_as_numpy(result["wav"]))
+            TTS_CHUNK_INFERENCE_SECONDS.observe(time.perf_counter() - chunk_start, voice=voice_type)
+            pieces.put(_STREAM_CHUNK_END)
+    finally:
+        pieces.put(_STREAM_END)
+
+
+def synthesize_stream(text: str, voice_type: str = 'normal', temperature: float = 0.7, speed: float = 1.0):
+    """
+    Yield the audio of `text` (1-D float32 numpy arrays at SAMPLE_RATE) while it is being synthesized.
+
+    Synthesis runs on the inference thread like every other TTS call; chunk
+    boundaries are crossfaded here as the pieces arrive, so the concatenated
+    output matches tts_arabic's crossfade. Closing the generator stops
+    synthesis after the current piece. Synthesis errors are raised.
+    """
+    if voice_type not in tts_models:
+        print(f"Voice type '{voice_type}' not initialized. Defaulting to 'normal'.")
+        voice_type = 'normal'
+
+    if voice_type not in tts_models:
+        raise RuntimeError("Neither TTS model initialized.")
+
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Input text must be a non-empty Arabic string")
+
+    start = time.perf_counter()
+    chunks = split_arabic_text_for_tts(text, MAX_CHUNK_LENGTH, use_spacy=True)
+    if not chunks:
+        raise RuntimeError("No text chunks were created from input.")
+
+    gpt_cond_latent, speaker_embedding = model_latents[voice_type]
+    pieces = queue.Queue()
+    stop = threading.Event()
+    future = submit_inference(
+        _stream_chunks, chunks, tts_models[voice_type], gpt_cond_latent, speaker_embedding,
+        temperature, speed, voice_type, pieces, stop
+    )
+    crossfader = StreamingCrossfader(CROSSFADE_MS, SAMPLE_RATE)
+    first_audio = True
+
+    try:
+        while True:
+            piece = pieces.get()
+            if piece is _STREAM_END:
+                break
+            audio = crossfader.end_chunk() if piece is _STREAM_CHUNK_END else crossfader.feed(piece)
+            if len(audio):
+                if first_audio:
+                    TTS_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - start, mode="live")
+                    first_audio = False
+                yield audio
+        future.result()
+        yield crossfader.flush()
+    finally:
+        stop.set()
+        future.cancel()